@@ -1,8 +1,52 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
-import math
+import plotly.graph_objects as go
+import os
+import time
 import datetime
+from collections import OrderedDict
+
+from audit_log import AUDIT_DIR, AuditLogWriter
+from calibration import load_history
+from cashflow import DEFAULT_ESCALATION, cash_flow
+from cost_engine import (
+    calculate_bus_count_accurate,
+    calculate_costs_batch,
+    calculate_study_hours_batch,
+    load_coefficients,
+    split_grade_hours,
+    COEFFICIENTS_PATH,
+    GRADES,
+    REPORT_MULTIPLIERS,
+    STUDY_KEYS,
+)
+from metrics import RERUN_SECONDS, note_cache_miss, record_cache, record_session, start_metrics_server, track_cache
+from money import from_paise
+from quote_pdf import safe_filename, submit_quote_pdf
+from quote_view import services_status, viewer_url
+from rate_cards import BASE_CURRENCY, BUILTIN_REGION, RATE_FIELDS, RateCardCache, available_cards, fx_factor
+from response_surface import CALIBRATION_STEPS, IT_CAPACITY_STEPS, SCRUBBED_INPUTS, surface_tables
+import result_cards
+import share_state
+from scenarios import comparison_table, refresh_scenarios, save_scenario
+from scheduler import schedule_project
+from similar_quotes import SimilarQuoteIndex
+from warmup import start_warmup
+
+rerun_started = time.perf_counter()
+
+
+def finish_rerun():
+    """
+    Record this rerun's runtime metrics. Called on the last line and before
+    each st.rerun(), which ends the script early.
+    """
+    RERUN_SECONDS.observe(time.perf_counter() - rerun_started)
+    run_ctx = get_script_run_ctx()
+    if run_ctx is not None:
+        record_session(run_ctx.session_id, st.session_state)
 
 # Page configuration
 st.set_page_config(
@@ -12,149 +56,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# ACCURATE BUS COUNT CALCULATION FUNCTION (ADAPTED FROM DC_Bus_Quantity_Estimater)
-# ═══════════════════════════════════════════════════════════════════════════════
-
-def calculate_bus_count_accurate(
-    total_mw,
-    it_capacity,
-    mechanical_load,
-    house_load,
-    tier_level,
-    pue=1.56,
-    mech_fraction=0.70,
-    ups_lineup=1.5,
-    transformer_mva=3.0,
-    lv_bus_mw=3.0,
-    pdu_mva=0.3,
-    mv_base=2,
-    utility_incomers=1,
-    power_factor=0.95,
-    voltage_levels=2,
-    backup_gens=0,
-    expansion_factor=1.0,
-    bus_calibration=1.0
-):
-    """
-    Calculate bus count using component-by-component engineering method
-    with total MW (IT + Mechanical + House) as primary driver.[file:2]
-    Returns:
-        int: Estimated bus count (rounded up)
-    """
-
-    # ─────────────────────────────────────────────────────────────────────
-    # PHASE 1: LOAD DERIVATION
-    # ─────────────────────────────────────────────────────────────────────
-    calc_total_mw = total_mw
-    calc_it_mw = it_capacity
-    non_it_mw = max(calc_total_mw - calc_it_mw, 0)
-
-    # If explicit mechanical & house loads are given, use them preferentially
-    if mechanical_load > 0 or house_load > 0:
-        mech_mw = mechanical_load
-        house_mw = house_load
-        # If non_it_mw is nonzero but explicit loads differ a lot, we still trust user inputs
-    else:
-        mech_mw = mech_fraction * non_it_mw
-        house_mw = non_it_mw - mech_mw
-
-    # ─────────────────────────────────────────────────────────────────────
-    # PHASE 2: COMPONENT COUNTING (EQUIPMENT-BASED)
-    # ─────────────────────────────────────────────────────────────────────
-
-    lv_it_pcc = math.ceil(calc_it_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
-    lv_mech_mcc = math.ceil(mech_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
-    lv_house_pcc = math.ceil(house_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
-    lv_total = lv_it_pcc + lv_mech_mcc + lv_house_pcc
-
-    ups_lineups = math.ceil(calc_it_mw / ups_lineup) if ups_lineup > 0 else 0
-    ups_output_buses = ups_lineups
-
-    pdus_total = math.ceil(calc_it_mw / pdu_mva) if pdu_mva > 0 else 0
-
-    tx_count_n = math.ceil(calc_total_mw / (transformer_mva * power_factor)) if transformer_mva > 0 else 0
-
-    mv_buses = mv_base + (utility_incomers - 1)
-
-    voltage_additions = 0
-    if voltage_levels > 2:
-        voltage_additions = (voltage_levels - 2) * (tx_count_n + 1)
-
-    generator_additions = backup_gens * 2 if backup_gens > 0 else 0
-
-    # ─────────────────────────────────────────────────────────────────────
-    # PHASE 3: REDUNDANCY MODELING (TIER-BASED)
-    # ─────────────────────────────────────────────────────────────────────
-
-    buses_core_n = (
-        mv_buses
-        + tx_count_n
-        + lv_total
-        + ups_output_buses
-        + pdus_total
-        + voltage_additions
-        + generator_additions
-    )
-
-    if tier_level == "Tier I":
-        total_buses = buses_core_n * expansion_factor
-
-    elif tier_level == "Tier II":
-        tx_count_adj = tx_count_n + 1
-        buses_adj = (
-            mv_buses
-            + tx_count_adj
-            + lv_total
-            + ups_output_buses
-            + pdus_total
-            + voltage_additions
-            + generator_additions
-        )
-        total_buses = buses_adj * expansion_factor * 1.10
-
-    elif tier_level == "Tier III":
-        tx_count_adj = tx_count_n + 1
-        buses_adj = (
-            mv_buses
-            + tx_count_adj
-            + lv_total
-            + ups_output_buses
-            + pdus_total
-            + voltage_additions
-            + generator_additions
-        )
-        total_buses = buses_adj * expansion_factor * 1.15
-
-    elif tier_level == "Tier IV":
-        mv_2n = mv_buses * 2
-        tx_2n = tx_count_n * 2
-        lv_2n = lv_total * 2
-        ups_2n = ups_output_buses * 2
-        pdus_2n = int(pdus_total * 1.5)
-        extras_2n = (voltage_additions + generator_additions) * 2
-
-        buses_2n = mv_2n + tx_2n + lv_2n + ups_2n + pdus_2n + extras_2n
-        total_buses = buses_2n * expansion_factor
-
-    else:
-        tx_count_adj = tx_count_n + 1
-        buses_adj = (
-            mv_buses
-            + tx_count_adj
-            + lv_total
-            + ups_output_buses
-            + pdus_total
-            + voltage_additions
-            + generator_additions
-        )
-        total_buses = buses_adj * expansion_factor * 1.15
-
-    # Apply calibration factor
-    total_buses = total_buses * bus_calibration
-
-    return max(1, math.ceil(total_buses))
-
+# Runtime metrics endpoint and worker warm-up (/ready), started once per process
+start_metrics_server()
+start_warmup()
 
 # ═════════════════════════════════════════════════════════════════════════════==
 # PROFESSIONAL DARK THEME CSS
@@ -235,114 +139,6 @@ st.markdown("""
         color: #3b82f6;
     }
     
-    .metric-card {
-        background: rgba(30, 41, 59, 0.6);
-        backdrop-filter: blur(10px);
-        border: 1px solid rgba(59, 130, 246, 0.2);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.2);
-        border-color: rgba(59, 130, 246, 0.4);
-    }
-    
-    .metric-card h3 {
-        color: #64748b;
-        font-size: 0.8rem;
-        font-weight: 600;
-        margin: 0 0 0.5rem 0;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .metric-card .value {
-        color: #3b82f6;
-        font-size: 2rem;
-        font-weight: 800;
-        margin: 0;
-        line-height: 1;
-    }
-    
-    .metric-card .subtitle {
-        color: #64748b;
-        font-size: 0.8rem;
-        margin: 0.5rem 0 0 0;
-    }
-    
-    .study-card {
-        background: rgba(30, 41, 59, 0.7);
-        border: 1px solid rgba(71, 85, 105, 0.3);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        transition: all 0.3s ease;
-        backdrop-filter: blur(10px);
-        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
-    }
-    
-    .study-card:hover {
-        border-color: rgba(59, 130, 246, 0.4);
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.15);
-    }
-    
-    .study-card h4 {
-        color: #f1f5f9;
-        font-size: 1.2rem;
-        font-weight: 700;
-        margin: 0 0 1rem 0;
-    }
-    
-    .study-details {
-        display: grid;
-        grid-template-columns: 2fr 1fr;
-        gap: 2rem;
-        margin-top: 1rem;
-        align-items: center;
-    }
-    
-    .study-detail-item {
-        color: #cbd5e1;
-        font-size: 0.9rem;
-        line-height: 1.7;
-        font-weight: 500;
-    }
-    
-    .study-detail-item strong {
-        color: #f1f5f9;
-        font-weight: 600;
-    }
-    
-    .cost-highlight {
-        background: linear-gradient(135deg, #3b82f6 0%, #06b6d4 100%);
-        border-radius: 10px;
-        padding: 1.2rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3);
-    }
-    
-    .cost-highlight .amount {
-        font-size: 1.4rem;
-        font-weight: 800;
-        margin: 0;
-    }
-    
-    .results-container {
-        background: rgba(15, 23, 42, 0.8);
-        border: 1px solid rgba(59, 130, 246, 0.3);
-        border-radius: 16px;
-        padding: 2.5rem;
-        margin: 2rem 0;
-        backdrop-filter: blur(15px);
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
-    }
-    
     .stButton > button {
         background: linear-gradient(135deg, #3b82f6 0%, #06b6d4 100%);
         color: white;
@@ -436,45 +232,6 @@ st.markdown("""
         backdrop-filter: blur(10px);
     }
     
-    .summary-section {
-        background: rgba(15, 23, 42, 0.9);
-        border: 2px solid rgba(59, 130, 246, 0.4);
-        border-radius: 16px;
-        padding: 3rem;
-        margin: 3rem 0;
-        backdrop-filter: blur(20px);
-        box-shadow: 0 8px 30px rgba(0, 0, 0, 0.4);
-    }
-    
-    .final-total-section {
-        background: linear-gradient(135deg, #3b82f6 0%, #06b6d4 100%);
-        border-radius: 16px;
-        padding: 2.5rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 8px 25px rgba(59, 130, 246, 0.4);
-        margin: 2rem 0;
-    }
-    
-    .cost-category-card {
-        background: rgba(30, 41, 59, 0.6);
-        border: 1px solid rgba(59, 130, 246, 0.2);
-        border-radius: 10px;
-        padding: 1.5rem;
-        text-align: center;
-        backdrop-filter: blur(10px);
-        transition: all 0.3s ease;
-    }
-    
-    .cost-category-card:hover {
-        border-color: rgba(59, 130, 246, 0.4);
-        transform: translateY(-2px);
-    }
-    
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
     .block-container {
         padding-top: 1rem;
         padding-bottom: 2rem;
@@ -493,6 +250,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Result card styles live with their templates (shared with the quote viewer page)
+st.markdown(f"<style>{result_cards.STYLESHEET}</style>", unsafe_allow_html=True)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SESSION STATE INITIALIZATION
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -507,6 +267,12 @@ if 'studies_selected' not in st.session_state:
         'transient': False
     }
 
+if 'scenarios' not in st.session_state:
+    st.session_state.scenarios = {}
+
+if 'pdf_job' not in st.session_state:
+    st.session_state.pdf_job = None
+
 if 'work_allocation' not in st.session_state:
     st.session_state.work_allocation = {
         'senior': 20,
@@ -514,6 +280,88 @@ if 'work_allocation' not in st.session_state:
         'junior': 50
     }
 
+# Shared link: decode once per token, before any widget is created, so every
+# widget starts from the shared value in this same run (no rerun cascade)
+shared_token = st.query_params.get(share_state.QUERY_PARAM)
+if shared_token and st.session_state.get('shared_token') != shared_token:
+    st.session_state.shared_token = shared_token
+    try:
+        st.session_state.shared_inputs = share_state.decode_state(shared_token)
+        st.session_state.share_error = None
+    except ValueError as exc:
+        st.session_state.shared_inputs = {}
+        st.session_state.share_error = str(exc)
+    for key in st.session_state.studies_selected:
+        if key in st.session_state.shared_inputs:
+            st.session_state.studies_selected[key] = st.session_state.shared_inputs[key]
+            # Keyed checkboxes keep their own state; drop it so the shared value applies
+            st.session_state.pop(f"{key}_cb", None)
+    for key in st.session_state.work_allocation:
+        if key in st.session_state.shared_inputs:
+            st.session_state.work_allocation[key] = st.session_state.shared_inputs[key]
+    for key in ('custom_cost_1_desc', 'custom_cost_1_amount', 'custom_cost_2_desc', 'custom_cost_2_amount'):
+        if key in st.session_state.shared_inputs:
+            st.session_state.pop(key, None)
+
+shared_inputs = st.session_state.get('shared_inputs', {})
+
+def shared(name, default):
+    """Widget default: the shared link's value if one was opened, else the app default."""
+    return shared_inputs.get(name, default)
+
+def shared_index(options, name, default_index):
+    return options.index(shared_inputs[name]) if shared_inputs.get(name) in options else default_index
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CALIBRATED COEFFICIENTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@st.cache_data(show_spinner=False)
+def _cached_coefficients(path, mtime):
+    # mtime is part of the cache key so a re-fitted file is picked up on the next rerun
+    note_cache_miss()
+    return load_coefficients(path)
+
+coefficients = track_cache(
+    "coefficients",
+    _cached_coefficients,
+    COEFFICIENTS_PATH,
+    os.path.getmtime(COEFFICIENTS_PATH) if os.path.exists(COEFFICIENTS_PATH) else None
+)
+
+# Regional rate cards: parsed once per (region, version, mtime) and shared by every session
+@st.cache_resource
+def _rate_card_cache():
+    note_cache_miss()
+    return RateCardCache()
+
+rate_card_cache = track_cache("rate_card_cache", _rate_card_cache)
+
+# Completed projects for the similar-project lookup (same file calibration.py fits from)
+HISTORY_PATH = os.environ.get("DC_HISTORY_PATH", "history.csv")
+
+@st.cache_resource(show_spinner="Indexing past projects…")
+def _similar_quote_index(path, mtime):
+    note_cache_miss()
+    return SimilarQuoteIndex(load_history(path))
+
+# PDF jobs kept across sessions; the oldest beyond this are dropped
+# (a session's own job goes as soon as it generates the next one)
+MAX_PDF_JOBS = 256
+
+@st.cache_resource
+def _pdf_jobs():
+    # job id -> Future of PDF bytes, oldest first; kept out of session_state (futures don't pickle)
+    return OrderedDict()
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _cached_response_surface(fixed_inputs, coefficients, money_mode):
+    # Keyed on every input except the two scrubbed ones, so scrubbing never recomputes.
+    # The tables live in the cross-process shared cache: one Streamlit worker builds
+    # them and every other worker maps the same copy
+    note_cache_miss()
+    return surface_tables(fixed_inputs, coefficients, money_mode)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # HEADER
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -549,6 +397,9 @@ st.markdown("""
 # MAIN APPLICATION
 # ═══════════════════════════════════════════════════════════════════════════════
 
+if st.session_state.get('share_error'):
+    st.warning(f"⚠️ {st.session_state.share_error}. Showing default inputs instead.")
+
 with st.container():
     # Project Information Section
     st.markdown("""
@@ -560,17 +411,17 @@ with st.container():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        project_name = st.text_input("Project Name", value="Project-Alpha")
-        tier_level = st.selectbox("Tier Level", ["Tier I", "Tier II", "Tier III", "Tier IV"], index=3)
+        project_name = st.text_input("Project Name", value=shared('project_name', "Project-Alpha"))
+        tier_level = st.selectbox("Tier Level", list(share_state.TIERS), index=shared_index(share_state.TIERS, 'tier_level', 3))
     with col2:
-        it_capacity = st.number_input("IT Capacity (MW)", min_value=0.0, max_value=200.0, value=5.0, step=0.1)
-        delivery_type = st.selectbox("Delivery Type", ["Standard", "Urgent"])
+        it_capacity = st.number_input("IT Capacity (MW)", min_value=0.0, max_value=200.0, value=shared('it_capacity', 5.0), step=0.1)
+        delivery_type = st.selectbox("Delivery Type", ["Standard", "Urgent"], index=shared_index(["Standard", "Urgent"], 'delivery_type', 0))
     with col3:
-        mechanical_load = st.number_input("Mechanical Load (MW)", min_value=0.0, max_value=100.0, value=3.0, step=0.1)
-        report_complexity = st.selectbox("Report Complexity", ["Basic", "Standard", "Premium"], index=1)
+        mechanical_load = st.number_input("Mechanical Load (MW)", min_value=0.0, max_value=100.0, value=shared('mechanical_load', 3.0), step=0.1)
+        report_complexity = st.selectbox("Report Complexity", ["Basic", "Standard", "Premium"], index=shared_index(["Basic", "Standard", "Premium"], 'report_complexity', 1))
     with col4:
-        house_load = st.number_input("House/Auxiliary Load (MW)", min_value=0.0, max_value=50.0, value=2.0, step=0.1)
-        client_meetings = st.number_input("Client Meetings", min_value=0, max_value=20, value=3, step=1)
+        house_load = st.number_input("House/Auxiliary Load (MW)", min_value=0.0, max_value=50.0, value=shared('house_load', 2.0), step=0.1)
+        client_meetings = st.number_input("Client Meetings", min_value=0, max_value=20, value=shared('client_meetings', 3), step=1)
 
     # Customer Type Section
     st.markdown("""
@@ -581,16 +432,16 @@ with st.container():
     
     col5, col6, col7, col8 = st.columns(4)
     with col5:
-        customer_type = st.selectbox("Customer Type", ["New Customer", "Repeat Customer"])
+        customer_type = st.selectbox("Customer Type", ["New Customer", "Repeat Customer"], index=shared_index(["New Customer", "Repeat Customer"], 'customer_type', 0))
     with col6:
         if customer_type == "Repeat Customer":
-            repeat_discount = st.slider("Repeat Customer Discount (%)", 0, 25, 10, 1)
+            repeat_discount = st.slider("Repeat Customer Discount (%)", 0, 25, shared('repeat_discount', 10), 1)
         else:
             repeat_discount = 0
     with col7:
-        custom_margin = st.number_input("Project Margins (%)", min_value=0, max_value=50, value=15, step=1)
+        custom_margin = st.number_input("Project Margins (%)", min_value=0, max_value=50, value=shared('custom_margin', 15), step=1)
     with col8:
-        pue_value = st.slider("PUE (Power Usage Effectiveness)", 1.1, 2.0, 1.56, 0.01)
+        pue_value = st.slider("PUE (Power Usage Effectiveness)", 1.1, 2.0, shared('pue', 1.56), 0.01)
 
     # Bus Count Calibration (kept as in v5)
     st.markdown("""
@@ -608,7 +459,7 @@ with st.container():
             st.markdown("**🎯 Bus Count Calculation Method**")
             use_custom_blocks = st.checkbox(
                 "Enable Custom Equipment Block Sizing",
-                value=False,
+                value=shared('use_custom_blocks', False),
                 help="Toggle ON to enter custom equipment capacities. Toggle OFF to use industry-standard block sizes."
             )
             
@@ -616,6 +467,16 @@ with st.container():
                 st.info("✅ **Custom Block Sizing Enabled** - Enter your specific equipment capacities below")
             else:
                 st.info("🔧 **Standard Block Sizing** - Using industry-standard equipment capacities")
+
+            redundancy_options = ["Per Tier Level"] + list(share_state.TOPOLOGIES)
+            redundancy_choice = st.selectbox(
+                "Redundancy Topology",
+                redundancy_options,
+                index=shared_index(redundancy_options, 'redundancy_scheme', 0),
+                help="Per Tier Level uses the tier's redundancy. Pick a topology (N+1, 2N, distributed or "
+                     "block redundant) to quote designs that don't map to an Uptime tier."
+            )
+            redundancy_scheme = "" if redundancy_choice == "Per Tier Level" else redundancy_choice
         
         with bus_method_col2:
             st.markdown("**⚙️ Bus Count Calibration Factor**")
@@ -623,9 +484,10 @@ with st.container():
                 "Calibration Multiplier",
                 min_value=0.5,
                 max_value=2.5,
-                value=1.0,
+                value=shared('bus_calibration', min(max(round(coefficients['bus_calibration'] * 20) / 20, 0.5), 2.5)),
                 step=0.05,
-                help="Fine-tune bus count estimate. 1.0 = no adjustment. >1.0 increases count, <1.0 decreases count."
+                help="Fine-tune bus count estimate. 1.0 = no adjustment. >1.0 increases count, <1.0 decreases count. "
+                     f"Default comes from coefficient set v{coefficients['version']} ({coefficients['source']})."
             )
             if bus_calibration != 1.0:
                 st.warning(f"⚠️ Calibration factor: **{bus_calibration}x** applied to bus count")
@@ -645,15 +507,15 @@ with st.container():
         equip_col1, equip_col2, equip_col3, equip_col4, equip_col5 = st.columns(5)
         
         with equip_col1:
-            ups_lineup = st.slider("UPS Lineup (MW)", 0.5, 3.0, 1.5, 0.1)
+            ups_lineup = st.slider("UPS Lineup (MW)", 0.5, 3.0, shared('ups_lineup', 1.5), 0.1)
         with equip_col2:
-            transformer_mva = st.slider("Transformer (MVA)", 1.0, 5.0, 3.0, 0.1)
+            transformer_mva = st.slider("Transformer (MVA)", 1.0, 5.0, shared('transformer_mva', 3.0), 0.1)
         with equip_col3:
-            lv_bus_mw = st.slider("LV Bus Section (MW)", 2.0, 5.0, 3.0, 0.1)
+            lv_bus_mw = st.slider("LV Bus Section (MW)", 2.0, 5.0, shared('lv_bus_mw', 3.0), 0.1)
         with equip_col4:
-            pdu_mva = st.slider("PDU Capacity (MVA)", 0.2, 0.8, 0.3, 0.05)
+            pdu_mva = st.slider("PDU Capacity (MVA)", 0.2, 0.8, shared('pdu_mva', 0.3), 0.05)
         with equip_col5:
-            power_factor = st.slider("Power Factor", 0.90, 1.0, 0.95, 0.01)
+            power_factor = st.slider("Power Factor", 0.90, 1.0, shared('power_factor', 0.95), 0.01)
     else:
         # Use standard values
         ups_lineup = 1.5
@@ -679,7 +541,7 @@ with st.container():
             model_type = st.radio(
                 "Model Type",
                 ["Typical Model", "ETAP Model Available"],
-                index=0,
+                index=shared_index(["Typical Model", "ETAP Model Available"], 'model_type', 0),
                 help="ETAP Model reduces manhours due to existing system models"
             )
         
@@ -690,7 +552,7 @@ with st.container():
                     "Hour Reduction (%)",
                     min_value=10,
                     max_value=90,
-                    value=30,
+                    value=shared('hour_reduction', 30),
                     step=5,
                     help="Percentage reduction in manhours when ETAP model is available"
                 )
@@ -753,11 +615,13 @@ with st.container():
         if st.button("Select All Studies", key="select_all_studies"):
             for key in st.session_state.studies_selected:
                 st.session_state.studies_selected[key] = True
+            finish_rerun()
             st.rerun()
         
         if st.button("Clear All Studies", key="clear_all_studies"):
             for key in st.session_state.studies_selected:
                 st.session_state.studies_selected[key] = False
+            finish_rerun()
             st.rerun()
 
     # Work Allocation Section
@@ -775,24 +639,25 @@ with st.container():
         with alloc_col1:
             st.session_state.work_allocation['senior'] = st.slider(
                 "Senior Engineer (%)", 
-                5, 50, st.session_state.work_allocation['senior'], 1
+                5.0, 50.0, float(st.session_state.work_allocation['senior']), 1.0, format="%.1f"
             )
         
         with alloc_col2:
             st.session_state.work_allocation['mid'] = st.slider(
                 "Mid-level Engineer (%)", 
-                10, 60, st.session_state.work_allocation['mid'], 1
+                10.0, 60.0, float(st.session_state.work_allocation['mid']), 1.0, format="%.1f"
             )
         
         with alloc_col3:
             st.session_state.work_allocation['junior'] = st.slider(
                 "Junior Engineer (%)", 
-                10, 70, st.session_state.work_allocation['junior'], 1
+                10.0, 70.0, float(st.session_state.work_allocation['junior']), 1.0, format="%.1f"
             )
         
         with alloc_col4:
             if st.button("Auto Balance (20:30:50)", key="auto_balance"):
                 st.session_state.work_allocation = {'senior': 20, 'mid': 30, 'junior': 50}
+                finish_rerun()
                 st.rerun()
         
         # Normalize allocations
@@ -813,27 +678,75 @@ with st.container():
     </div>
     """, unsafe_allow_html=True)
     
+    rate_regions = list(available_cards(rate_card_cache.directory))
+    region_col, region_info_col = st.columns([1, 2])
+    with region_col:
+        rate_region = st.selectbox(
+            "Rate Card Region",
+            rate_regions,
+            index=rate_regions.index(BUILTIN_REGION),
+            key="rate_region",
+            help="Regional office rate card. Its rates become the defaults below, converted to ₹."
+        )
+    try:
+        rate_card = rate_card_cache.get(rate_region)
+        card_to_inr = fx_factor(rate_card.currency, BASE_CURRENCY, rate_card_cache.fx)
+    except (KeyError, ValueError) as exc:
+        st.error(f"❌ Rate card {rate_region}: {exc}. Using the built-in rates.")
+        rate_card = rate_card_cache.get(BUILTIN_REGION)
+        card_to_inr = 1.0
+
+    # Card rates in ₹, fitted to the editor's ranges. A clamped rate changes
+    # the quote, so it is called out rather than applied silently.
+    card_defaults = {}
+    clamped_rates = []
+    for name in RATE_FIELDS:
+        converted = rate_card.values[name] * card_to_inr
+        card_defaults[name] = share_state.clamp_field(name, converted)
+        if name not in shared_inputs and abs(card_defaults[name] - converted) > 0.5:
+            clamped_rates.append(f"{name.replace('_', ' ')} ₹{converted:,.0f} → ₹{card_defaults[name]:,}")
+
+    with region_info_col:
+        if rate_card.currency != BASE_CURRENCY:
+            st.caption(f"{rate_card.label} from {rate_card.source}: rates converted at "
+                       f"1 {rate_card.currency} = ₹{card_to_inr:,.2f}; the total is also shown in {rate_card.currency}.")
+        else:
+            st.caption(f"{rate_card.label} from {rate_card.source}.")
+        if clamped_rates:
+            st.warning(f"⚠️ Outside the editor's range, so clamped: {'; '.join(clamped_rates)}. "
+                       "The quote is priced with the clamped rates.")
+
+    def card_rate(name):
+        """Widget default from the selected rate card (in ₹, clamped to the widget's range)."""
+        return shared(name, card_defaults[name])
+
     rate_col1, rate_col2, rate_col3 = st.columns(3)
     
     with rate_col1:
         st.markdown("**Hourly Rates (₹)**")
-        senior_rate = st.number_input("Senior Engineer Rate", min_value=1000, max_value=8000, value=2000, step=50)
-        mid_rate = st.number_input("Mid-level Engineer Rate", min_value=500, max_value=5000, value=1100, step=25)
-        junior_rate = st.number_input("Junior Engineer Rate", min_value=300, max_value=2000, value=750, step=25)
+        senior_rate = st.number_input("Senior Engineer Rate", min_value=1000, max_value=8000, value=card_rate('senior_rate'), step=50)
+        mid_rate = st.number_input("Mid-level Engineer Rate", min_value=500, max_value=5000, value=card_rate('mid_rate'), step=25)
+        junior_rate = st.number_input("Junior Engineer Rate", min_value=300, max_value=2000, value=card_rate('junior_rate'), step=25)
+        exact_money = st.checkbox(
+            "Exact Paise Arithmetic",
+            value=shared('exact_money', False),
+            help="Hold every line item as whole paise (rounded once per grade and report line) so totals reconcile exactly with batch runs and invoices."
+        )
+        money_mode = "paise" if exact_money else "float"
     
     with rate_col2:
         st.markdown("**Study Complexity Factors**")
-        load_flow_factor = st.slider("Load Flow Factor", 0.3, 3.0, 1.0, 0.1)
-        short_circuit_factor = st.slider("Short Circuit Factor", 0.3, 3.0, 1.0, 0.1)
-        pdc_factor = st.slider("PDC Factor", 0.3, 3.0, 1.0, 0.1)
-        arc_flash_factor = st.slider("Arc Flash Factor", 0.3, 3.0, 1.0, 0.1)
+        load_flow_factor = st.slider("Load Flow Factor", 0.3, 3.0, shared('load_flow_factor', 1.0), 0.1)
+        short_circuit_factor = st.slider("Short Circuit Factor", 0.3, 3.0, shared('short_circuit_factor', 1.0), 0.1)
+        pdc_factor = st.slider("PDC Factor", 0.3, 3.0, shared('pdc_factor', 1.0), 0.1)
+        arc_flash_factor = st.slider("Arc Flash Factor", 0.3, 3.0, shared('arc_flash_factor', 1.0), 0.1)
     
     with rate_col3:
         st.markdown("**Additional Study Factors**")
-        harmonics_factor = st.slider("Harmonics Factor", 0.3, 3.0, 1.2, 0.1)
-        transient_factor = st.slider("Transient Factor", 0.3, 3.0, 1.3, 0.1)
-        urgency_multiplier = st.slider("Urgent Delivery Multiplier", 1.0, 3.0, 1.0, 0.1)
-        meeting_cost = st.number_input("Cost per Meeting (₹)", min_value=2000, max_value=25000, value=8000, step=500)
+        harmonics_factor = st.slider("Harmonics Factor", 0.3, 3.0, shared('harmonics_factor', 1.2), 0.1)
+        transient_factor = st.slider("Transient Factor", 0.3, 3.0, shared('transient_factor', 1.3), 0.1)
+        urgency_multiplier = st.slider("Urgent Delivery Multiplier", 1.0, 3.0, shared('urgency_multiplier', 1.0), 0.1)
+        meeting_cost = st.number_input("Cost per Meeting (₹)", min_value=2000, max_value=25000, value=card_rate('meeting_cost'), step=500)
 
     # Report Costs Section
     st.markdown("""
@@ -845,14 +758,14 @@ with st.container():
     report_col1, report_col2, report_col3 = st.columns(3)
     
     with report_col1:
-        load_flow_report_cost = st.number_input("Load Flow Report Cost (₹)", min_value=0, max_value=150000, value=8000, step=500)
-        short_circuit_report_cost = st.number_input("Short Circuit Report Cost (₹)", min_value=0, max_value=150000, value=10000, step=500)
+        load_flow_report_cost = st.number_input("Load Flow Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('load_flow_report_cost'), step=500)
+        short_circuit_report_cost = st.number_input("Short Circuit Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('short_circuit_report_cost'), step=500)
     with report_col2:
-        pdc_report_cost = st.number_input("PDC Report Cost (₹)", min_value=0, max_value=150000, value=15000, step=500)
-        arc_flash_report_cost = st.number_input("Arc Flash Report Cost (₹)", min_value=0, max_value=150000, value=12000, step=500)
+        pdc_report_cost = st.number_input("PDC Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('pdc_report_cost'), step=500)
+        arc_flash_report_cost = st.number_input("Arc Flash Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('arc_flash_report_cost'), step=500)
     with report_col3:
-        harmonics_report_cost = st.number_input("Harmonics Report Cost (₹)", min_value=0, max_value=150000, value=11000, step=500)
-        transient_report_cost = st.number_input("Transient Report Cost (₹)", min_value=0, max_value=150000, value=13000, step=500)
+        harmonics_report_cost = st.number_input("Harmonics Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('harmonics_report_cost'), step=500)
+        transient_report_cost = st.number_input("Transient Report Cost (₹)", min_value=0, max_value=150000, value=card_rate('transient_report_cost'), step=500)
 
     # Additional Services Section
     st.markdown("""
@@ -867,34 +780,34 @@ with st.container():
         custom_col1, custom_col2, custom_col3, custom_col4 = st.columns(4)
         
         with custom_col1:
-            site_visit_enabled = st.checkbox("Site Visits Required", value=True)
+            site_visit_enabled = st.checkbox("Site Visits Required", value=shared('site_visit_enabled', True))
             if site_visit_enabled:
-                site_visits = st.number_input("Number of Site Visits", min_value=0, max_value=20, value=2, step=1)
-                site_visit_cost = st.number_input("Cost per Site Visit (₹)", min_value=0, max_value=50000, value=12000, step=500)
+                site_visits = st.number_input("Number of Site Visits", min_value=0, max_value=20, value=shared('site_visits', 2), step=1)
+                site_visit_cost = st.number_input("Cost per Site Visit (₹)", min_value=0, max_value=50000, value=card_rate('site_visit_cost'), step=500)
             else:
                 site_visits = 0
                 site_visit_cost = 0
         
         with custom_col2:
-            af_labels_enabled = st.checkbox("Arc Flash Labels Required", value=False)
+            af_labels_enabled = st.checkbox("Arc Flash Labels Required", value=shared('af_labels_enabled', False))
             if af_labels_enabled:
-                num_labels = st.number_input("Number of Labels", min_value=0, max_value=500, value=50, step=1)
-                cost_per_label = st.number_input("Cost per Label (₹)", min_value=0, max_value=500, value=150, step=10)
+                num_labels = st.number_input("Number of Labels", min_value=0, max_value=500, value=shared('num_labels', 50), step=1)
+                cost_per_label = st.number_input("Cost per Label (₹)", min_value=0, max_value=500, value=card_rate('cost_per_label'), step=10)
             else:
                 num_labels = 0
                 cost_per_label = 0
         
         with custom_col3:
-            stickering_enabled = st.checkbox("Equipment Stickering Required", value=False)
+            stickering_enabled = st.checkbox("Equipment Stickering Required", value=shared('stickering_enabled', False))
             if stickering_enabled:
-                stickering_cost = st.number_input("Stickering Cost (₹)", min_value=0, max_value=100000, value=25000, step=1000)
+                stickering_cost = st.number_input("Stickering Cost (₹)", min_value=0, max_value=100000, value=shared('stickering_cost', 25000), step=1000)
             else:
                 stickering_cost = 0
         
         with custom_col4:
             st.markdown("**Custom Charges**")
-            custom_charges_desc = st.text_input("Description", value="Additional Services", placeholder="Enter description")
-            custom_charges_cost = st.number_input("Custom Charges (₹)", min_value=0, max_value=500000, value=0, step=1000)
+            custom_charges_desc = st.text_input("Description", value=shared('custom_charges_desc', "Additional Services"), placeholder="Enter description")
+            custom_charges_cost = st.number_input("Custom Charges (₹)", min_value=0, max_value=500000, value=shared('custom_charges_cost', 0), step=1000)
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -914,7 +827,7 @@ with st.container():
             st.markdown("**Custom Cost Item 1**")
             custom_cost_1_desc = st.text_area(
                 "Description/Remark (Editable)",
-                value="Custom Engineering Services",
+                value=shared('custom_cost_1_desc', "Custom Engineering Services"),
                 height=80,
                 key="custom_cost_1_desc"
             )
@@ -922,7 +835,7 @@ with st.container():
                 "Amount (₹)",
                 min_value=0,
                 max_value=1000000,
-                value=0,
+                value=shared('custom_cost_1_amount', 0),
                 step=1000,
                 key="custom_cost_1_amount"
             )
@@ -931,7 +844,7 @@ with st.container():
             st.markdown("**Custom Cost Item 2**")
             custom_cost_2_desc = st.text_area(
                 "Description/Remark (Editable)",
-                value="Specialized Testing & Validation",
+                value=shared('custom_cost_2_desc', "Specialized Testing & Validation"),
                 height=80,
                 key="custom_cost_2_desc"
             )
@@ -939,7 +852,7 @@ with st.container():
                 "Amount (₹)",
                 min_value=0,
                 max_value=1000000,
-                value=0,
+                value=shared('custom_cost_2_amount', 0),
                 step=1000,
                 key="custom_cost_2_amount"
             )
@@ -958,7 +871,7 @@ with st.container():
         
         scope_description = st.text_area(
             "Scope of Work (Editable)",
-            value="""This project includes comprehensive power system studies for a data center facility:
+            value=shared('scope_description', """This project includes comprehensive power system studies for a data center facility:
 
 • Complete electrical system modeling and analysis
 • Detailed study reports with recommendations
@@ -967,7 +880,7 @@ with st.container():
 • Arc flash hazard analysis and labeling
 • Compliance with IEEE, NFPA, and NEC standards
 
-All deliverables will be provided in digital format with professional documentation.""",
+All deliverables will be provided in digital format with professional documentation."""),
             height=200,
             help="Enter detailed scope description, exclusions, deliverables, and assumptions"
         )
@@ -984,6 +897,60 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Flat record of every costing input (same keys as batch pricing uses)
+quote_inputs = {
+    'project_name': project_name,
+    'tier_level': tier_level,
+    'it_capacity': it_capacity,
+    'mechanical_load': mechanical_load,
+    'house_load': house_load,
+    'delivery_type': delivery_type,
+    'report_complexity': report_complexity,
+    'client_meetings': client_meetings,
+    'customer_type': customer_type,
+    'repeat_discount': repeat_discount,
+    'custom_margin': custom_margin,
+    'pue': pue_value,
+    'bus_calibration': bus_calibration,
+    'ups_lineup': ups_lineup,
+    'transformer_mva': transformer_mva,
+    'lv_bus_mw': lv_bus_mw,
+    'pdu_mva': pdu_mva,
+    'power_factor': power_factor,
+    'redundancy_scheme': redundancy_scheme,
+    'model_type': model_type,
+    'hour_reduction': hour_reduction,
+    'senior': st.session_state.work_allocation['senior'],
+    'mid': st.session_state.work_allocation['mid'],
+    'junior': st.session_state.work_allocation['junior'],
+    'senior_rate': senior_rate,
+    'mid_rate': mid_rate,
+    'junior_rate': junior_rate,
+    'load_flow_factor': load_flow_factor,
+    'short_circuit_factor': short_circuit_factor,
+    'pdc_factor': pdc_factor,
+    'arc_flash_factor': arc_flash_factor,
+    'harmonics_factor': harmonics_factor,
+    'transient_factor': transient_factor,
+    'urgency_multiplier': urgency_multiplier,
+    'meeting_cost': meeting_cost,
+    'load_flow_report_cost': load_flow_report_cost,
+    'short_circuit_report_cost': short_circuit_report_cost,
+    'pdc_report_cost': pdc_report_cost,
+    'arc_flash_report_cost': arc_flash_report_cost,
+    'harmonics_report_cost': harmonics_report_cost,
+    'transient_report_cost': transient_report_cost,
+    'site_visits': site_visits,
+    'site_visit_cost': site_visit_cost,
+    'num_labels': num_labels,
+    'cost_per_label': cost_per_label,
+    'stickering_cost': stickering_cost,
+    'custom_charges_cost': custom_charges_cost,
+    'custom_cost_1_amount': custom_cost_1_amount,
+    'custom_cost_2_amount': custom_cost_2_amount,
+}
+quote_inputs.update(st.session_state.studies_selected)
+
 # Core load and bus calculations
 total_load = it_capacity + mechanical_load + house_load
 
@@ -999,16 +966,12 @@ estimated_buses = calculate_bus_count_accurate(
     lv_bus_mw=lv_bus_mw,
     pdu_mva=pdu_mva,
     power_factor=power_factor,
-    bus_calibration=bus_calibration
+    bus_calibration=bus_calibration,
+    redundancy=redundancy_scheme
 )
 
-# Study complexity factors (retuned)
-tier_complexity_factors = {
-    "Tier I": 1.0,
-    "Tier II": 1.15,
-    "Tier III": 1.3,
-    "Tier IV": 1.5,
-}
+# Study complexity factors (retuned, or fitted by calibration.py)
+tier_complexity_factors = coefficients['tier_complexity_factors']
 tier_complexity = tier_complexity_factors[tier_level]
 
 # Work allocation percentages
@@ -1016,103 +979,46 @@ senior_allocation = st.session_state.work_allocation['senior'] / 100
 mid_allocation = st.session_state.work_allocation['mid'] / 100
 junior_allocation = st.session_state.work_allocation['junior'] / 100
 
-# Study definitions (retuned base hours per bus)
+# Study definitions (base hours per bus from the active coefficient set)
 studies_data = {
     'load_flow': {
         'name': 'Load Flow Study',
-        'base_hours_per_bus': 0.25,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['load_flow'],
         'factor': load_flow_factor,
         'report_cost': load_flow_report_cost
     },
     'short_circuit': {
         'name': 'Short Circuit Study',
-        'base_hours_per_bus': 0.4,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['short_circuit'],
         'factor': short_circuit_factor,
         'report_cost': short_circuit_report_cost
     },
     'pdc': {
         'name': 'Protective Device Coordination',
-        'base_hours_per_bus': 0.7,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['pdc'],
         'factor': pdc_factor,
         'report_cost': pdc_report_cost
     },
     'arc_flash': {
         'name': 'Arc Flash Study',
-        'base_hours_per_bus': 0.6,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['arc_flash'],
         'factor': arc_flash_factor,
         'report_cost': arc_flash_report_cost
     },
     'harmonics': {
         'name': 'Harmonics Study',
-        'base_hours_per_bus': 0.65,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['harmonics'],
         'factor': harmonics_factor,
         'report_cost': harmonics_report_cost
     },
     'transient': {
         'name': 'Transient Analysis',
-        'base_hours_per_bus': 0.7,
+        'base_hours_per_bus': coefficients['base_hours_per_bus']['transient'],
         'factor': transient_factor,
         'report_cost': transient_report_cost
     }
 }
 
-# Calculate study costs with hour reduction
-total_study_hours = 0
-total_study_cost = 0
-total_report_cost = 0
-study_results = {}
-
-for study_key, study_data in studies_data.items():
-    if st.session_state.studies_selected.get(study_key, False):
-        base_study_hours = (
-            estimated_buses
-            * study_data['base_hours_per_bus']
-            * study_data['factor']
-            * tier_complexity
-        )
-        
-        if model_type == "ETAP Model Available":
-            study_hours = base_study_hours * (1 - hour_reduction / 100)
-            hours_saved = base_study_hours - study_hours
-        else:
-            study_hours = base_study_hours
-            hours_saved = 0
-        
-        total_study_hours += study_hours
-        
-        senior_hours = study_hours * senior_allocation
-        mid_hours = study_hours * mid_allocation
-        junior_hours = study_hours * junior_allocation
-        
-        rate_multiplier = urgency_multiplier if delivery_type == "Urgent" else 1.0
-        discount_multiplier = (1 - repeat_discount / 100) if customer_type == "Repeat Customer" else 1.0
-        
-        senior_cost = senior_hours * senior_rate * rate_multiplier * discount_multiplier
-        mid_cost = mid_hours * mid_rate * rate_multiplier * discount_multiplier
-        junior_cost = junior_hours * junior_rate * rate_multiplier * discount_multiplier
-        
-        study_total_cost = senior_cost + mid_cost + junior_cost
-        total_study_cost += study_total_cost
-        
-        report_multipliers = {"Basic": 0.8, "Standard": 1.0, "Premium": 1.5}
-        study_report_cost = study_data['report_cost'] * report_multipliers[report_complexity]
-        total_report_cost += study_report_cost
-        
-        study_results[study_key] = {
-            'name': study_data['name'],
-            'base_hours': base_study_hours,
-            'hours': study_hours,
-            'hours_saved': hours_saved,
-            'senior_hours': senior_hours,
-            'mid_hours': mid_hours,
-            'junior_hours': junior_hours,
-            'senior_cost': senior_cost,
-            'mid_cost': mid_cost,
-            'junior_cost': junior_cost,
-            'total_cost': study_total_cost,
-            'report_cost': study_report_cost
-        }
-
 # Additional costs
 total_site_visit_cost = site_visits * site_visit_cost if site_visit_enabled else 0
 total_label_cost = num_labels * cost_per_label if af_labels_enabled else 0
@@ -1126,58 +1032,79 @@ total_additional_costs = (
     + custom_cost_2_amount
 )
 
-subtotal = total_study_cost + total_meeting_cost + total_report_cost + total_additional_costs
-total_cost = subtotal * (1 + custom_margin / 100)
+# Calculate study hours and costs through the shared costing engine
+# (the same code batch runs use, so both reconcile)
+selected_row = [st.session_state.studies_selected.get(key, False) for key in STUDY_KEYS]
+base_hours_row, hours_row = calculate_study_hours_batch(
+    [estimated_buses],
+    [tier_level],
+    [selected_row],
+    [[studies_data[key]['factor'] for key in STUDY_KEYS]],
+    hour_reduction=hour_reduction if model_type == "ETAP Model Available" else 0,
+    coefficients=coefficients
+)
+grade_hours_row = split_grade_hours(
+    hours_row,
+    [st.session_state.work_allocation[grade] for grade in GRADES]
+)
+
+rate_multiplier = urgency_multiplier if delivery_type == "Urgent" else 1.0
+discount_multiplier = (1 - repeat_discount / 100) if customer_type == "Repeat Customer" else 1.0
+
+costs = calculate_costs_batch(
+    grade_hours_row,
+    [senior_rate, mid_rate, junior_rate],
+    rate_multiplier=rate_multiplier,
+    discount_multiplier=discount_multiplier,
+    report_costs=[studies_data[key]['report_cost'] if selected else 0 for key, selected in zip(STUDY_KEYS, selected_row)],
+    report_multiplier=REPORT_MULTIPLIERS[report_complexity],
+    meeting_costs=total_meeting_cost,
+    additional_costs=total_additional_costs,
+    custom_margin=custom_margin,
+    money_mode=money_mode
+)
+if money_mode == "paise":
+    total_cost_paise = int(costs['total_cost'][0])
+    costs = {name: from_paise(value) for name, value in costs.items()}
+
+total_study_hours = 0
+study_results = {}
+
+for idx, study_key in enumerate(STUDY_KEYS):
+    if selected_row[idx]:
+        study_hours = float(hours_row[0, idx])
+        total_study_hours += study_hours
+        study_results[study_key] = {
+            'name': studies_data[study_key]['name'],
+            'base_hours': float(base_hours_row[0, idx]),
+            'hours': study_hours,
+            'hours_saved': float(base_hours_row[0, idx] - hours_row[0, idx]),
+            'senior_hours': float(grade_hours_row[0, idx, 0]),
+            'mid_hours': float(grade_hours_row[0, idx, 1]),
+            'junior_hours': float(grade_hours_row[0, idx, 2]),
+            'senior_cost': float(costs['grade_costs'][0, idx, 0]),
+            'mid_cost': float(costs['grade_costs'][0, idx, 1]),
+            'junior_cost': float(costs['grade_costs'][0, idx, 2]),
+            'total_cost': float(costs['study_costs'][0, idx]),
+            'report_cost': float(costs['report_costs'][0, idx])
+        }
+
+total_study_cost = float(costs['total_study_cost'][0])
+total_report_cost = float(costs['total_report_cost'][0])
+subtotal = float(costs['subtotal'][0])
+total_cost = float(costs['total_cost'][0])
 
 total_hours_saved = sum(study['hours_saved'] for study in study_results.values())
 
 # Display Results
 if study_results:
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    with col1:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>Total Load</h3>
-            <p class="value">{total_load:.1f} MW</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>Bus Count</h3>
-            <p class="value">{estimated_buses}</p>
-            <p class="subtitle">buses</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>Total Hours</h3>
-            <p class="value">{total_study_hours:.0f}</p>
-            <p class="subtitle">engineering hours</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>Hours Saved</h3>
-            <p class="value">{total_hours_saved:.0f}</p>
-            <p class="subtitle">{model_type}</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col5:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>Customer Type</h3>
-            <p class="value">{customer_type.split()[0]}</p>
-            <p class="subtitle">{repeat_discount}% discount</p>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(result_cards.metric_row([
+        ("Total Load", f"{total_load:.1f} MW", ""),
+        ("Bus Count", estimated_buses, "buses"),
+        ("Total Hours", f"{total_study_hours:.0f}", "engineering hours"),
+        ("Hours Saved", f"{total_hours_saved:.0f}", model_type),
+        ("Customer Type", customer_type.split()[0], f"{repeat_discount}% discount"),
+    ]), unsafe_allow_html=True)
 
     if model_type == "ETAP Model Available" and total_hours_saved > 0:
         st.success(
@@ -1186,62 +1113,103 @@ if study_results:
         )
 
     st.markdown("### Study-wise Cost Analysis")
-    
-    for study_key, study in study_results.items():
-        reduction_info = ""
-        if study['hours_saved'] > 0:
-            reduction_info = (
-                f"<br><span style='color: #10b981; font-weight: 600;'>"
-                f"Hours Saved: {study['hours_saved']:.1f}h ({hour_reduction}% reduction)</span>"
-            )
-        
-        st.markdown(f"""
-        <div class="study-card">
-            <h4>{study['name']}</h4>
-            <p style="color: #94a3b8; margin: 0 0 1rem 0; font-weight: 500;">
-                {study['hours']:.1f} total engineering hours{reduction_info}
-            </p>
-            <div class="study-details">
-                <div class="study-detail-item">
-                    <strong>Senior Engineer:</strong> {study['senior_hours']:.1f}h × ₹{senior_rate:,}/hr = ₹{study['senior_cost']:,.0f}<br>
-                    <strong>Mid-level Engineer:</strong> {study['mid_hours']:.1f}h × ₹{mid_rate:,}/hr = ₹{study['mid_cost']:,.0f}<br>
-                    <strong>Junior Engineer:</strong> {study['junior_hours']:.1f}h × ₹{junior_rate:,}/hr = ₹{study['junior_cost']:,.0f}<br>
-                    <strong>Report Cost ({report_complexity}):</strong> ₹{study['report_cost']:,.0f}
-                </div>
-                <div class="cost-highlight">
-                    <p class="amount">₹{study['total_cost'] + study['report_cost']:,.0f}</p>
-                    <small>Total Study Cost</small>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(result_cards.study_cards(
+        list(study_results.values()),
+        (senior_rate, mid_rate, junior_rate),
+        report_complexity,
+        hour_reduction
+    ), unsafe_allow_html=True)
 
     # Resource allocation summary
-    st.markdown(f"""
-    <div class="results-container">
-        <h3 style="color: #3b82f6; text-align: center; margin-bottom: 2rem; font-weight: 700;">Resource Allocation Summary</h3>
-        <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 2rem; text-align: center;">
-            <div class="cost-category-card">
-                <h4 style="color: #06b6d4; margin: 0 0 0.5rem 0; font-weight: 700;">Senior Engineer</h4>
-                <p style="color: #3b82f6; font-size: 1.6rem; font-weight: 800; margin: 0.5rem 0;">{total_study_hours * senior_allocation:.0f} hrs</p>
-                <p style="color: #64748b; margin: 0; font-weight: 500;">Rate: ₹{senior_rate:,}/hr • {st.session_state.work_allocation['senior']:.1f}%</p>
-                <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Total: ₹{sum(study['senior_cost'] for study in study_results.values()):,.0f}</p>
-            </div>
-            <div class="cost-category-card">
-                <h4 style="color: #06b6d4; margin: 0 0 0.5rem 0; font-weight: 700;">Mid-level Engineer</h4>
-                <p style="color: #3b82f6; font-size: 1.6rem; font-weight: 800; margin: 0.5rem 0;">{total_study_hours * mid_allocation:.0f} hrs</p>
-                <p style="color: #64748b; margin: 0; font-weight: 500;">Rate: ₹{mid_rate:,}/hr • {st.session_state.work_allocation['mid']:.1f}%</p>
-                <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Total: ₹{sum(study['mid_cost'] for study in study_results.values()):,.0f}</p>
-            </div>
-            <div class="cost-category-card">
-                <h4 style="color: #06b6d4; margin: 0 0 0.5rem 0; font-weight: 700;">Junior Engineer</h4>
-                <p style="color: #3b82f6; font-size: 1.6rem; font-weight: 800; margin: 0.5rem 0;">{total_study_hours * junior_allocation:.0f} hrs</p>
-                <p style="color: #64748b; margin: 0; font-weight: 500;">Rate: ₹{junior_rate:,}/hr • {st.session_state.work_allocation['junior']:.1f}%</p>
-                <p style="color: #94a3b8; margin: 0.5rem 0 0 0;">Total: ₹{sum(study['junior_cost'] for study in study_results.values()):,.0f}</p>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(result_cards.resource_summary([
+        (label, total_study_hours * allocation, rate, st.session_state.work_allocation[grade],
+         sum(study[f'{grade}_cost'] for study in study_results.values()))
+        for grade, label, allocation, rate in [
+            ('senior', "Senior Engineer", senior_allocation, senior_rate),
+            ('mid', "Mid-level Engineer", mid_allocation, mid_rate),
+            ('junior', "Junior Engineer", junior_allocation, junior_rate),
+        ]
+    ]), unsafe_allow_html=True)
+
+    # Delivery schedule (resource-constrained)
+    st.markdown("### Delivery Schedule")
+    sched_col1, sched_col2, sched_col3, sched_col4 = st.columns(4)
+    with sched_col1:
+        schedule_start = st.date_input("Project Start Date", value=datetime.date.today(), key="schedule_start")
+    with sched_col2:
+        senior_headcount = st.number_input("Senior Engineers", min_value=1, max_value=50, value=2, step=1, key="senior_headcount")
+    with sched_col3:
+        mid_headcount = st.number_input("Mid-level Engineers", min_value=1, max_value=50, value=3, step=1, key="mid_headcount")
+    with sched_col4:
+        junior_headcount = st.number_input("Junior Engineers", min_value=1, max_value=50, value=4, step=1, key="junior_headcount")
+
+    team_headcount = {'senior': senior_headcount, 'mid': mid_headcount, 'junior': junior_headcount}
+    delivery_schedule = schedule_project(
+        study_results,
+        headcount=team_headcount,
+        start_date=schedule_start,
+        # Urgent jobs put the whole team of each grade on a study instead of one engineer
+        crew_per_grade=team_headcount if delivery_type == "Urgent" else None
+    )
+    st.info(
+        f"📅 **Estimated completion: {delivery_schedule['completion_date'].strftime('%d %b %Y')}** "
+        f"({delivery_schedule['lead_time_days']} working days, {delivery_type} delivery)"
+    )
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Study': study_results[key]['name'],
+                'Start': entry['start'],
+                'Finish': entry['finish'],
+                'Working Days': round(entry['working_days'], 1),
+            }
+            for key, entry in delivery_schedule['studies'].items()
+        ]),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    # Monthly cash flow with rate escalation
+    st.markdown("### Cash Flow Projection")
+    esc_col1, esc_col2, esc_col3 = st.columns(3)
+    with esc_col1:
+        senior_escalation = st.number_input("Senior Escalation (%/yr)", min_value=0.0, max_value=25.0,
+                                            value=DEFAULT_ESCALATION['senior'] * 100, step=0.5, key="senior_escalation")
+    with esc_col2:
+        mid_escalation = st.number_input("Mid-level Escalation (%/yr)", min_value=0.0, max_value=25.0,
+                                         value=DEFAULT_ESCALATION['mid'] * 100, step=0.5, key="mid_escalation")
+    with esc_col3:
+        junior_escalation = st.number_input("Junior Escalation (%/yr)", min_value=0.0, max_value=25.0,
+                                            value=DEFAULT_ESCALATION['junior'] * 100, step=0.5, key="junior_escalation")
+
+    flow = cash_flow(
+        [dict(quote_inputs, start_date=schedule_start)],
+        coefficients,
+        escalation={'senior': senior_escalation / 100, 'mid': mid_escalation / 100, 'junior': junior_escalation / 100},
+    )
+    flow_months = flow['months'].astype('datetime64[D]')
+    flow_fig = go.Figure()
+    flow_fig.add_trace(go.Bar(x=flow_months, y=flow['cost'][0], name="Cost", marker_color="#ef4444",
+                              hovertemplate="₹%{y:,.0f}"))
+    flow_fig.add_trace(go.Bar(x=flow_months, y=flow['billing'][0], name="Billing", marker_color="#22c55e",
+                              hovertemplate="₹%{y:,.0f}"))
+    flow_fig.add_trace(go.Scatter(x=flow_months, y=np.cumsum(flow['billing'][0] - flow['cost'][0]),
+                                  name="Cash Position", line=dict(color="#f59e0b", width=2), hovertemplate="₹%{y:,.0f}"))
+    flow_fig.update_layout(
+        template="plotly_dark",
+        barmode="group",
+        hovermode="x unified",
+        height=340,
+        margin=dict(l=10, r=10, t=30, b=10),
+        yaxis=dict(title="₹ per month"),
+    )
+    st.plotly_chart(flow_fig, use_container_width=True)
+    escalation_uplift = float(flow['escalation_uplift'][0])
+    if escalation_uplift > 0.5:
+        st.caption(f"Rate escalation over the {len(flow_months)}-month schedule adds ₹{escalation_uplift:,.0f} "
+                   f"to the contract value (₹{float(flow['contract_value'][0]):,.0f} escalated).")
+    else:
+        st.caption(f"The schedule fits inside the first rate year; no escalation applies over {len(flow_months)} month(s).")
 
     # Cost distribution chart
     st.markdown("### Cost Distribution Analysis")
@@ -1286,99 +1254,127 @@ if study_results:
     
     st.bar_chart(chart_data.set_index('Component'))
 
-    # Summary section header
-    st.markdown("""
-    <div class="summary-section">
-        <h2 style="color: #f1f5f9; text-align: center; margin-bottom: 2rem; font-weight: 800;">
-            Complete Project Cost Summary
-        </h2>
-    </div>
-    """, unsafe_allow_html=True)
+    # What-if response surface (scrubbed client-side, no reruns)
+    st.markdown("### What-If Response Surface")
+    show_surface = st.checkbox(
+        "Enable instant scrubbing over IT capacity and calibration",
+        value=False,
+        key="show_surface",
+        help="Precomputes total cost and bus count for every IT MW step (0-200 MW) at every calibration step. "
+             "Hover the charts to scrub; the surface is only recomputed when another input changes."
+    )
+    if show_surface:
+        fixed_inputs = {k: v for k, v in quote_inputs.items() if k not in SCRUBBED_INPUTS}
+        surface_cost, surface_buses = track_cache(
+            "response_surface", _cached_response_surface, fixed_inputs, coefficients, money_mode
+        )
+        cal_idx = int(np.abs(CALIBRATION_STEPS - bus_calibration).argmin())
+        it_idx = int(np.abs(IT_CAPACITY_STEPS - it_capacity).argmin())
+
+        surface_fig = go.Figure()
+        surface_fig.add_trace(go.Scattergl(
+            x=IT_CAPACITY_STEPS, y=surface_cost[cal_idx], name="Total Cost (₹)",
+            line=dict(color="#3b82f6", width=2), hovertemplate="₹%{y:,.0f}"
+        ))
+        surface_fig.add_trace(go.Scattergl(
+            x=IT_CAPACITY_STEPS, y=surface_buses[cal_idx], name="Bus Count", yaxis="y2",
+            line=dict(color="#06b6d4", width=1, shape="hv"), hovertemplate="%{y} buses"
+        ))
+        surface_fig.add_vline(x=it_capacity, line_dash="dot", line_color="#f59e0b")
+        surface_fig.update_layout(
+            template="plotly_dark",
+            hovermode="x unified",
+            height=380,
+            margin=dict(l=10, r=10, t=40, b=10),
+            title=f"Total cost vs IT capacity (calibration {CALIBRATION_STEPS[cal_idx]:.2f}x)",
+            xaxis=dict(title="IT Capacity (MW)"),
+            yaxis=dict(title="Total Cost (₹)"),
+            yaxis2=dict(title="Bus Count", overlaying="y", side="right", showgrid=False),
+            legend=dict(orientation="h", y=-0.2)
+        )
+        st.plotly_chart(surface_fig, use_container_width=True)
+
+        calibration_fig = go.Figure(go.Scatter(
+            x=CALIBRATION_STEPS, y=surface_cost[:, it_idx], name="Total Cost (₹)",
+            customdata=surface_buses[:, it_idx], line=dict(color="#8b5cf6", width=2),
+            hovertemplate="₹%{y:,.0f} • %{customdata} buses<extra></extra>"
+        ))
+        calibration_fig.add_vline(x=bus_calibration, line_dash="dot", line_color="#f59e0b")
+        calibration_fig.update_layout(
+            template="plotly_dark",
+            hovermode="x",
+            height=300,
+            margin=dict(l=10, r=10, t=40, b=10),
+            title=f"Total cost vs calibration ({IT_CAPACITY_STEPS[it_idx]:.1f} MW IT)",
+            xaxis=dict(title="Calibration Multiplier"),
+            yaxis=dict(title="Total Cost (₹)")
+        )
+        st.plotly_chart(calibration_fig, use_container_width=True)
+
+    # Calibration suggested by the nearest past projects
+    st.markdown("### Similar Past Projects")
+    if os.path.exists(HISTORY_PATH):
+        try:
+            similar_index = track_cache(
+                "similar_quotes", _similar_quote_index, HISTORY_PATH, os.path.getmtime(HISTORY_PATH)
+            )
+        except (KeyError, ValueError) as exc:
+            similar_index = None
+            st.warning(f"⚠️ Could not index {HISTORY_PATH}: {exc}")
+        if similar_index is not None:
+            neighbours = similar_index.query(quote_inputs)
+            suggested_calibration = similar_index.suggest_calibration(neighbours)
+            similar_col1, similar_col2 = st.columns([1, 3])
+            with similar_col1:
+                if suggested_calibration is not None:
+                    st.metric(
+                        "Suggested Calibration",
+                        f"{suggested_calibration:.2f}x",
+                        delta=f"{suggested_calibration - bus_calibration:+.2f} vs current",
+                        delta_color="off"
+                    )
+                    if suggested_calibration != bus_calibration and st.button("Apply Suggestion", key="apply_calibration"):
+                        # A new default re-creates the (keyless) slider at the suggested value
+                        st.session_state.shared_inputs = dict(shared_inputs, bus_calibration=suggested_calibration)
+                        finish_rerun()
+                        st.rerun()
+                st.caption(f"{len(neighbours)} nearest of {len(similar_index):,} past projects")
+            with similar_col2:
+                st.dataframe(
+                    neighbours.style.format({
+                        'it_capacity': "{:.1f}", 'mechanical_load': "{:.1f}", 'house_load': "{:.1f}",
+                        'actual_buses': "{:.0f}", 'final_price': "₹{:,.0f}",
+                        'implied_calibration': "{:.2f}x", 'distance': "{:.2f}",
+                    }, na_rep="—"),
+                    hide_index=True,
+                    use_container_width=True
+                )
+    else:
+        st.caption(
+            f"Add completed projects to {HISTORY_PATH} (or set DC_HISTORY_PATH) to see the most similar "
+            "past projects and a calibration suggested from their actual bus counts."
+        )
 
-    # Studies breakdown grid
+    # Summary section header and studies breakdown grid
     st.markdown("#### Studies Breakdown")
-    studies_cols = st.columns(len(study_results))
-    
-    for idx, (study_key, study) in enumerate(study_results.items()):
-        with studies_cols[idx]:
-            st.markdown(f"""
-            <div class="cost-category-card">
-                <h5 style="color: #f1f5f9; margin: 0 0 0.8rem 0; font-weight: 600;">{study['name']}</h5>
-                <p style="color: #cbd5e1; margin: 0.2rem 0; font-size: 0.85rem;">Engineering: ₹{study['total_cost']:,.0f}</p>
-                <p style="color: #cbd5e1; margin: 0.2rem 0; font-size: 0.85rem;">Report: ₹{study['report_cost']:,.0f}</p>
-                <p style="color: #3b82f6; margin: 0.5rem 0 0 0; font-weight: 700;">Total: ₹{study['total_cost'] + study['report_cost']:,.0f}</p>
-            </div>
-            """, unsafe_allow_html=True)
+    st.markdown(result_cards.studies_breakdown(list(study_results.values())), unsafe_allow_html=True)
 
     st.markdown("#### Additional Services Status")
-    
-    services_col1, services_col2, services_col3, services_col4 = st.columns(4)
-    
-    with services_col1:
-        if site_visit_enabled:
-            st.success(f"✅ Site Visits: {site_visits} visits × ₹{site_visit_cost:,} = ₹{total_site_visit_cost:,}")
-        else:
-            st.error("❌ Site Visits: Not included in scope")
-    
-    with services_col2:
-        if af_labels_enabled:
-            st.success(f"✅ Arc Flash Labels: {num_labels} labels × ₹{cost_per_label:,} = ₹{total_label_cost:,}")
-        else:
-            st.error("❌ Arc Flash Labels: Hardcopy labels not in our scope")
-    
-    with services_col3:
-        if stickering_enabled:
-            st.success(f"✅ Equipment Stickering: ₹{stickering_cost:,}")
-        else:
-            st.error("❌ Equipment Stickering: Not included in our scope")
-    
-    with services_col4:
-        if custom_charges_cost > 0 or custom_cost_1_amount > 0 or custom_cost_2_amount > 0:
-            total_custom_display = custom_charges_cost + custom_cost_1_amount + custom_cost_2_amount
-            st.success(f"✅ Custom Charges: ₹{total_custom_display:,}")
-        else:
-            st.info("ℹ️ No custom charges added")
+    st.markdown(result_cards.services_status(services_status(dict(
+        quote_inputs,
+        site_visit_enabled=site_visit_enabled,
+        af_labels_enabled=af_labels_enabled,
+        stickering_enabled=stickering_enabled,
+    ))), unsafe_allow_html=True)
 
     # Final Cost Summary Grid
     st.markdown("#### Final Cost Summary")
-    
-    summary_col1, summary_col2, summary_col3, summary_col4 = st.columns(4)
-    
-    with summary_col1:
-        st.markdown(f"""
-        <div class="cost-category-card">
-            <h4 style="color: #3b82f6; margin: 0; font-weight: 700;">Studies</h4>
-            <p style="color: #f1f5f9; font-size: 1.4rem; font-weight: 700; margin: 0.5rem 0;">₹{total_study_cost:,.0f}</p>
-            <p style="color: #64748b; margin: 0; font-size: 0.8rem;">Engineering Services</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with summary_col2:
-        st.markdown(f"""
-        <div class="cost-category-card">
-            <h4 style="color: #06b6d4; margin: 0; font-weight: 700;">Reports</h4>
-            <p style="color: #f1f5f9; font-size: 1.4rem; font-weight: 700; margin: 0.5rem 0;">₹{total_report_cost:,.0f}</p>
-            <p style="color: #64748b; margin: 0; font-size: 0.8rem;">{report_complexity} Format</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with summary_col3:
-        st.markdown(f"""
-        <div class="cost-category-card">
-            <h4 style="color: #8b5cf6; margin: 0; font-weight: 700;">Meetings</h4>
-            <p style="color: #f1f5f9; font-size: 1.4rem; font-weight: 700; margin: 0.5rem 0;">₹{total_meeting_cost:,.0f}</p>
-            <p style="color: #64748b; margin: 0; font-size: 0.8rem;">{client_meetings} Sessions</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with summary_col4:
-        st.markdown(f"""
-        <div class="cost-category-card">
-            <h4 style="color: #ec4899; margin: 0; font-weight: 700;">Additional</h4>
-            <p style="color: #f1f5f9; font-size: 1.4rem; font-weight: 700; margin: 0.5rem 0;">₹{total_additional_costs:,.0f}</p>
-            <p style="color: #64748b; margin: 0; font-size: 0.8rem;">Extra Services</p>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(result_cards.cost_summary([
+        ("Studies", "#3b82f6", total_study_cost, "Engineering Services"),
+        ("Reports", "#06b6d4", total_report_cost, f"{report_complexity} Format"),
+        ("Meetings", "#8b5cf6", total_meeting_cost, f"{client_meetings} Sessions"),
+        ("Additional", "#ec4899", total_additional_costs, "Extra Services"),
+    ]), unsafe_allow_html=True)
 
     # Cost Breakdown
     breakdown_col1, breakdown_col2, breakdown_col3 = st.columns(3)
@@ -1393,19 +1389,248 @@ if study_results:
         st.info(f"**Discount Applied:** {repeat_discount}%")
 
     # FINAL TOTAL
-    st.markdown(f"""
-    <div class="final-total-section">
-        <h1 style="color: white; margin: 0; font-weight: 800; font-size: 2rem;">TOTAL PROJECT COST</h1>
-        <p style="color: white; font-size: 3.5rem; font-weight: 900; margin: 1rem 0;">₹{total_cost:,.0f}</p>
-        <p style="color: rgba(255,255,255,0.9); font-size: 1.1rem; margin: 0; font-weight: 500;">
-            {project_name} | {tier_level} Data Center | {customer_type} | {model_type}
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(result_cards.final_total(
+        total_cost,
+        f"{project_name} | {tier_level} Data Center | {customer_type} | {model_type}"
+    ), unsafe_allow_html=True)
+    if rate_card.currency != BASE_CURRENCY:
+        st.info(f"💱 **{rate_card.currency} {total_cost / card_to_inr:,.0f}** at the {rate_card.label} FX rate"
+                + (" (priced with the clamped rates above)" if clamped_rates else ""))
+
+    # Formal quote document, rendered on the background worker pool
+    st.markdown("#### Quote Document")
+    quote_record = {
+        'project_name': project_name,
+        'tier_level': tier_level,
+        'customer_type': customer_type,
+        'model_type': model_type,
+        'delivery_type': delivery_type,
+        'report_complexity': report_complexity,
+        'it_capacity': it_capacity,
+        'mechanical_load': mechanical_load,
+        'house_load': house_load,
+        'estimated_buses': estimated_buses,
+        'scope_description': scope_description,
+        'study_results': study_results,
+        'services': [
+            ("Site Visits", site_visit_enabled, f"{site_visits} visits x Rs. {site_visit_cost:,} = Rs. {total_site_visit_cost:,}"),
+            ("Arc Flash Labels", af_labels_enabled, f"{num_labels} labels x Rs. {cost_per_label:,} = Rs. {total_label_cost:,}"),
+            ("Equipment Stickering", stickering_enabled, f"Rs. {stickering_cost:,}"),
+            ("Custom Charges", custom_charges_cost + custom_cost_1_amount + custom_cost_2_amount > 0,
+             f"Rs. {custom_charges_cost + custom_cost_1_amount + custom_cost_2_amount:,}"),
+        ],
+        'totals': {
+            'total_study_cost': total_study_cost,
+            'total_report_cost': total_report_cost,
+            'total_meeting_cost': total_meeting_cost,
+            'total_additional_costs': total_additional_costs,
+            'subtotal': subtotal,
+            'margin_percent': custom_margin,
+            'discount_percent': repeat_discount if customer_type == "Repeat Customer" else 0,
+            'total_cost': total_cost,
+        },
+        'generated_at': datetime.datetime.now().strftime("%d %b %Y %H:%M"),
+    }
+
+    pdf_col1, pdf_col2 = st.columns([1, 2])
+    with pdf_col1:
+        if st.button("📄 Generate PDF Quote", key="generate_pdf"):
+            job_id = f"{time.time_ns():x}"
+            pdf_jobs = _pdf_jobs()
+            if st.session_state.pdf_job is not None:
+                # Superseded: nothing can reach this session's previous PDF any more
+                previous = pdf_jobs.pop(st.session_state.pdf_job['id'], None)
+                if previous is not None:
+                    previous.cancel()
+            pdf_jobs[job_id] = submit_quote_pdf(quote_record)
+            while len(pdf_jobs) > MAX_PDF_JOBS:
+                pdf_jobs.popitem(last=False)
+            st.session_state.pdf_job = {
+                'id': job_id,
+                'inputs': dict(quote_inputs),
+                'file_name': f"{safe_filename(project_name)}_quote.pdf",
+                'submitted': time.time(),
+            }
+
+    def _pdf_job_panel():
+        job = st.session_state.pdf_job
+        future = _pdf_jobs().get(job['id']) if job else None
+        if future is None:
+            st.caption("Renders the full quote (scope, study costs, services, total) in the background.")
+        elif not future.done():
+            st.status(f"Rendering PDF on the worker pool… ({time.time() - job['submitted']:.0f}s)", state="running")
+        elif future.exception() is not None:
+            st.error(f"PDF generation failed: {future.exception()}")
+        else:
+            if job.get('polling'):
+                # Finished while polling: one full rerun swaps the progress bar for the download
+                job['polling'] = False
+                st.rerun()
+            st.download_button(
+                "⬇️ Download PDF Quote",
+                data=future.result(),
+                file_name=job['file_name'],
+                mime="application/pdf",
+                key="download_pdf"
+            )
+            if job['inputs'] != quote_inputs:
+                st.caption("⚠️ Inputs changed since this PDF was generated; generate again for the current quote.")
+
+    with pdf_col2:
+        job = st.session_state.pdf_job
+        pending = job is not None and job['id'] in _pdf_jobs() and not _pdf_jobs()[job['id']].done()
+        fragment = getattr(st, "fragment", None)
+        if pending and fragment is not None:
+            job['polling'] = True
+            fragment(run_every=1.0)(_pdf_job_panel)()
+        else:
+            _pdf_job_panel()
+            if pending:
+                st.button("Check PDF Progress", key="check_pdf")
 
 else:
     st.warning("⚠️ Please select at least one study type to generate cost estimates.")
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# SHARE LINK
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Everything needed to reproduce this screen, including the widgets that only
+# affect layout or free text
+share_inputs = dict(
+    quote_inputs,
+    use_custom_blocks=use_custom_blocks,
+    exact_money=exact_money,
+    site_visit_enabled=site_visit_enabled,
+    af_labels_enabled=af_labels_enabled,
+    stickering_enabled=stickering_enabled,
+    custom_charges_desc=custom_charges_desc,
+    custom_cost_1_desc=custom_cost_1_desc,
+    custom_cost_2_desc=custom_cost_2_desc,
+    scope_description=scope_description,
+)
+
+with st.expander("🔗 Share This Quote"):
+    try:
+        share_token = share_state.encode_state(share_inputs)
+    except ValueError as exc:
+        share_token = None
+        st.warning(f"⚠️ {exc}")
+    if share_token is not None:
+        page_url = (getattr(st.context, "url", None) or "").split("?")[0]
+        share_url = f"{page_url}?{share_state.QUERY_PARAM}={share_token}"
+        st.code(share_url, language=None)
+        st.caption(
+            f"The link carries every input ({len(share_token):,} characters, nothing stored on the server). "
+            "Opening it restores this quote in one step."
+        )
+        st.markdown("**Read-only link** (results only, no inputs; for reviewers and clients)")
+        st.code(viewer_url(page_url, share_token), language=None)
+        if st.button("Put Link in Address Bar", key="share_link"):
+            # Record it as applied so this session doesn't restore over live edits
+            st.session_state.shared_token = share_token
+            st.query_params[share_state.QUERY_PARAM] = share_token
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# AUDIT LOG
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@st.cache_resource
+def _audit_log_writer():
+    # One background writer (and segment file) per server process; DC_AUDIT_DIR="" turns logging off
+    note_cache_miss()
+    return AuditLogWriter() if AUDIT_DIR else None
+
+audit_writer = track_cache("audit_log", _audit_log_writer)
+if audit_writer is not None:
+    # Log each distinct computed quote once, not every rerun that leaves it unchanged
+    audit_signature = (tuple(share_inputs.items()), coefficients.get('version'))
+    if st.session_state.get('audited_quote') != audit_signature:
+        if audit_writer.log(share_inputs, estimated_buses, study_results, total_cost, coefficients):
+            st.session_state.audited_quote = audit_signature
+    if audit_writer.error:
+        st.warning(f"⚠️ {audit_writer.error}")
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SCENARIO COMPARISON WORKSPACE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+st.markdown("""
+<div class="section-header">
+    <h2>🧪 Scenario Comparison Workspace</h2>
+</div>
+""", unsafe_allow_html=True)
+
+scenario_col1, scenario_col2, scenario_col3 = st.columns([2, 1, 1])
+
+with scenario_col1:
+    scenario_name = st.text_input(
+        "Scenario Name",
+        # No key: the suggested name follows the inputs until the user edits it
+        value=f"{tier_level} | {model_type} | {delivery_type}"
+    )
+
+with scenario_col2:
+    st.markdown("&nbsp;")
+    if st.button("Save Current Inputs as Scenario", key="save_scenario"):
+        save_scenario(st.session_state.scenarios, scenario_name.strip() or f"Scenario {len(st.session_state.scenarios) + 1}", quote_inputs)
+
+with scenario_col3:
+    st.markdown("&nbsp;")
+    if st.button("Clear All Scenarios", key="clear_scenarios"):
+        st.session_state.scenarios = {}
+
+# Only scenarios whose inputs (or coefficients/money mode) changed are re-priced, all in one batch
+scenarios_recomputed = refresh_scenarios(st.session_state.scenarios, coefficients, money_mode)
+for _ in range(len(st.session_state.scenarios) - scenarios_recomputed):
+    record_cache("scenarios", hit=True)
+for _ in range(scenarios_recomputed):
+    record_cache("scenarios", hit=False)
+
+if st.session_state.scenarios:
+    compared = st.multiselect(
+        "Scenarios to Compare",
+        list(st.session_state.scenarios),
+        default=list(st.session_state.scenarios)
+    )
+    compared_scenarios = {name: st.session_state.scenarios[name] for name in compared}
+
+    if compared_scenarios:
+        input_diff, scenario_outputs = comparison_table(compared_scenarios)
+
+        if not input_diff.empty:
+            st.markdown("#### Inputs That Differ")
+            st.dataframe(input_diff, use_container_width=True)
+
+        st.markdown("#### Results Side by Side")
+        st.dataframe(scenario_outputs.style.format("{:,.0f}", na_rep="—"), use_container_width=True)
+
+        scenario_fig = go.Figure()
+        for name, scenario in compared_scenarios.items():
+            studies = scenario['results']['study_results']
+            scenario_fig.add_trace(go.Bar(
+                name=name,
+                x=[study['name'] for study in studies.values()] + ['Total Project Cost'],
+                y=[study['total_cost'] + study['report_cost'] for study in studies.values()] + [scenario['results']['total_cost']],
+                hovertemplate="%{x}: ₹%{y:,.0f}<extra>" + name + "</extra>"
+            ))
+        scenario_fig.update_layout(
+            template="plotly_dark",
+            barmode="group",
+            height=400,
+            margin=dict(l=10, r=10, t=30, b=10),
+            yaxis=dict(title="Cost (₹)"),
+            legend=dict(orientation="h", y=-0.25)
+        )
+        st.plotly_chart(scenario_fig, use_container_width=True)
+
+    st.caption(
+        f"{len(st.session_state.scenarios)} scenario(s) saved • "
+        f"{scenarios_recomputed} recalculated this rerun in one batched evaluation"
+    )
+else:
+    st.info("Save the current inputs as a scenario, change inputs, and save again to compare side by side.")
+
 # Footer
 current_time = datetime.datetime.now()
 
@@ -1428,3 +1653,4 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+finish_rerun()
@@ -0,0 +1,480 @@
+"""
+Append-only binary audit log of every computed quote, with a replay tool that
+re-prices logged quotes against the current engine.
+
+Each app process writes its own segment file under DC_AUDIT_DIR
+('<started>-<pid>.dclog'), so processes never interleave. A segment is a
+header followed by length-prefixed frames:
+
+    header      b"DCAUDIT\\0", format version (u16), share schema version (u16)
+    frame       kind (u8), payload length (u32), payload
+    record      kind 1: fixed-layout struct (timestamp, engine and coefficient
+                fingerprints, estimated_buses, per-study hours / cost / report
+                cost, total_cost, then every input: choices as u8 codes,
+                numbers and flags in their own widths), followed by the free
+                text fields as u16-length-prefixed UTF-8, raw-deflated
+    checkpoint  kind 2: record count and CRC-32 of every byte since the
+                previous checkpoint (or the header)
+
+The input fields and their order are share_state's schema for the header's
+version, so the log holds exactly what a share link would. Records are
+queued and written by a background thread, so a rerun only pays for a queue
+put; a checkpoint closes every batch the thread writes (at most
+CHECKPOINT_RECORDS records). A torn tail after a crash fails no checkpoint;
+replay reports those records as unverified.
+
+Replay walks the frames, gathers the fixed parts of a whole chunk of records
+into one structured array and prices the chunk with price_quotes(), so
+millions of records verify in seconds.
+
+Usage:
+    python audit_log.py replay audit-log/ --show 20
+    python audit_log.py info audit-log/
+    python audit_log.py show audit-log/20250101-120000-4242.dclog 17
+"""
+
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import cost_engine
+from cost_engine import STUDY_KEYS, load_coefficients, price_quotes
+from money import from_paise
+from share_state import SCHEMAS, SHARE_VERSION
+
+AUDIT_DIR = os.environ.get("DC_AUDIT_DIR", "audit-log")
+SEGMENT_SUFFIX = ".dclog"
+
+MAGIC = b"DCAUDIT\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sHH")
+_FRAME = struct.Struct("<BI")
+_CHECKPOINT = struct.Struct("<II")
+_TEXT_LENGTH = struct.Struct("<H")
+RECORD, CHECKPOINT = 1, 2
+
+# Records per checkpoint at most (a checkpoint also closes every written batch)
+CHECKPOINT_RECORDS = 1024
+
+# Records decoded and re-priced per replay step
+REPLAY_CHUNK = 200_000
+
+# Float mode reconciles to the paisa; exact-paise records must match exactly
+COST_TOLERANCE = 0.005
+
+
+def _fingerprint(data):
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def engine_fingerprint():
+    """Hash of the costing engine's source: changes whenever a formula does."""
+    with open(cost_engine.__file__, "rb") as fh:
+        return _fingerprint(fh.read())
+
+
+def coefficients_fingerprint(coefficients):
+    return _fingerprint(json.dumps(coefficients, sort_keys=True, default=str).encode("utf-8"))
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RECORD LAYOUT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_INPUT_DTYPES = {bool: "u1", int: "<i4", float: "<f8"}
+
+
+def record_layout(version):
+    """
+    Fixed-part dtype and the free-text field names for a share schema version.
+    Returns:
+        tuple: (np.dtype, [text field names])
+    """
+    fields = [
+        ("timestamp", "<f8"),
+        ("engine", "S8"),
+        ("coefficients", "S8"),
+        ("coefficients_version", "<i4"),
+        ("estimated_buses", "<i4"),
+        ("study_hours", "<f8", (len(STUDY_KEYS),)),
+        ("study_cost", "<f8", (len(STUDY_KEYS),)),
+        ("report_cost", "<f8", (len(STUDY_KEYS),)),
+        ("total_cost", "<f8"),
+    ]
+    text = []
+    for name, kind, spec in SCHEMAS[version]:
+        if kind is str and spec is None:
+            text.append(name)
+        else:
+            fields.append((f"in_{name}", "u1" if kind is str else _INPUT_DTYPES[kind]))
+    return np.dtype(fields), text
+
+
+def encode_record(inputs, outputs, version=SHARE_VERSION):
+    """
+    One record payload. inputs: every share_state field; outputs:
+    timestamp, engine, coefficients, coefficients_version, estimated_buses,
+    study_hours, study_cost, report_cost (per STUDY_KEYS) and total_cost.
+    """
+    dtype, text = record_layout(version)
+    fixed = np.zeros(1, dtype=dtype)
+    for name, value in outputs.items():
+        fixed[name] = value
+    for name, kind, spec in SCHEMAS[version]:
+        if kind is str and spec is not None:
+            fixed[f"in_{name}"] = spec.index(inputs[name])
+        elif not (kind is str):
+            fixed[f"in_{name}"] = inputs[name]
+    parts = []
+    for name in text:
+        encoded = str(inputs[name]).encode("utf-8")[:0xFFFF]
+        parts.append(_TEXT_LENGTH.pack(len(encoded)) + encoded)
+    deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return fixed.tobytes() + deflate.compress(b"".join(parts)) + deflate.flush()
+
+
+def decode_record(segment, index):
+    """
+    One record in full (inputs including free text, and logged outputs),
+    for inspecting a disputed quote.
+    Returns:
+        dict
+    """
+    dtype, text = record_layout(segment["version"])
+    start = int(segment["starts"][index])
+    _, length = _FRAME.unpack_from(segment["data"], start - _FRAME.size)
+    fixed = np.frombuffer(segment["data"], dtype=dtype, count=1, offset=start)
+    record = fixed_to_quotes(fixed, segment["version"]).iloc[0].to_dict()
+    blob = zlib.decompress(segment["data"][start + dtype.itemsize:start + length], -15)
+    pos = 0
+    for name in text:
+        (size,) = _TEXT_LENGTH.unpack_from(blob, pos)
+        record[name] = blob[pos + _TEXT_LENGTH.size:pos + _TEXT_LENGTH.size + size].decode("utf-8")
+        pos += _TEXT_LENGTH.size + size
+    for name in ("estimated_buses", "total_cost", "coefficients_version"):
+        record[name] = fixed[name][0].item()
+    for name in ("study_hours", "study_cost", "report_cost"):
+        record.update({f"{name}_{key}": float(value) for key, value in zip(STUDY_KEYS, fixed[name][0])})
+    record["logged_at"] = datetime.datetime.fromtimestamp(fixed["timestamp"][0]).isoformat(timespec="seconds")
+    record["engine"] = fixed["engine"][0].hex()
+    record["verified"] = bool(segment["verified"][index])
+    return record
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WRITER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AuditLogWriter:
+    """
+    Background writer for one segment file. log() only queues; the thread
+    encodes, appends and checkpoints. One instance per process.
+
+    error holds the latest problem: a malformed record (skipped, logging
+    continues) or an OSError such as an unwritable directory or a full disk,
+    which stops the writer. Once stopped, log() refuses new records instead
+    of queueing them forever.
+    """
+
+    def __init__(self, directory=AUDIT_DIR, version=SHARE_VERSION):
+        self.directory = directory
+        self.version = version
+        self.path = os.path.join(
+            directory, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}{SEGMENT_SUFFIX}"
+        )
+        self.records = 0
+        self.error = None
+        self.stopped = False
+        self._queue = queue.Queue()
+        self._engine = engine_fingerprint()
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def log(self, inputs, estimated_buses, study_results, total_cost, coefficients):
+        """
+        Queue one computed quote (app.py's share_inputs, study_results and total).
+        Returns:
+            bool: False if the writer has stopped and the quote was not logged
+        """
+        if self.stopped:
+            return False
+        self._queue.put((time.time(), dict(inputs), estimated_buses, study_results, total_cost, coefficients))
+        return True
+
+    def _outputs(self, timestamp, estimated_buses, study_results, total_cost, coefficients):
+        empty = {"hours": 0.0, "total_cost": 0.0, "report_cost": 0.0}
+        studies = [study_results.get(key, empty) for key in STUDY_KEYS]
+        return {
+            "timestamp": timestamp,
+            "engine": self._engine,
+            "coefficients": coefficients_fingerprint(coefficients),
+            "coefficients_version": coefficients.get("version", 0),
+            "estimated_buses": estimated_buses,
+            "study_hours": [study["hours"] for study in studies],
+            "study_cost": [study["total_cost"] for study in studies],
+            "report_cost": [study["report_cost"] for study in studies],
+            "total_cost": total_cost,
+        }
+
+    def _run(self):
+        try:
+            self._write_segment()
+        except OSError as exc:
+            self.error = f"Audit log stopped, quotes are no longer logged ({type(exc).__name__}: {exc})"
+            self.stopped = True
+            # Release flush() callers: whatever is queued will never be written
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+
+    def _write_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "ab") as fh:
+            fh.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.version))
+            fh.flush()
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < CHECKPOINT_RECORDS:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                frames = []
+                for timestamp, inputs, buses, studies, total, coefficients in batch:
+                    try:
+                        payload = encode_record(inputs, self._outputs(timestamp, buses, studies, total, coefficients),
+                                                self.version)
+                    except (KeyError, ValueError, TypeError) as exc:
+                        # A malformed record must not stop the log
+                        self.error = f"Audit log skipped a malformed quote ({type(exc).__name__}: {exc})"
+                        continue
+                    frames.append(_FRAME.pack(RECORD, len(payload)) + payload)
+                try:
+                    if frames:
+                        data = b"".join(frames)
+                        checkpoint = _CHECKPOINT.pack(len(frames), zlib.crc32(data))
+                        fh.write(data + _FRAME.pack(CHECKPOINT, len(checkpoint)) + checkpoint)
+                        fh.flush()
+                        self.records += len(frames)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far is written and checkpointed."""
+        self._queue.join()
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# READER AND REPLAY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def read_segment(path):
+    """
+    Walk one segment's frames and verify its checkpoints.
+    Returns:
+        dict: version, data (the file's bytes), starts (record payload
+        offsets), verified (bool per record), damaged (first bad offset or None)
+    """
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    view = memoryview(raw)
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"{path}: not an audit log segment")
+    magic, format_version, version = _HEADER.unpack_from(raw, 0)
+    if magic != MAGIC or format_version != FORMAT_VERSION or version not in SCHEMAS:
+        raise ValueError(f"{path}: not an audit log segment (or an unsupported version)")
+
+    starts, verified = [], []
+    pos = segment_start = _HEADER.size
+    pending = 0
+    damaged = None
+    while pos < len(raw):
+        if pos + _FRAME.size > len(raw):
+            damaged = pos
+            break
+        kind, length = _FRAME.unpack_from(raw, pos)
+        body = pos + _FRAME.size
+        if body + length > len(raw) or kind not in (RECORD, CHECKPOINT):
+            damaged = pos
+            break
+        if kind == RECORD:
+            starts.append(body)
+            verified.append(False)
+            pending += 1
+        else:
+            count, crc = _CHECKPOINT.unpack_from(raw, body)
+            if count != pending or zlib.crc32(view[segment_start:pos]) != crc:
+                damaged = segment_start
+                break
+            verified[len(verified) - pending:] = [True] * pending
+            pending = 0
+            segment_start = body + length
+        pos = body + length
+    if damaged is not None:
+        # Nothing after a bad frame or checksum can be trusted
+        keep = sum(1 for start in starts if start < damaged)
+        starts, verified = starts[:keep], verified[:keep]
+    return {
+        "version": version,
+        "data": raw,
+        "starts": np.asarray(starts, dtype=np.int64),
+        "verified": np.asarray(verified, dtype=bool),
+        "damaged": damaged,
+    }
+
+
+def decode_fixed(segment, rows=slice(None)):
+    """Fixed parts of the selected records as one structured array."""
+    dtype, _ = record_layout(segment["version"])
+    view = memoryview(segment["data"])
+    size = dtype.itemsize
+    gathered = b"".join([view[start:start + size] for start in segment["starts"][rows].tolist()])
+    return np.frombuffer(gathered, dtype=dtype)
+
+
+def fixed_to_quotes(fixed, version):
+    """Logged inputs as a price_quotes() DataFrame (choice codes -> labels)."""
+    columns = {}
+    for name, kind, spec in SCHEMAS[version]:
+        if kind is str and spec is None:
+            continue
+        values = fixed[f"in_{name}"]
+        if kind is str:
+            columns[name] = np.asarray(spec, dtype=object)[np.minimum(values, len(spec) - 1)]
+        elif kind is bool:
+            columns[name] = values.astype(bool)
+        else:
+            columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def replay(paths, coefficients=None, chunk_rows=REPLAY_CHUNK):
+    """
+    Re-price every logged record with the current engine and coefficients.
+    Returns:
+        tuple: (summary dict, pd.DataFrame of mismatching records)
+    """
+    coefficients = coefficients or load_coefficients()
+    current_engine = engine_fingerprint()
+    current_coefficients = coefficients_fingerprint(coefficients)
+    summary = {"records": 0, "verified": 0, "matched": 0, "mismatched": 0,
+               "older_engine": 0, "other_coefficients": 0, "damaged_segments": []}
+    mismatches = []
+
+    for path in paths:
+        segment = read_segment(path)
+        if segment["damaged"] is not None:
+            summary["damaged_segments"].append(f"{os.path.basename(path)} @ byte {segment['damaged']}")
+        n = len(segment["starts"])
+        for lo in range(0, n, chunk_rows):
+            rows = slice(lo, min(lo + chunk_rows, n))
+            fixed = decode_fixed(segment, rows)
+            quotes = fixed_to_quotes(fixed, segment["version"])
+            paise = quotes["exact_money"].to_numpy(dtype=bool) if "exact_money" in quotes else np.zeros(len(quotes), bool)
+
+            buses = np.empty(len(quotes), dtype=np.int64)
+            study_cost = np.empty((len(quotes), len(STUDY_KEYS)))
+            total = np.empty(len(quotes))
+            for mode, mask in (("float", ~paise), ("paise", paise)):
+                if not mask.any():
+                    continue
+                priced = price_quotes(quotes[mask], coefficients, mode)
+                buses[mask] = priced["estimated_buses"]
+                convert = from_paise if mode == "paise" else np.asarray
+                study_cost[mask] = np.asarray(convert(priced["study_costs"]), dtype=float).reshape(-1, len(STUDY_KEYS))
+                total[mask] = convert(priced["total_cost"])
+
+            ok = (
+                (buses == fixed["estimated_buses"])
+                & (np.abs(total - fixed["total_cost"]) <= COST_TOLERANCE)
+                & (np.abs(study_cost - fixed["study_cost"]) <= COST_TOLERANCE).all(axis=1)
+            )
+            summary["records"] += len(quotes)
+            summary["verified"] += int(segment["verified"][rows].sum())
+            summary["matched"] += int(ok.sum())
+            summary["mismatched"] += int((~ok).sum())
+            summary["older_engine"] += int((fixed["engine"] != current_engine).sum())
+            summary["other_coefficients"] += int((fixed["coefficients"] != current_coefficients).sum())
+            bad = np.flatnonzero(~ok)
+            if bad.size:
+                mismatches.append(pd.DataFrame({
+                    "segment": os.path.basename(path),
+                    "record": bad + lo,
+                    "logged_at": pd.to_datetime(fixed["timestamp"][bad], unit="s"),
+                    "tier_level": quotes["tier_level"].to_numpy()[bad],
+                    "logged_buses": fixed["estimated_buses"][bad],
+                    "replayed_buses": buses[bad],
+                    "logged_total": fixed["total_cost"][bad],
+                    "replayed_total": total[bad],
+                    "same_engine": fixed["engine"][bad] == current_engine,
+                    "same_coefficients": fixed["coefficients"][bad] == current_coefficients,
+                }))
+    frame = pd.concat(mismatches, ignore_index=True) if mismatches else pd.DataFrame()
+    return summary, frame
+
+
+def segment_paths(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, f"*{SEGMENT_SUFFIX}"))))
+        else:
+            paths.append(target)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or replay the quote audit log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="re-price logged quotes and report mismatches")
+    replay_parser.add_argument("targets", nargs="+", help="segment files or audit directories")
+    replay_parser.add_argument("--show", type=int, default=20, help="mismatching records to print")
+    info_parser = sub.add_parser("info", help="records and checkpoint status per segment")
+    info_parser.add_argument("targets", nargs="+")
+    show_parser = sub.add_parser("show", help="print one logged quote in full")
+    show_parser.add_argument("segment")
+    show_parser.add_argument("record", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        for name, value in decode_record(read_segment(args.segment), args.record).items():
+            print(f"{name:>32}: {value}")
+        return
+
+    paths = segment_paths(args.targets)
+    if args.command == "info":
+        for path in paths:
+            segment = read_segment(path)
+            status = "ok" if segment["damaged"] is None else f"damaged at byte {segment['damaged']}"
+            print(f"{os.path.basename(path)}: {len(segment['starts']):,} records, "
+                  f"{int(segment['verified'].sum()):,} checkpointed, schema v{segment['version']}, {status}")
+        return
+
+    started = time.perf_counter()
+    summary, mismatches = replay(paths)
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {summary['records']:,} records from {len(paths)} segment(s) in {elapsed:.1f}s "
+          f"({summary['verified']:,} checkpoint-verified)")
+    print(f"  matched {summary['matched']:,}, mismatched {summary['mismatched']:,}; "
+          f"logged by an older engine: {summary['older_engine']:,}, "
+          f"with other coefficients: {summary['other_coefficients']:,}")
+    for damaged in summary["damaged_segments"]:
+        print(f"  damaged segment (records after the last good checkpoint unverified): {damaged}")
+    if not mismatches.empty:
+        print(mismatches.head(args.show).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Calibration of the costing coefficients from historical project actuals.
+
+Fits base_hours_per_bus (per study), the tier complexity factors and the
+bus_calibration multiplier by vectorized least squares, adds bootstrap
+confidence intervals computed on a process pool, and writes a versioned
+coefficient file that app.py loads through cost_engine.load_coefficients().
+
+Usage:
+    python calibration.py history.csv --output coefficients.json --bootstrap 200
+
+History columns (one row per completed project):
+    tier_level, it_capacity, mechanical_load, house_load, actual_buses,
+    hours_<study_key> for each study performed (blank/0 = not performed)
+Optional columns: hour_reduction (%), <study_key>_factor, ups_lineup,
+transformer_mva, lv_bus_mw, pdu_mva, power_factor, redundancy_scheme (blank = per tier).
+"""
+
+import argparse
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import (
+    DEFAULT_COEFFICIENTS,
+    STUDY_KEYS,
+    TIER_LEVELS,
+    calculate_bus_count_batch,
+    tier_codes,
+)
+
+BLOCK_COLUMNS = ["ups_lineup", "transformer_mva", "lv_bus_mw", "pdu_mva", "power_factor"]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DATA PREPARATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def load_history(path):
+    """Read historical actuals from CSV or Excel."""
+    if path.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def prepare_arrays(history):
+    """
+    Flatten the history into the arrays the fit works on: one row per
+    (project, study performed) for the hours model and one row per project
+    for the bus calibration model.
+    """
+    n = len(history)
+    tiers = tier_codes(history["tier_level"].to_numpy())
+    if (tiers < 0).any():
+        raise ValueError("tier_level must be one of: " + ", ".join(TIER_LEVELS))
+
+    it_mw = history["it_capacity"].to_numpy(dtype=float)
+    mech_mw = history["mechanical_load"].to_numpy(dtype=float)
+    house_mw = history["house_load"].to_numpy(dtype=float)
+    actual_buses = history["actual_buses"].to_numpy(dtype=float)
+
+    block_kwargs = {
+        col: history[col].to_numpy(dtype=float)
+        for col in BLOCK_COLUMNS if col in history.columns
+    }
+    raw_buses = calculate_bus_count_batch(
+        total_mw=it_mw + mech_mw + house_mw,
+        it_capacity=it_mw,
+        mechanical_load=mech_mw,
+        house_load=house_mw,
+        tier_level=tiers,
+        rounded=False,
+        redundancy=history["redundancy_scheme"].fillna("").to_numpy() if "redundancy_scheme" in history.columns else None,
+        **block_kwargs
+    )
+
+    if "hour_reduction" in history.columns:
+        reduction = 1 - history["hour_reduction"].fillna(0).to_numpy(dtype=float) / 100
+    else:
+        reduction = np.ones(n)
+
+    # Hours model: hours = buses * base[s] * factor[s] * tier[t] * reduction
+    # Taken to log space it is linear in log(base) and log(tier).
+    row_record, row_study, row_target = [], [], []
+    for s, key in enumerate(STUDY_KEYS):
+        col = f"hours_{key}"
+        if col not in history.columns:
+            continue
+        hours = history[col].fillna(0).to_numpy(dtype=float)
+        factor_col = f"{key}_factor"
+        factor = history[factor_col].to_numpy(dtype=float) if factor_col in history.columns else np.ones(n)
+        denom = actual_buses * factor * reduction
+        valid = (hours > 0) & (denom > 0)
+        idx = np.nonzero(valid)[0]
+        row_record.append(idx)
+        row_study.append(np.full(idx.size, s, dtype=np.int64))
+        row_target.append(np.log(hours[idx] / denom[idx]))
+
+    if not row_record:
+        raise ValueError("history has no hours_<study> columns")
+
+    return {
+        "n_records": n,
+        "row_record": np.concatenate(row_record),
+        "row_study": np.concatenate(row_study),
+        "row_target": np.concatenate(row_target),
+        "tiers": tiers.astype(np.int64),
+        "raw_buses": raw_buses,
+        "actual_buses": actual_buses,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LEAST SQUARES FIT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+N_STUDIES = len(STUDY_KEYS)
+N_TIERS = len(TIER_LEVELS)
+N_PARAMS = N_STUDIES + N_TIERS  # last slot is the bus calibration factor
+
+
+def _solve(arrays, record_weights):
+    """
+    Weighted least squares for one (re)sample. The design matrix is one-hot
+    in study and tier, so the normal equations are assembled with bincount
+    instead of materialising it. Tier I is the reference level (factor 1.0).
+    Returns:
+        np.ndarray: [base hours x6, tier factors x4] followed by bus_calibration;
+        NaN where the sample carries no information
+    """
+    w = record_weights[arrays["row_record"]]
+    s = arrays["row_study"]
+    t = arrays["tiers"][arrays["row_record"]]
+    y = arrays["row_target"]
+
+    # Columns: 6 study intercepts, then Tier II..IV offsets
+    cell = np.bincount(s * N_TIERS + t, weights=w, minlength=N_STUDIES * N_TIERS)
+    cell = cell.reshape(N_STUDIES, N_TIERS)
+    xtx = np.zeros((N_STUDIES + N_TIERS - 1, N_STUDIES + N_TIERS - 1))
+    xtx[np.arange(N_STUDIES), np.arange(N_STUDIES)] = cell.sum(axis=1)
+    tier_block = cell[:, 1:]
+    xtx[:N_STUDIES, N_STUDIES:] = tier_block
+    xtx[N_STUDIES:, :N_STUDIES] = tier_block.T
+    xtx[np.arange(N_STUDIES, N_STUDIES + N_TIERS - 1), np.arange(N_STUDIES, N_STUDIES + N_TIERS - 1)] = tier_block.sum(axis=0)
+
+    wy_study = np.bincount(s, weights=w * y, minlength=N_STUDIES)
+    wy_tier = np.bincount(t, weights=w * y, minlength=N_TIERS)[1:]
+    xty = np.concatenate([wy_study, wy_tier])
+
+    beta = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+    diag = np.diag(xtx)
+    beta = np.where(diag > 0, beta, np.nan)
+
+    params = np.empty(N_PARAMS + 1)
+    params[:N_STUDIES] = np.exp(beta[:N_STUDIES])
+    params[N_STUDIES] = 1.0
+    params[N_STUDIES + 1:N_PARAMS] = np.exp(beta[N_STUDIES:])
+
+    # Bus calibration: actual ≈ k * raw, closed-form through the origin
+    raw = arrays["raw_buses"]
+    actual = arrays["actual_buses"]
+    denom = np.dot(record_weights, raw * raw)
+    params[N_PARAMS] = np.dot(record_weights, raw * actual) / denom if denom > 0 else np.nan
+    return params
+
+
+def fit_coefficients(arrays):
+    """Point estimate on the full history."""
+    return _solve(arrays, np.ones(arrays["n_records"]))
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BOOTSTRAP CONFIDENCE INTERVALS (PROCESS POOL)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_WORKER_ARRAYS = None
+
+
+def _init_worker(arrays):
+    # Ship the prepared arrays once per worker rather than once per task
+    global _WORKER_ARRAYS
+    _WORKER_ARRAYS = arrays
+
+
+def _bootstrap_chunk(args):
+    seed, replicates = args
+    arrays = _WORKER_ARRAYS
+    rng = np.random.default_rng(seed)
+    n = arrays["n_records"]
+    out = np.empty((replicates, N_PARAMS + 1))
+    for i in range(replicates):
+        # Resampling projects with replacement == multinomial record weights
+        weights = np.bincount(rng.integers(0, n, size=n), minlength=n).astype(float)
+        out[i] = _solve(arrays, weights)
+    return out
+
+
+def bootstrap_intervals(arrays, n_bootstrap=200, workers=None, seed=0, confidence=0.95):
+    """
+    Percentile bootstrap over projects, split into chunks across a process pool.
+    Returns:
+        tuple: (lower, upper) parameter arrays
+    """
+    workers = workers or os.cpu_count() or 1
+    n_chunks = min(n_bootstrap, workers * 4)
+    sizes = np.full(n_chunks, n_bootstrap // n_chunks)
+    sizes[: n_bootstrap % n_chunks] += 1
+    seeds = np.random.SeedSequence(seed).generate_state(n_chunks)
+    tasks = list(zip(seeds.tolist(), sizes.tolist()))
+
+    if workers == 1:
+        _init_worker(arrays)
+        samples = [_bootstrap_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+            samples = list(pool.map(_bootstrap_chunk, tasks))
+
+    samples = np.vstack(samples)
+    alpha = (1 - confidence) / 2
+    lower = np.nanquantile(samples, alpha, axis=0)
+    upper = np.nanquantile(samples, 1 - alpha, axis=0)
+    return lower, upper
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COEFFICIENT FILE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _to_dict(params):
+    return {
+        "base_hours_per_bus": {key: params[i] for i, key in enumerate(STUDY_KEYS)},
+        "tier_complexity_factors": {tier: params[N_STUDIES + i] for i, tier in enumerate(TIER_LEVELS)},
+        "bus_calibration": params[N_PARAMS],
+    }
+
+
+def build_coefficient_file(params, lower=None, upper=None, n_records=0, n_bootstrap=0,
+                           confidence=0.95, previous_version=0):
+    """
+    Assemble the versioned coefficient document. Parameters the history could
+    not identify keep their built-in defaults.
+    """
+    fitted = _to_dict(params)
+    for group in ("base_hours_per_bus", "tier_complexity_factors"):
+        for key, value in fitted[group].items():
+            if not np.isfinite(value):
+                fitted[group][key] = DEFAULT_COEFFICIENTS[group][key]
+            fitted[group][key] = round(float(fitted[group][key]), 6)
+    if not np.isfinite(fitted["bus_calibration"]):
+        fitted["bus_calibration"] = DEFAULT_COEFFICIENTS["bus_calibration"]
+    fitted["bus_calibration"] = round(float(fitted["bus_calibration"]), 6)
+
+    document = {
+        "version": previous_version + 1,
+        "fitted_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "n_records": int(n_records),
+        "n_bootstrap": int(n_bootstrap),
+        "confidence": confidence,
+    }
+    document.update(fitted)
+
+    if lower is not None and upper is not None:
+        lo, hi = _to_dict(lower), _to_dict(upper)
+        document["intervals"] = {
+            group: {
+                key: [round(float(lo[group][key]), 6), round(float(hi[group][key]), 6)]
+                for key in fitted[group]
+            }
+            for group in ("base_hours_per_bus", "tier_complexity_factors")
+        }
+        document["intervals"]["bus_calibration"] = [
+            round(float(lo["bus_calibration"]), 6),
+            round(float(hi["bus_calibration"]), 6),
+        ]
+    return document
+
+
+def write_coefficient_file(document, path):
+    """Write atomically so a running app never reads a half-written file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _previous_version(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as fh:
+        return int(json.load(fh).get("version", 0))
+
+
+def calibrate(history, output, n_bootstrap=200, workers=None, seed=0, confidence=0.95):
+    """Full pipeline: prepare, fit, bootstrap, write. Returns the document."""
+    arrays = prepare_arrays(history)
+    params = fit_coefficients(arrays)
+    lower = upper = None
+    if n_bootstrap > 0:
+        lower, upper = bootstrap_intervals(arrays, n_bootstrap, workers, seed, confidence)
+    document = build_coefficient_file(
+        params, lower, upper,
+        n_records=arrays["n_records"],
+        n_bootstrap=n_bootstrap,
+        confidence=confidence,
+        previous_version=_previous_version(output),
+    )
+    write_coefficient_file(document, output)
+    return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit costing coefficients from historical actuals")
+    parser.add_argument("history", help="CSV/XLSX of completed projects")
+    parser.add_argument("--output", default="coefficients.json", help="coefficient file to write")
+    parser.add_argument("--bootstrap", type=int, default=200, help="bootstrap replicates (0 to skip)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    document = calibrate(
+        load_history(args.history), args.output,
+        n_bootstrap=args.bootstrap, workers=args.workers,
+        seed=args.seed, confidence=args.confidence,
+    )
+    print(f"Wrote {args.output} (version {document['version']}, {document['n_records']} records)")
+    print(f"  bus_calibration = {document['bus_calibration']}")
+    for key, value in document["base_hours_per_bus"].items():
+        print(f"  {key:<14} {value:.4f} h/bus")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Time-phased cash flow: monthly cost and billing curves with rate escalation.
+
+Each quote's study hours are spread over the weeks the study runs (same
+timing as forecast.py: precedence chain, one engineer per grade per study)
+and split into calendar months by interval overlap. Engineering cost in a
+month is the grade cost of those hours times that grade's escalation index
+for the month, so a 14-month campus study picks up the anniversary rise in
+senior/mid/junior rates. Reports are costed in the month their study
+finishes; meetings and additional services are spread evenly over the
+project.
+
+Billing follows milestones on the escalated contract value: an advance at
+project start, each study's share on its finish, and a completion payment at
+the end.
+
+Everything is evaluated as arrays over (quotes x studies x months) in chunks,
+so a whole portfolio projects in one pass.
+
+Usage:
+    python cashflow.py portfolio.csv --senior-escalation 8 --mid-escalation 7 --output monthly.csv
+
+Portfolio columns: start_date plus any cost_engine.DEFAULT_QUOTE_INPUTS
+fields; optional win_probability (0-1 or %) weights the portfolio curve.
+"""
+
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import GRADES, STUDY_KEYS, load_coefficients, price_quotes
+from forecast import HOURS_PER_WEEK, study_timing
+
+# Annual escalation per grade (fraction), applied on each anniversary of the rates date
+DEFAULT_ESCALATION = {"senior": 0.08, "mid": 0.07, "junior": 0.06}
+
+# Share of the contract value billed at each milestone
+DEFAULT_MILESTONES = {"advance": 0.10, "studies": 0.80, "completion": 0.10}
+
+# Quotes per dense (quotes x studies x months) block
+CHUNK_ROWS = 20000
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CALENDAR HELPERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _day_numbers(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def month_boundaries(first_month, n_months):
+    """Day numbers of the n_months + 1 month starts from first_month (datetime64[M])."""
+    months = np.datetime64(first_month, "M") + np.arange(n_months + 1)
+    return months.astype("datetime64[D]").astype(np.int64).astype(float)
+
+
+def escalation_indices(first_month, n_months, rates_date, escalation):
+    """
+    Rate multiplier per grade per month: (1 + annual rate) ** completed years
+    since the rates date.
+    Returns:
+        np.ndarray: (3, n_months) in GRADES order
+    """
+    months = np.datetime64(first_month, "M") + np.arange(n_months)
+    elapsed = (months - np.datetime64(rates_date, "M")).astype(np.int64)
+    years = np.maximum(elapsed // 12, 0)
+    rates = np.array([escalation.get(grade, 0.0) for grade in GRADES])[:, None]
+    return (1 + rates) ** years[None, :]
+
+
+def _overlap(start_day, end_day, boundaries):
+    """Fraction of each [start, end) interval falling in each month. Returns (..., n_months)."""
+    start = start_day[..., None]
+    end = end_day[..., None]
+    inside = np.minimum(end, boundaries[1:]) - np.maximum(start, boundaries[:-1])
+    duration = end - start
+    return np.where(duration > 0, np.clip(inside, 0, None) / np.where(duration > 0, duration, 1), 0.0)
+
+
+def _month_of(day, boundaries):
+    return np.clip(np.searchsorted(boundaries, day, side="right") - 1, 0, len(boundaries) - 2)
+
+
+def _bucket_events(day, amount, boundaries):
+    """Sum point amounts (n, k) falling on days (n, k) into (n, n_months)."""
+    n, n_months = day.shape[0], len(boundaries) - 1
+    slot = np.arange(n)[:, None] * n_months + _month_of(day, boundaries)
+    return np.bincount(slot.ravel(), weights=amount.ravel(), minlength=n * n_months).reshape(n, n_months)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CASH FLOW
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def cash_flow(quotes, coefficients=None, escalation=None, milestones=None, rates_date=None,
+              hours_per_week=HOURS_PER_WEEK, chunk_rows=CHUNK_ROWS):
+    """
+    Monthly hours, cost and billing for every quote.
+    quotes: DataFrame (or list of dicts) of quote inputs with a start_date
+    column (default today); rates_date defaults to the earliest start.
+    Returns:
+        dict: months (datetime64[M]), hours (n, 3, months), cost (n, months),
+        billing (n, months), contract_value and escalation_uplift (n,)
+    """
+    coefficients = coefficients or load_coefficients()
+    escalation = dict(DEFAULT_ESCALATION, **(escalation or {}))
+    milestones = dict(DEFAULT_MILESTONES, **(milestones or {}))
+    if abs(sum(milestones.values()) - 1) > 1e-9:
+        raise ValueError("milestone shares must add up to 1")
+    if not isinstance(quotes, pd.DataFrame):
+        quotes = pd.DataFrame(list(quotes))
+    quotes = quotes.reset_index(drop=True)
+
+    priced = price_quotes(quotes, coefficients)
+    grade_hours = priced["grade_hours"]
+    study_start, study_duration = study_timing(grade_hours, hours_per_week)
+
+    if "start_date" in quotes.columns:
+        starts = pd.to_datetime(quotes["start_date"]).fillna(pd.Timestamp(datetime.date.today()))
+        project_day = _day_numbers(starts.to_numpy(dtype="datetime64[D]")).astype(float)
+    else:
+        project_day = np.full(len(quotes), float(_day_numbers(np.datetime64("today", "D"))))
+    start_day = project_day[:, None] + study_start * 7
+    end_day = start_day + study_duration * 7
+    project_end = np.maximum(end_day.max(axis=1), project_day + 1) if len(quotes) else project_day
+
+    first_month = np.datetime64(int(project_day.min()) if len(quotes) else 0, "D").astype("datetime64[M]")
+    last_month = np.datetime64(int(np.ceil(project_end.max())) - 1 if len(quotes) else 0, "D").astype("datetime64[M]")
+    n_months = int((last_month - first_month).astype(np.int64)) + 1
+    boundaries = month_boundaries(first_month, n_months)
+    index = escalation_indices(first_month, n_months, rates_date or first_month, escalation)
+
+    n = len(quotes)
+    hours = np.zeros((n, len(GRADES), n_months))
+    labour = np.zeros((n, n_months))
+    study_escalated = np.zeros((n, len(STUDY_KEYS)))
+    for lo in range(0, n, chunk_rows):
+        hi = min(lo + chunk_rows, n)
+        share = _overlap(start_day[lo:hi], end_day[lo:hi], boundaries)           # (q, s, m)
+        hours[lo:hi] = np.einsum("qsm,qsg->qgm", share, grade_hours[lo:hi])
+        escalated = np.einsum("qsm,qsg,gm->qsm", share, priced["grade_costs"][lo:hi], index)
+        labour[lo:hi] = escalated.sum(axis=1)
+        study_escalated[lo:hi] = escalated.sum(axis=2)
+
+    report_costs = priced["report_costs"]
+    overheads = priced["subtotal"] - priced["total_study_cost"] - priced["total_report_cost"]
+    reports = _bucket_events(end_day, report_costs, boundaries)
+    spread = _overlap(project_day, project_end, boundaries) * overheads[:, None]
+    cost = labour + reports + spread
+
+    margin = 1 + _margin(quotes) / 100
+    uplift = study_escalated.sum(axis=1) - priced["total_study_cost"]
+    contract_value = priced["total_cost"] + uplift * margin
+
+    # Milestones: advance at start, study shares on finish, completion at the end
+    study_value = study_escalated + report_costs
+    study_total = study_value.sum(axis=1, keepdims=True)
+    study_share = np.divide(study_value, study_total, out=np.zeros_like(study_value), where=study_total > 0)
+    billing = (
+        _bucket_events(project_day[:, None], (contract_value * milestones["advance"])[:, None], boundaries)
+        + _bucket_events(end_day, study_share * (contract_value * milestones["studies"])[:, None], boundaries)
+        + _bucket_events(project_end[:, None], (contract_value * milestones["completion"])[:, None], boundaries)
+    )
+
+    return {
+        "months": first_month + np.arange(n_months),
+        "hours": hours,
+        "cost": cost,
+        "billing": billing,
+        "contract_value": contract_value,
+        "escalation_uplift": uplift * margin,
+    }
+
+
+def _margin(quotes):
+    if "custom_margin" in quotes.columns:
+        return quotes["custom_margin"].fillna(15).to_numpy(dtype=float)
+    return np.full(len(quotes), 15.0)
+
+
+def monthly_curve(flow, weights=None):
+    """
+    Portfolio totals per month (optionally weighted, e.g. by win probability).
+    Returns:
+        pd.DataFrame: month, <grade>_hours, cost, billing, their cumulative
+        sums and cash_position (cumulative billing - cumulative cost)
+    """
+    weights = np.ones(len(flow["cost"])) if weights is None else np.asarray(weights, dtype=float)
+    frame = pd.DataFrame({"month": flow["months"].astype("datetime64[D]")})
+    for g, grade in enumerate(GRADES):
+        frame[f"{grade}_hours"] = weights @ flow["hours"][:, g, :]
+    frame["cost"] = weights @ flow["cost"]
+    frame["billing"] = weights @ flow["billing"]
+    frame["cumulative_cost"] = frame["cost"].cumsum()
+    frame["cumulative_billing"] = frame["billing"].cumsum()
+    frame["cash_position"] = frame["cumulative_billing"] - frame["cumulative_cost"]
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monthly cost and billing projection with rate escalation")
+    parser.add_argument("portfolio", help="CSV/XLSX of quotes with a start_date column")
+    for grade in GRADES:
+        parser.add_argument(f"--{grade}-escalation", type=float, default=DEFAULT_ESCALATION[grade] * 100,
+                            help=f"annual {grade} rate escalation (%%)")
+    parser.add_argument("--rates-date", help="date the entered rates apply from (default: earliest start)")
+    parser.add_argument("--output", help="write the monthly table to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.portfolio.lower().endswith((".xlsx", ".xls")):
+        portfolio = pd.read_excel(args.portfolio)
+    else:
+        portfolio = pd.read_csv(args.portfolio)
+
+    escalation = {grade: getattr(args, f"{grade}_escalation") / 100 for grade in GRADES}
+    flow = cash_flow(portfolio, escalation=escalation, rates_date=args.rates_date)
+    weights = None
+    if "win_probability" in portfolio.columns:
+        weights = portfolio["win_probability"].fillna(1.0).to_numpy(dtype=float)
+        weights = np.where(weights > 1, weights / 100, weights)
+    monthly = monthly_curve(flow, weights)
+    if args.output:
+        monthly.to_csv(args.output, index=False)
+    print(monthly[["month", "cost", "billing", "cash_position"]].to_string(index=False, float_format="{:,.0f}".format))
+    print(f"Escalation adds ₹{flow['escalation_uplift'] @ (weights if weights is not None else np.ones(len(portfolio))):,.0f}"
+          f" across {len(portfolio):,} quotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Plotly chart components for large result sets (sweeps, Monte Carlo draws,
+portfolio pricing).
+
+Traces use WebGL (Scattergl) and data is reduced server-side before it is
+sent, so the payload stays under a fixed point budget however many results
+there are:
+    - lttb_downsample: Largest-Triangle-Three-Buckets for ordered series
+      (keeps peaks and troughs of cost curves)
+    - bin_2d: count/mean binning for unordered clouds (e.g. MW vs cost)
+    - histogram_counts: fixed-bin histogram for distributions
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Points per trace sent to the browser
+DEFAULT_MAX_POINTS = 2000
+
+CHART_LAYOUT = dict(
+    template="plotly_dark",
+    height=400,
+    margin=dict(l=10, r=10, t=40, b=10),
+    legend=dict(orientation="h", y=-0.2),
+)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVER-SIDE REDUCTION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def lttb_downsample(x, y, max_points=DEFAULT_MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets downsampling of an x-sorted series.
+    Keeps the first and last points and, per bucket, the point forming the
+    largest triangle with the previous pick and the next bucket's mean.
+    Returns:
+        tuple: (x, y) arrays of at most max_points points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n <= max_points or max_points < 3:
+        return x, y
+
+    # Bucket edges over the interior points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of each bucket, via cumulative sums (vectorized)
+    cx = np.concatenate([[0.0], np.cumsum(x)])
+    cy = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.maximum(ends - starts, 1)
+    mean_x = (cx[ends] - cx[starts]) / counts
+    mean_y = (cy[ends] - cy[starts]) / counts
+    # The last bucket looks ahead to the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    prev = 0
+    # The pick depends on the previous pick, so buckets are walked in order;
+    # the work inside each bucket is vectorized
+    for b in range(starts.size):
+        lo, hi = starts[b], max(ends[b], starts[b] + 1)
+        area = np.abs(
+            (x[prev] - next_x[b]) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (next_y[b] - y[prev])
+        )
+        prev = lo + int(area.argmax())
+        picked[b + 1] = prev
+    return x[picked], y[picked]
+
+
+def bin_2d(x, y, bins=200, value=None):
+    """
+    Aggregate a scatter cloud onto a bins x bins grid.
+    Returns:
+        tuple: (x_centres, y_centres, z) where z is the point count per cell,
+        or the mean of `value` per cell when given (NaN for empty cells)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    if value is not None:
+        sums, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges], weights=np.asarray(value, dtype=float))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(counts > 0, sums / counts, np.nan)
+    else:
+        z = np.where(counts > 0, counts, np.nan)
+    x_centres = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centres = (y_edges[:-1] + y_edges[1:]) / 2
+    # Plotly heatmaps index z as [row=y][col=x]
+    return x_centres, y_centres, z.T
+
+
+def histogram_counts(values, bins=100):
+    """Fixed-bin histogram; returns (bin_centres, counts)."""
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def _compact(values):
+    # float32 halves the payload and is plenty for on-screen positions
+    return np.asarray(values, dtype=np.float32)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CHART COMPONENTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def line_chart_large(series, title="", x_title="", y_title="", max_points=DEFAULT_MAX_POINTS):
+    """
+    WebGL line chart of one or more large ordered series.
+    series: {name: (x, y)}; each series is sorted by x and LTTB-reduced.
+    """
+    fig = go.Figure()
+    for name, (x, y) in series.items():
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        order = np.argsort(x, kind="stable")
+        dx, dy = lttb_downsample(x[order], y[order], max_points)
+        fig.add_trace(go.Scattergl(x=_compact(dx), y=_compact(dy), mode="lines", name=name))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, hovermode="x unified", **CHART_LAYOUT)
+    return fig
+
+
+def scatter_chart_large(x, y, title="", x_title="", y_title="", value=None, max_points=DEFAULT_MAX_POINTS, bins=150):
+    """
+    Scatter for arbitrarily many points: sent as WebGL markers when the cloud
+    fits the budget, otherwise binned server-side into a density (or mean of
+    `value`) heatmap.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size <= max_points:
+        marker = dict(size=5, opacity=0.7)
+        if value is not None:
+            marker.update(color=_compact(value), colorscale="Viridis", showscale=True)
+        fig = go.Figure(go.Scattergl(x=_compact(x), y=_compact(y), mode="markers", marker=marker))
+    else:
+        xc, yc, z = bin_2d(x, y, bins=bins, value=value)
+        fig = go.Figure(go.Heatmap(
+            x=_compact(xc), y=_compact(yc), z=_compact(z), colorscale="Viridis",
+            colorbar=dict(title="mean" if value is not None else "count"),
+            hoverongaps=False,
+        ))
+        title = f"{title} ({x.size:,} points, binned)" if title else f"{x.size:,} points, binned"
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, **CHART_LAYOUT)
+    return fig
+
+
+def histogram_chart_large(values, title="", x_title="", bins=100):
+    """Distribution of any number of draws, binned server-side (payload = bins)."""
+    centres, counts = histogram_counts(values, bins)
+    fig = go.Figure(go.Bar(x=_compact(centres), y=counts, marker_color="#3b82f6"))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title="Count", bargap=0, **CHART_LAYOUT)
+    return fig
@@ -0,0 +1,733 @@
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from metrics import BUS_COUNT_EVALUATIONS, COSTING_EVALUATIONS
+from money import apply_margin, to_paise
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ACCURATE BUS COUNT CALCULATION FUNCTION (ADAPTED FROM DC_Bus_Quantity_Estimater)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def calculate_bus_count_accurate(
+    total_mw,
+    it_capacity,
+    mechanical_load,
+    house_load,
+    tier_level,
+    pue=1.56,
+    mech_fraction=0.70,
+    ups_lineup=1.5,
+    transformer_mva=3.0,
+    lv_bus_mw=3.0,
+    pdu_mva=0.3,
+    mv_base=2,
+    utility_incomers=1,
+    power_factor=0.95,
+    voltage_levels=2,
+    backup_gens=0,
+    expansion_factor=1.0,
+    bus_calibration=1.0,
+    redundancy=None
+):
+    """
+    Calculate bus count using component-by-component engineering method
+    with total MW (IT + Mechanical + House) as primary driver.[file:2]
+    Redundancy follows the tier unless a REDUNDANCY_SCHEMES topology is given.
+    Returns:
+        int: Estimated bus count (rounded up)
+    """
+
+    # ─────────────────────────────────────────────────────────────────────
+    # PHASE 1: LOAD DERIVATION
+    # ─────────────────────────────────────────────────────────────────────
+    calc_total_mw = total_mw
+    calc_it_mw = it_capacity
+    non_it_mw = max(calc_total_mw - calc_it_mw, 0)
+
+    # If explicit mechanical & house loads are given, use them preferentially
+    if mechanical_load > 0 or house_load > 0:
+        mech_mw = mechanical_load
+        house_mw = house_load
+        # If non_it_mw is nonzero but explicit loads differ a lot, we still trust user inputs
+    else:
+        mech_mw = mech_fraction * non_it_mw
+        house_mw = non_it_mw - mech_mw
+
+    # ─────────────────────────────────────────────────────────────────────
+    # PHASE 2: COMPONENT COUNTING (EQUIPMENT-BASED)
+    # ─────────────────────────────────────────────────────────────────────
+
+    lv_it_pcc = math.ceil(calc_it_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
+    lv_mech_mcc = math.ceil(mech_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
+    lv_house_pcc = math.ceil(house_mw / lv_bus_mw) if lv_bus_mw > 0 else 0
+    lv_total = lv_it_pcc + lv_mech_mcc + lv_house_pcc
+
+    ups_lineups = math.ceil(calc_it_mw / ups_lineup) if ups_lineup > 0 else 0
+    ups_output_buses = ups_lineups
+
+    pdus_total = math.ceil(calc_it_mw / pdu_mva) if pdu_mva > 0 else 0
+
+    tx_count_n = math.ceil(calc_total_mw / (transformer_mva * power_factor)) if transformer_mva > 0 else 0
+
+    mv_buses = mv_base + (utility_incomers - 1)
+
+    voltage_additions = 0
+    if voltage_levels > 2:
+        voltage_additions = (voltage_levels - 2) * (tx_count_n + 1)
+
+    generator_additions = backup_gens * 2 if backup_gens > 0 else 0
+
+    # ─────────────────────────────────────────────────────────────────────
+    # PHASE 3: REDUNDANCY MODELING (COMPILED SCHEME COEFFICIENTS)
+    # ─────────────────────────────────────────────────────────────────────
+
+    scheme = scheme_codes(redundancy if redundancy in REDUNDANCY_NAMES else tier_level)
+    components = np.array([
+        mv_buses,
+        tx_count_n,
+        lv_total,
+        ups_output_buses,
+        pdus_total,
+        voltage_additions + generator_additions,
+        1,
+    ], dtype=float)
+    buses_redundant, scheme_factor = redundant_buses(components, scheme)
+    total_buses = buses_redundant * expansion_factor * scheme_factor
+
+    # Apply calibration factor
+    total_buses = total_buses * bus_calibration
+
+    BUS_COUNT_EVALUATIONS.inc()
+    return max(1, math.ceil(total_buses))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VECTORIZED BUS COUNT (BATCH PATH)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TIER_LEVELS = ["Tier I", "Tier II", "Tier III", "Tier IV"]
+
+
+def tier_codes(tier_level):
+    """
+    Map tier labels to integer codes (0-3 for Tier I-IV, -1 for anything else,
+    which follows the Tier III style fallback branch).
+    """
+    tiers = np.asarray(tier_level)
+    codes = np.full(tiers.shape, -1, dtype=np.int8)
+    for code, label in enumerate(TIER_LEVELS):
+        codes[tiers == label] = code
+    return codes
+
+
+def _ceil_div(numerator, denominator):
+    denominator = np.asarray(denominator, dtype=float)
+    safe = np.where(denominator > 0, denominator, 1.0)
+    return np.where(denominator > 0, np.ceil(numerator / safe), 0.0)
+
+
+def calculate_bus_count_batch(
+    total_mw,
+    it_capacity,
+    mechanical_load,
+    house_load,
+    tier_level,
+    mech_fraction=0.70,
+    ups_lineup=1.5,
+    transformer_mva=3.0,
+    lv_bus_mw=3.0,
+    pdu_mva=0.3,
+    mv_base=2,
+    utility_incomers=1,
+    power_factor=0.95,
+    voltage_levels=2,
+    backup_gens=0,
+    expansion_factor=1.0,
+    bus_calibration=1.0,
+    rounded=True,
+    redundancy=None
+):
+    """
+    Array version of calculate_bus_count_accurate. Every argument may be a
+    scalar or a NumPy array (broadcast together); tier_level may be labels
+    or codes from tier_codes(), redundancy scheme labels (blank = per tier).
+    Returns:
+        np.ndarray: int64 bus counts, or the un-rounded calibrated float
+        counts when rounded=False (used by the calibration fit)
+    """
+    total_mw = np.asarray(total_mw, dtype=float)
+    calc_it_mw = np.asarray(it_capacity, dtype=float)
+    mechanical_load = np.asarray(mechanical_load, dtype=float)
+    house_load = np.asarray(house_load, dtype=float)
+    scheme = scheme_codes(tier_level)
+    if redundancy is not None:
+        topology = scheme_codes(redundancy)
+        scheme = np.where(topology >= 0, topology, scheme)
+
+    if kernels.ENABLED:
+        # Compiled per-row loop over the same scheme coefficients (see kernels.py)
+        return _finish_bus_count(kernels.bus_count(
+            total_mw, calc_it_mw, mechanical_load, house_load, _resolve_scheme(scheme), mech_fraction,
+            ups_lineup, transformer_mva, lv_bus_mw, pdu_mva, mv_base, utility_incomers, power_factor,
+            voltage_levels, backup_gens, expansion_factor, bus_calibration, REDUNDANCY,
+        ), rounded)
+
+    # PHASE 1: LOAD DERIVATION
+    non_it_mw = np.maximum(total_mw - calc_it_mw, 0)
+    explicit = (mechanical_load > 0) | (house_load > 0)
+    mech_mw = np.where(explicit, mechanical_load, mech_fraction * non_it_mw)
+    house_mw = np.where(explicit, house_load, non_it_mw - mech_fraction * non_it_mw)
+
+    # PHASE 2: COMPONENT COUNTING
+    lv_total = (
+        _ceil_div(calc_it_mw, lv_bus_mw)
+        + _ceil_div(mech_mw, lv_bus_mw)
+        + _ceil_div(house_mw, lv_bus_mw)
+    )
+    ups_output_buses = _ceil_div(calc_it_mw, ups_lineup)
+    pdus_total = _ceil_div(calc_it_mw, pdu_mva)
+    tx_count_n = _ceil_div(total_mw, np.asarray(transformer_mva, dtype=float) * power_factor)
+    tx_count_n = np.where(np.asarray(transformer_mva) > 0, tx_count_n, 0.0)
+    mv_buses = np.asarray(mv_base) + (np.asarray(utility_incomers) - 1)
+    voltage_levels = np.asarray(voltage_levels)
+    voltage_additions = np.where(voltage_levels > 2, (voltage_levels - 2) * (tx_count_n + 1), 0)
+    backup_gens = np.asarray(backup_gens)
+    generator_additions = np.where(backup_gens > 0, backup_gens * 2, 0)
+    extras = voltage_additions + generator_additions
+
+    # PHASE 3: REDUNDANCY MODELING
+    components = np.stack(np.broadcast_arrays(
+        mv_buses, tx_count_n, lv_total, ups_output_buses, pdus_total, extras, 1.0
+    ), axis=-1).astype(float, copy=False)
+    buses_redundant, scheme_factor = redundant_buses(components, scheme)
+    # Same operation order as the scalar path so results match bit-for-bit
+    total_buses = buses_redundant * expansion_factor * scheme_factor
+    total_buses = total_buses * bus_calibration
+    return _finish_bus_count(total_buses, rounded)
+
+
+def _finish_bus_count(total_buses, rounded):
+    BUS_COUNT_EVALUATIONS.inc(int(np.size(total_buses)))
+    if not rounded:
+        return total_buses
+    return np.maximum(1, np.ceil(total_buses)).astype(np.int64)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REDUNDANCY SCHEMES (DECLARATIVE, COMPILED TO COEFFICIENT MATRICES)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Bus components counted in phase 2; "extras" is voltage-level plus generator buses
+BUS_COMPONENTS = ["mv", "transformer", "lv", "ups", "pdu", "extras"]
+
+# Each scheme: per-component multipliers (default 1), additive buses per
+# component and an overall factor. Fractional multipliers count whole buses
+# (rounded down, as the Tier IV PDU rule always has). The four Uptime tiers
+# come first so their codes match tier_codes().
+REDUNDANCY_SCHEMES = {
+    "Tier I": {},
+    "Tier II": {"add": {"transformer": 1}, "factor": 1.10},
+    "Tier III": {"add": {"transformer": 1}, "factor": 1.15},
+    "Tier IV": {"multipliers": {"mv": 2, "transformer": 2, "lv": 2, "ups": 2, "pdu": 1.5, "extras": 2}},
+    "N+1": {"add": {"transformer": 1, "ups": 1}},
+    "2N": {"multipliers": {"mv": 2, "transformer": 2, "lv": 2, "ups": 2, "pdu": 2, "extras": 2}},
+    "2N+1": {
+        "multipliers": {"mv": 2, "transformer": 2, "lv": 2, "ups": 2, "pdu": 2, "extras": 2},
+        "add": {"transformer": 1, "ups": 1},
+    },
+    # 4-to-make-3: a third more transformer/LV/UPS blocks, dual-corded PDUs
+    "Distributed Redundant": {"multipliers": {"transformer": 4 / 3, "lv": 4 / 3, "ups": 4 / 3, "pdu": 2}},
+    # N active blocks plus a reserve block and its catcher bus
+    "Block Redundant": {"add": {"transformer": 1, "lv": 1, "ups": 2}},
+}
+
+# Labels outside the table (e.g. legacy tier names) price like Tier III
+FALLBACK_SCHEME = "Tier III"
+
+
+def compile_redundancy_schemes(schemes):
+    """
+    Compile declarative schemes into the arrays the bus count evaluates.
+    Returns:
+        dict: names, matrix (schemes x components+1; the last column holds
+        the additive buses), floor (same shape, bool), factor (schemes,),
+        linear (matrix without the floored terms) and the floored (s, c) pairs
+    """
+    names = list(schemes)
+    matrix = np.zeros((len(names), len(BUS_COMPONENTS) + 1))
+    floor = np.zeros(matrix.shape, dtype=bool)
+    factor = np.ones(len(names))
+    for s, name in enumerate(names):
+        spec = schemes[name]
+        multipliers = spec.get("multipliers", {})
+        additions = spec.get("add", {})
+        unknown = (set(multipliers) | set(additions)) - set(BUS_COMPONENTS)
+        if unknown:
+            raise ValueError(f"{name}: unknown bus components {sorted(unknown)}")
+        for c, component in enumerate(BUS_COMPONENTS):
+            matrix[s, c] = multipliers.get(component, 1)
+            floor[s, c] = matrix[s, c] != int(matrix[s, c])
+        matrix[s, -1] = sum(additions.values())
+        factor[s] = spec.get("factor", 1.0)
+    return {
+        "names": names,
+        "matrix": matrix,
+        "floor": floor,
+        "factor": factor,
+        # Whole-number coefficients, evaluated for every scheme in one matrix product
+        "linear": np.where(floor, 0.0, matrix),
+        "floored": [(s, c) for s, c in zip(*np.nonzero(floor))],
+    }
+
+
+REDUNDANCY = compile_redundancy_schemes(REDUNDANCY_SCHEMES)
+REDUNDANCY_NAMES = REDUNDANCY["names"]
+
+
+def scheme_codes(labels):
+    """Map scheme labels to row indices of the compiled matrix (-1 if unknown); codes pass through."""
+    labels = np.asarray(labels)
+    if labels.dtype.kind in "iu":
+        return labels.astype(np.int64)
+    codes = np.full(labels.shape, -1, dtype=np.int64)
+    for code, name in enumerate(REDUNDANCY_NAMES):
+        codes[labels == name] = code
+    return codes
+
+
+def _resolve_scheme(scheme):
+    scheme = np.asarray(scheme)
+    unknown = (scheme < 0) | (scheme >= len(REDUNDANCY_NAMES))
+    return np.where(unknown, REDUNDANCY_NAMES.index(FALLBACK_SCHEME), scheme)
+
+
+def redundant_buses(components, scheme, compiled=REDUNDANCY):
+    """
+    Buses after redundancy: the component vector (last entry 1) times the
+    scheme coefficient matrix, with fractional terms rounded down.
+    components is (..., components+1); scheme is a code or array of codes.
+    Every term is a whole number of buses, so the sums are exact in float64
+    whatever order the matrix product adds them in.
+    Returns:
+        tuple: buses before the overall factor, the scheme factor
+    """
+    scheme = _resolve_scheme(scheme)
+    by_scheme = components @ compiled["linear"].T
+    for s, c in compiled["floored"]:
+        by_scheme[..., s] += np.floor(components[..., c] * compiled["matrix"][s, c])
+    shape = np.broadcast_shapes(by_scheme.shape[:-1], scheme.shape)
+    by_scheme = np.broadcast_to(by_scheme, shape + by_scheme.shape[-1:])
+    scheme = np.broadcast_to(scheme, shape)
+    buses = np.take_along_axis(by_scheme, scheme[..., None], axis=-1)[..., 0]
+    return buses, compiled["factor"][scheme]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STUDY COEFFICIENTS (BASE HOURS, TIER COMPLEXITY, BUS CALIBRATION)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+STUDY_KEYS = ["load_flow", "short_circuit", "pdc", "arc_flash", "harmonics", "transient"]
+
+STUDY_NAMES = {
+    "load_flow": "Load Flow Study",
+    "short_circuit": "Short Circuit Study",
+    "pdc": "Protective Device Coordination",
+    "arc_flash": "Arc Flash Study",
+    "harmonics": "Harmonics Study",
+    "transient": "Transient Analysis",
+}
+
+# Retuned v5.0 constants, used whenever no fitted coefficient file is present
+DEFAULT_COEFFICIENTS = {
+    "version": 0,
+    "source": "built-in (retuned v5.0)",
+    "base_hours_per_bus": {
+        "load_flow": 0.25,
+        "short_circuit": 0.4,
+        "pdc": 0.7,
+        "arc_flash": 0.6,
+        "harmonics": 0.65,
+        "transient": 0.7,
+    },
+    "tier_complexity_factors": {
+        "Tier I": 1.0,
+        "Tier II": 1.15,
+        "Tier III": 1.3,
+        "Tier IV": 1.5,
+    },
+    "bus_calibration": 1.0,
+}
+
+COEFFICIENTS_PATH = os.environ.get(
+    "DC_COST_COEFFICIENTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "coefficients.json"),
+)
+
+
+def load_coefficients(path=COEFFICIENTS_PATH):
+    """
+    Load a fitted coefficient file written by calibration.py. Missing keys
+    (or a missing file) fall back to the built-in retuned constants.
+    Returns:
+        dict: version, base_hours_per_bus, tier_complexity_factors, bus_calibration
+    """
+    coefficients = json.loads(json.dumps(DEFAULT_COEFFICIENTS))
+    if not path or not os.path.exists(path):
+        return coefficients
+
+    with open(path, "r", encoding="utf-8") as fh:
+        fitted = json.load(fh)
+
+    coefficients["version"] = fitted.get("version", coefficients["version"])
+    coefficients["source"] = os.path.basename(path)
+    coefficients["base_hours_per_bus"].update(fitted.get("base_hours_per_bus", {}))
+    coefficients["tier_complexity_factors"].update(fitted.get("tier_complexity_factors", {}))
+    coefficients["bus_calibration"] = fitted.get("bus_calibration", coefficients["bus_calibration"])
+    return coefficients
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VECTORIZED STUDY HOURS (BATCH PATH)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+GRADES = ["senior", "mid", "junior"]
+
+# Widget defaults in app.py, used when a batch input omits a column
+DEFAULT_STUDY_FACTORS = {
+    "load_flow": 1.0,
+    "short_circuit": 1.0,
+    "pdc": 1.0,
+    "arc_flash": 1.0,
+    "harmonics": 1.2,
+    "transient": 1.3,
+}
+DEFAULT_STUDIES_SELECTED = {
+    "load_flow": True,
+    "short_circuit": True,
+    "pdc": True,
+    "arc_flash": True,
+    "harmonics": False,
+    "transient": False,
+}
+DEFAULT_WORK_ALLOCATION = {"senior": 20, "mid": 30, "junior": 50}
+
+
+def calculate_study_hours_batch(
+    estimated_buses,
+    tier_level,
+    studies_selected,
+    study_factors=None,
+    hour_reduction=0,
+    coefficients=None
+):
+    """
+    Per-study hours for many quotes at once, same formula as the app's study loop.
+    studies_selected and study_factors are (n, 6) arrays in STUDY_KEYS order
+    (study_factors may also be a single row); hour_reduction is the ETAP
+    reduction in % (0 for Typical Model).
+    Returns:
+        tuple: (base_hours, hours), both (n, 6) with zeros for unselected studies
+    """
+    coefficients = coefficients or DEFAULT_COEFFICIENTS
+    buses = np.asarray(estimated_buses, dtype=float)[:, None]
+    tier = np.asarray(tier_level)
+    if tier.dtype.kind not in "iu":
+        tier = tier_codes(tier)
+    tier_table = np.array([coefficients["tier_complexity_factors"][t] for t in TIER_LEVELS])
+    tier_complexity = tier_table[np.clip(tier, 0, len(TIER_LEVELS) - 1)][:, None]
+
+    base_hours_per_bus = np.array([coefficients["base_hours_per_bus"][k] for k in STUDY_KEYS])
+    if study_factors is None:
+        study_factors = [DEFAULT_STUDY_FACTORS[k] for k in STUDY_KEYS]
+    factors = np.asarray(study_factors, dtype=float)
+    selected = np.asarray(studies_selected, dtype=bool)
+
+    base_hours = buses * base_hours_per_bus * factors * tier_complexity
+    base_hours = np.where(selected, base_hours, 0.0)
+    reduction = np.asarray(hour_reduction, dtype=float)
+    if reduction.ndim:
+        reduction = reduction[:, None]
+    hours = base_hours * (1 - reduction / 100)
+    return base_hours, hours
+
+
+def split_grade_hours(hours, work_allocation):
+    """
+    Split (n, 6) study hours by grade. work_allocation is (n, 3) or (3,)
+    percentages in GRADES order.
+    Returns:
+        np.ndarray: (n, 6, 3) senior/mid/junior hours
+    """
+    allocation = np.asarray(work_allocation, dtype=float) / 100
+    if allocation.ndim == 1:
+        allocation = allocation[None, :]
+    return hours[:, :, None] * allocation[:, None, :]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COSTING (SCALAR AND BATCH SHARE THIS PATH)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+REPORT_MULTIPLIERS = {"Basic": 0.8, "Standard": 1.0, "Premium": 1.5}
+
+
+def calculate_costs_batch(
+    grade_hours,
+    rates,
+    rate_multiplier=1.0,
+    discount_multiplier=1.0,
+    report_costs=0,
+    report_multiplier=1.0,
+    meeting_costs=0,
+    additional_costs=0,
+    custom_margin=0,
+    money_mode="float"
+):
+    """
+    Cost roll-up for n quotes, the same arithmetic the app shows on screen.
+    grade_hours: (n, 6, 3) from split_grade_hours(); rates: (n, 3) or (3,) ₹/hr;
+    report_costs: (n, 6) or (6,) base report cost of each *selected* study
+    (pass zeros for unselected ones); the remaining arguments are scalars or (n,).
+
+    money_mode="float" keeps rupee floats. money_mode="paise" returns int64
+    paise with the rounding points defined in money.py, so batch totals
+    reconcile exactly with the on-screen quote.
+    Returns:
+        dict: grade_costs (n, 6, 3), study_costs (n, 6), report_costs (n, 6),
+        total_study_cost, total_report_cost, subtotal, total_cost (n,)
+    """
+    n = grade_hours.shape[0]
+    COSTING_EVALUATIONS.inc(n)
+    rates = np.broadcast_to(np.asarray(rates, dtype=float), (n, 3))
+    rate_multiplier = np.asarray(rate_multiplier, dtype=float)
+    discount_multiplier = np.asarray(discount_multiplier, dtype=float)
+    if rate_multiplier.ndim:
+        rate_multiplier = rate_multiplier[:, None, None]
+    if discount_multiplier.ndim:
+        discount_multiplier = discount_multiplier[:, None, None]
+    report_multiplier = np.asarray(report_multiplier, dtype=float)
+    if report_multiplier.ndim:
+        report_multiplier = report_multiplier[:, None]
+
+    if kernels.ENABLED:
+        grade_costs, kernel_study_costs = kernels.grade_costs(grade_hours, rates, rate_multiplier, discount_multiplier)
+    else:
+        grade_costs = grade_hours * rates[:, None, :] * rate_multiplier * discount_multiplier
+    study_reports = np.broadcast_to(np.asarray(report_costs, dtype=float), (n, len(STUDY_KEYS))) * report_multiplier
+    meeting_costs = np.broadcast_to(np.asarray(meeting_costs), (n,))
+    additional_costs = np.broadcast_to(np.asarray(additional_costs), (n,))
+
+    if money_mode == "paise":
+        # Rounding points: each grade line and each report line, once
+        grade_costs = to_paise(grade_costs).reshape(grade_costs.shape)
+        study_reports = to_paise(study_reports).reshape(study_reports.shape)
+        meeting_costs = to_paise(meeting_costs).reshape(n)
+        additional_costs = to_paise(additional_costs).reshape(n)
+    elif money_mode != "float":
+        raise ValueError(f"Unknown money_mode: {money_mode}")
+
+    if kernels.ENABLED and money_mode == "float":
+        study_costs = kernel_study_costs
+    else:
+        study_costs = grade_costs[:, :, 0] + grade_costs[:, :, 1] + grade_costs[:, :, 2]
+    total_study_cost = study_costs.sum(axis=1)
+    total_report_cost = study_reports.sum(axis=1)
+    subtotal = total_study_cost + meeting_costs + total_report_cost + additional_costs
+
+    if money_mode == "paise":
+        total_cost = np.broadcast_to(apply_margin(subtotal, custom_margin), (n,))
+    else:
+        total_cost = subtotal * (1 + np.asarray(custom_margin, dtype=float) / 100)
+
+    return {
+        "grade_costs": grade_costs,
+        "study_costs": study_costs,
+        "report_costs": study_reports,
+        "total_study_cost": total_study_cost,
+        "total_report_cost": total_report_cost,
+        "subtotal": subtotal,
+        "total_cost": total_cost,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BATCH QUOTE PRICING (FLAT INPUT RECORDS)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# One quote as a flat record; defaults mirror the app's widget defaults
+DEFAULT_QUOTE_INPUTS = {
+    "project_name": "Project-Alpha",
+    "tier_level": "Tier IV",
+    "it_capacity": 5.0,
+    "mechanical_load": 3.0,
+    "house_load": 2.0,
+    "delivery_type": "Standard",
+    "report_complexity": "Standard",
+    "client_meetings": 3,
+    "customer_type": "New Customer",
+    "repeat_discount": 0,
+    "custom_margin": 15,
+    "pue": 1.56,
+    "bus_calibration": None,  # None -> active coefficient set
+    "ups_lineup": 1.5,
+    "transformer_mva": 3.0,
+    "lv_bus_mw": 3.0,
+    "pdu_mva": 0.3,
+    "power_factor": 0.95,
+    "redundancy_scheme": "",  # blank -> follows tier_level
+    "model_type": "Typical Model",
+    "hour_reduction": 0,
+    "senior": 20,
+    "mid": 30,
+    "junior": 50,
+    "senior_rate": 2000,
+    "mid_rate": 1100,
+    "junior_rate": 750,
+    "urgency_multiplier": 1.0,
+    "meeting_cost": 8000,
+    "site_visits": 2,
+    "site_visit_cost": 12000,
+    "num_labels": 0,
+    "cost_per_label": 0,
+    "stickering_cost": 0,
+    "custom_charges_cost": 0,
+    "custom_cost_1_amount": 0,
+    "custom_cost_2_amount": 0,
+}
+DEFAULT_QUOTE_INPUTS.update(DEFAULT_STUDIES_SELECTED)
+DEFAULT_QUOTE_INPUTS.update({f"{key}_factor": value for key, value in DEFAULT_STUDY_FACTORS.items()})
+DEFAULT_QUOTE_INPUTS.update({
+    "load_flow_report_cost": 8000,
+    "short_circuit_report_cost": 10000,
+    "pdc_report_cost": 15000,
+    "arc_flash_report_cost": 12000,
+    "harmonics_report_cost": 11000,
+    "transient_report_cost": 13000,
+})
+
+
+def _input_column(quotes, name, default):
+    if name in quotes.columns:
+        column = quotes[name]
+        return column.where(column.notna(), default).to_numpy()
+    return np.full(len(quotes), default)
+
+
+def price_quotes(quotes, coefficients=None, money_mode="float"):
+    """
+    Price many quotes in one vectorized pass: bus count, per-study hours by
+    grade and the full cost roll-up. quotes is a pandas DataFrame (or list of
+    dicts) using DEFAULT_QUOTE_INPUTS keys; missing columns take the defaults.
+    Returns:
+        dict: estimated_buses, base_hours, hours, grade_hours plus every
+        calculate_costs_batch() output, all arrays over quotes
+    """
+    coefficients = coefficients or load_coefficients()
+    if not isinstance(quotes, pd.DataFrame):
+        quotes = pd.DataFrame(list(quotes))
+    defaults = dict(DEFAULT_QUOTE_INPUTS, bus_calibration=coefficients["bus_calibration"])
+
+    def col(name, dtype=None):
+        values = _input_column(quotes, name, defaults[name])
+        return values.astype(dtype) if dtype else values
+
+    it_mw = col("it_capacity", float)
+    mech_mw = col("mechanical_load", float)
+    house_mw = col("house_load", float)
+    tiers = tier_codes(col("tier_level"))
+
+    estimated_buses = calculate_bus_count_batch(
+        total_mw=it_mw + mech_mw + house_mw,
+        it_capacity=it_mw,
+        mechanical_load=mech_mw,
+        house_load=house_mw,
+        tier_level=tiers,
+        ups_lineup=col("ups_lineup", float),
+        transformer_mva=col("transformer_mva", float),
+        lv_bus_mw=col("lv_bus_mw", float),
+        pdu_mva=col("pdu_mva", float),
+        power_factor=col("power_factor", float),
+        bus_calibration=col("bus_calibration", float),
+        redundancy=col("redundancy_scheme"),
+    )
+
+    selected = np.column_stack([col(key, bool) for key in STUDY_KEYS])
+    factors = np.column_stack([col(f"{key}_factor", float) for key in STUDY_KEYS])
+    etap = col("model_type") == "ETAP Model Available"
+    base_hours, hours = calculate_study_hours_batch(
+        estimated_buses, tiers, selected, factors,
+        hour_reduction=np.where(etap, col("hour_reduction", float), 0.0),
+        coefficients=coefficients,
+    )
+
+    # Allocation is normalised to 100% the same way the app does it; values the
+    # app already normalised (rounded to 0.1, so within ±0.5 of 100) pass through
+    allocation = np.column_stack([col(grade, float) for grade in GRADES])
+    allocation_total = allocation.sum(axis=1, keepdims=True)
+    allocation = np.where(
+        np.abs(allocation_total - 100) > 0.5, np.round(allocation * (100 / allocation_total), 1), allocation
+    )
+    grade_hours = split_grade_hours(hours, allocation)
+
+    rate_multiplier = np.where(col("delivery_type") == "Urgent", col("urgency_multiplier", float), 1.0)
+    discount_multiplier = np.where(
+        col("customer_type") == "Repeat Customer", 1 - col("repeat_discount", float) / 100, 1.0
+    )
+    report_costs = np.where(
+        selected, np.column_stack([col(f"{key}_report_cost", float) for key in STUDY_KEYS]), 0.0
+    )
+    report_multiplier = pd.Series(col("report_complexity")).map(REPORT_MULTIPLIERS).to_numpy(dtype=float)
+    additional_costs = (
+        col("site_visits", float) * col("site_visit_cost", float)
+        + col("num_labels", float) * col("cost_per_label", float)
+        + col("stickering_cost", float)
+        + col("custom_charges_cost", float)
+        + col("custom_cost_1_amount", float)
+        + col("custom_cost_2_amount", float)
+    )
+
+    result = calculate_costs_batch(
+        grade_hours,
+        np.column_stack([col("senior_rate", float), col("mid_rate", float), col("junior_rate", float)]),
+        rate_multiplier=rate_multiplier,
+        discount_multiplier=discount_multiplier,
+        report_costs=report_costs,
+        report_multiplier=report_multiplier,
+        meeting_costs=col("client_meetings", float) * col("meeting_cost", float),
+        additional_costs=additional_costs,
+        custom_margin=col("custom_margin", float),
+        money_mode=money_mode,
+    )
+    result.update({
+        "estimated_buses": estimated_buses,
+        "base_hours": base_hours,
+        "hours": hours,
+        "grade_hours": grade_hours,
+    })
+    return result
+
+
+def sweep_quote(quote, grid, coefficients=None, money_mode="float"):
+    """
+    Price one quote over a grid of values for one or more inputs in a single
+    vectorized pass (e.g. every IT MW step of the slider).
+    quote: flat input record; grid: {field: values}, crossed when several.
+    Returns:
+        dict: price_quotes() output for the grid points (flattened in
+        C order over the grid fields) plus 'grid_shape'
+    """
+    axes = [np.asarray(values) for values in grid.values()]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    n = mesh[0].size
+    columns = {
+        key: np.full(n, value, dtype=object if isinstance(value, str) else None)
+        for key, value in quote.items()
+        if key not in grid and key in DEFAULT_QUOTE_INPUTS
+    }
+    for field, values in zip(grid, mesh):
+        columns[field] = values.ravel()
+    result = price_quotes(pd.DataFrame(columns), coefficients, money_mode)
+    result["grid_shape"] = mesh[0].shape
+    return result
@@ -0,0 +1,265 @@
+"""
+Portfolio-level team utilization forecast across the quote pipeline.
+
+Each open/probable quote contributes its per-study senior/mid/junior hours,
+weighted by win probability, spread evenly over the weeks each study runs.
+Study timing follows the scheduler's precedence chain with one engineer per
+grade per study. Weekly bucketing is done with event sums (a ramp starts at
+each study start and stops at its end) so cost is O(quotes + weeks) rather
+than O(quotes x weeks).
+
+Usage:
+    python forecast.py pipeline.csv --senior 6 --mid 10 --junior 14 --output weekly.csv
+
+Pipeline columns: quote_id, win_probability (0-1 or %), start_date, plus any
+cost_engine.DEFAULT_QUOTE_INPUTS fields (tier_level, it_capacity,
+mechanical_load, house_load, study selections, factors, allocation ...).
+Rows with status "lost" are ignored.
+"""
+
+import argparse
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import GRADES, STUDY_KEYS, load_coefficients, price_quotes
+from scheduler import STUDY_PRECEDENCE
+
+HOURS_PER_WEEK = 40.0
+
+# Distinct quote rows kept by PipelineForecaster before it drops those not
+# in the current pipeline
+MAX_CACHED_QUOTES = 100000
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PER-QUOTE HOURS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _column(frame, name, default):
+    if name in frame.columns:
+        return frame[name].fillna(default).to_numpy()
+    return np.full(len(frame), default)
+
+
+def quote_grade_hours(pipeline, coefficients=None):
+    """
+    Per-study grade hours for every quote in the pipeline (via price_quotes()).
+    Returns:
+        np.ndarray: (n, 6, 3) hours in STUDY_KEYS x GRADES order
+    """
+    return price_quotes(pipeline, coefficients)["grade_hours"]
+
+
+def study_timing(grade_hours, hours_per_week=HOURS_PER_WEEK):
+    """
+    Study start offsets and durations in weeks, relative to each quote's start.
+    Each grade's share of a study sits with one engineer, so a study lasts as
+    long as its largest grade share; unselected studies take zero time.
+    Returns:
+        tuple: (start_weeks, duration_weeks), both (n, 6)
+    """
+    duration = grade_hours.max(axis=2) / hours_per_week
+    start = np.zeros_like(duration)
+    end = np.zeros_like(duration)
+    # STUDY_KEYS is already in precedence order
+    for s, key in enumerate(STUDY_KEYS):
+        for parent in STUDY_PRECEDENCE[key]:
+            start[:, s] = np.maximum(start[:, s], end[:, STUDY_KEYS.index(parent)])
+        end[:, s] = start[:, s] + duration[:, s]
+    return start, duration
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WEEKLY BUCKETING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def bucket_weekly(start, duration, amount, n_weeks):
+    """
+    Spread each amount evenly over [start, start + duration) (in weeks) and
+    total per whole week. Expected hours up to time t are
+    sum(rate * clip(t - start, 0, duration)), i.e. t*A(t) - B(t) where A and B
+    are running sums of +rate/-rate events, evaluated at week boundaries.
+    Returns:
+        np.ndarray: (n_weeks,) totals
+    """
+    start = np.ravel(start)
+    duration = np.ravel(duration)
+    amount = np.ravel(amount)
+    keep = (amount > 0) & (duration > 0)
+    start, duration, amount = start[keep], duration[keep], amount[keep]
+    rate = amount / duration
+
+    times = np.concatenate([start, start + duration])
+    rates = np.concatenate([rate, -rate])
+    # An event at time tau affects boundaries t > tau
+    slot = np.clip(np.floor(times).astype(np.int64) + 1, 0, n_weeks + 1)
+    a = np.cumsum(np.bincount(slot, weights=rates, minlength=n_weeks + 2))[: n_weeks + 1]
+    b = np.cumsum(np.bincount(slot, weights=rates * times, minlength=n_weeks + 2))[: n_weeks + 1]
+    boundary = np.arange(n_weeks + 1)
+    cumulative = boundary * a - b
+    return np.diff(cumulative)
+
+
+def weekly_utilization(grade_hours, start_weeks, win_probability, headcount=None,
+                       hours_per_week=HOURS_PER_WEEK, horizon_weeks=None):
+    """
+    Expected hours per grade per week from precomputed quote hours.
+    start_weeks is each quote's start offset (weeks) from the forecast origin.
+    Returns:
+        pd.DataFrame: week index plus <grade>_hours, and <grade>_utilization
+        when headcount is given
+    """
+    study_start, study_duration = study_timing(grade_hours, hours_per_week)
+    study_start = study_start + np.asarray(start_weeks, dtype=float)[:, None]
+    end = (study_start + study_duration).max() if study_start.size else 0
+    n_weeks = int(horizon_weeks or max(int(np.ceil(end)), 1))
+
+    p = np.asarray(win_probability, dtype=float)[:, None]
+    weekly = {"week": np.arange(n_weeks)}
+    for g, grade in enumerate(GRADES):
+        weekly[f"{grade}_hours"] = bucket_weekly(
+            study_start, study_duration, grade_hours[:, :, g] * p, n_weeks
+        )
+    frame = pd.DataFrame(weekly)
+    if headcount:
+        for grade in GRADES:
+            capacity = headcount.get(grade, 0) * hours_per_week
+            frame[f"{grade}_utilization"] = frame[f"{grade}_hours"] / capacity if capacity else np.inf
+    return frame
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHED PIPELINE FORECAST
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _schema_hash(frame):
+    # Column names and dtypes as one uint64, to combine with row hashes
+    schema = repr([(str(name), str(dtype)) for name, dtype in frame.dtypes.items()])
+    return np.frombuffer(hashlib.blake2b(schema.encode("utf-8"), digest_size=8).digest(), dtype=np.uint64)[0]
+
+
+class PipelineForecaster:
+    """
+    Keeps per-quote hour breakdowns keyed by a hash of the quote row, so a
+    re-forecast only re-prices quotes that were added or changed. The weekly
+    result itself is reused until any quote (or the forecast settings) change.
+    Thread-safe: the app shares one instance between sessions.
+    """
+
+    def __init__(self, coefficients=None, hours_per_week=HOURS_PER_WEEK, max_quotes=MAX_CACHED_QUOTES):
+        self.coefficients = coefficients or load_coefficients()
+        self.hours_per_week = hours_per_week
+        self.max_quotes = max_quotes
+        # (hashes, hours) and (key, result) are each replaced as one tuple
+        self._known = (pd.Index(np.empty(0, dtype=np.uint64)), np.empty((0, len(STUDY_KEYS), len(GRADES))))
+        self._last = (None, None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _hours_for(self, pipeline):
+        price_columns = pipeline.drop(
+            columns=[c for c in ("quote_id", "win_probability", "start_date", "status") if c in pipeline.columns]
+        )
+        # Row hashes ignore column names, so mix in the schema: the same values
+        # under other columns (or dtypes) must not share an entry
+        hashes = pd.util.hash_pandas_object(price_columns, index=False).to_numpy() ^ _schema_hash(price_columns)
+        with self._lock:
+            known, hours = self._known
+            position = known.get_indexer(hashes)
+            missing = position < 0
+            if missing.any():
+                new_hashes, first = np.unique(hashes[missing], return_index=True)
+                new_rows = np.nonzero(missing)[0][first]
+                hours = np.concatenate([hours, quote_grade_hours(pipeline.iloc[new_rows], self.coefficients)])
+                known = known.append(pd.Index(new_hashes))
+                if len(known) > self.max_quotes:
+                    # Over the cap: keep only this pipeline's quotes
+                    keep = known.get_indexer(np.unique(hashes))
+                    known, hours = known[keep], hours[keep]
+                self._known = (known, hours)
+                position = known.get_indexer(hashes)
+        return hours[position]
+
+    def forecast(self, pipeline, headcount=None, origin=None, horizon_weeks=None):
+        """
+        Weekly expected senior/mid/junior hours for the pipeline.
+        origin: first forecast week (default: Monday of the earliest start date)
+        """
+        if "status" in pipeline.columns:
+            pipeline = pipeline[pipeline["status"].astype(str).str.lower() != "lost"]
+        pipeline = pipeline.reset_index(drop=True)
+
+        key = (
+            hashlib.blake2b(pd.util.hash_pandas_object(pipeline, index=False).to_numpy().tobytes()).hexdigest(),
+            int(_schema_hash(pipeline)),
+            tuple(sorted((headcount or {}).items())),
+            origin,
+            horizon_weeks,
+        )
+        with self._lock:
+            last_key, last_result = self._last
+            if key == last_key:
+                self.hits += 1
+                return last_result
+            self.misses += 1
+
+        grade_hours = self._hours_for(pipeline)
+        starts = pd.to_datetime(pipeline["start_date"]).to_numpy(dtype="datetime64[D]")
+        if origin is None:
+            first = starts.min() if len(starts) else np.datetime64("today", "D")
+            # Monday of the first week (1970-01-01 was a Thursday)
+            origin = first - ((first.astype(np.int64) + 3) % 7)
+        origin = np.datetime64(origin, "D")
+        start_weeks = (starts - origin).astype(np.int64) / 7.0
+
+        probability = _column(pipeline, "win_probability", 1.0).astype(float)
+        probability = np.where(probability > 1, probability / 100, probability)
+
+        result = weekly_utilization(
+            grade_hours, start_weeks, probability, headcount,
+            self.hours_per_week, horizon_weeks,
+        )
+        result.insert(0, "week_start", origin + result["week"].to_numpy() * 7)
+        with self._lock:
+            self._last = (key, result)
+        return result
+
+
+def saturation_week(weekly, grade="senior", threshold=1.0):
+    """First week_start where a grade's expected utilization exceeds threshold, else None."""
+    column = f"{grade}_utilization"
+    if column not in weekly.columns:
+        return None
+    over = weekly.index[weekly[column] > threshold]
+    return weekly.loc[over[0], "week_start"] if len(over) else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Weekly team utilization forecast for the quote pipeline")
+    parser.add_argument("pipeline", help="CSV/XLSX of open and probable quotes")
+    parser.add_argument("--senior", type=int, default=2)
+    parser.add_argument("--mid", type=int, default=3)
+    parser.add_argument("--junior", type=int, default=4)
+    parser.add_argument("--hours-per-week", type=float, default=HOURS_PER_WEEK)
+    parser.add_argument("--output", help="write the weekly table to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.pipeline.lower().endswith((".xlsx", ".xls")):
+        pipeline = pd.read_excel(args.pipeline)
+    else:
+        pipeline = pd.read_csv(args.pipeline)
+
+    headcount = {"senior": args.senior, "mid": args.mid, "junior": args.junior}
+    weekly = PipelineForecaster(hours_per_week=args.hours_per_week).forecast(pipeline, headcount)
+    if args.output:
+        weekly.to_csv(args.output, index=False)
+    for grade in GRADES:
+        week = saturation_week(weekly, grade)
+        peak = weekly[f"{grade}_utilization"].max()
+        status = f"saturates week of {week}" if week is not None else "within capacity"
+        print(f"{grade:<7} peak {peak:6.0%}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Optional Numba-compiled kernels for the batch bus count and study costing.
+
+The NumPy batch path materialises every intermediate array; these kernels
+are straight per-row loops (component counts, then the row's redundancy
+scheme coefficients from cost_engine.REDUNDANCY), compiled with Numba when it
+is installed. Without Numba (or with DC_NUMBA=0) ENABLED is False and
+cost_engine keeps its NumPy path; the loops are still importable as plain
+Python for checking.
+
+Compiled machine code is cached on disk (njit(cache=True), under
+__pycache__ or NUMBA_CACHE_DIR), so new worker processes load the kernels
+instead of recompiling; warm_kernels() triggers the load up front.
+"""
+
+import math
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+ENABLED = numba is not None and os.environ.get("DC_NUMBA", "1") != "0"
+
+
+def _jit(func):
+    if not ENABLED:
+        return func
+    return numba.njit(cache=True, nogil=True)(func)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# KERNELS (same arithmetic order as cost_engine's scalar and NumPy paths)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@_jit
+def _bus_count_loop(
+    total_mw, it_mw, mechanical_load, house_load, scheme, mech_fraction, ups_lineup,
+    transformer_mva, lv_bus_mw, pdu_mva, mv_base, utility_incomers, power_factor,
+    voltage_levels, backup_gens, expansion_factor, bus_calibration,
+    scheme_matrix, scheme_floor, scheme_factor, out
+):
+    n_components = scheme_matrix.shape[1] - 1
+    components = np.empty(n_components)
+    for i in range(total_mw.shape[0]):
+        non_it_mw = max(total_mw[i] - it_mw[i], 0.0)
+        if mechanical_load[i] > 0 or house_load[i] > 0:
+            mech_mw = mechanical_load[i]
+            house_mw = house_load[i]
+        else:
+            mech_mw = mech_fraction[i] * non_it_mw
+            house_mw = non_it_mw - mech_mw
+
+        lv_total = 0.0
+        if lv_bus_mw[i] > 0:
+            lv_total = (
+                math.ceil(it_mw[i] / lv_bus_mw[i])
+                + math.ceil(mech_mw / lv_bus_mw[i])
+                + math.ceil(house_mw / lv_bus_mw[i])
+            )
+        ups_output_buses = math.ceil(it_mw[i] / ups_lineup[i]) if ups_lineup[i] > 0 else 0
+        pdus_total = math.ceil(it_mw[i] / pdu_mva[i]) if pdu_mva[i] > 0 else 0
+        tx_count_n = 0
+        if transformer_mva[i] > 0:
+            tx_count_n = math.ceil(total_mw[i] / (transformer_mva[i] * power_factor[i]))
+        mv_buses = mv_base[i] + (utility_incomers[i] - 1)
+        voltage_additions = (voltage_levels[i] - 2) * (tx_count_n + 1) if voltage_levels[i] > 2 else 0
+        generator_additions = backup_gens[i] * 2 if backup_gens[i] > 0 else 0
+
+        # Component order matches cost_engine.BUS_COMPONENTS
+        components[0] = mv_buses
+        components[1] = tx_count_n
+        components[2] = lv_total
+        components[3] = ups_output_buses
+        components[4] = pdus_total
+        components[5] = voltage_additions + generator_additions
+
+        s = scheme[i]
+        total = 0.0
+        for c in range(n_components):
+            term = components[c] * scheme_matrix[s, c]
+            if scheme_floor[s, c]:
+                term = math.floor(term)
+            total += term
+        total += scheme_matrix[s, n_components]
+        out[i] = total * expansion_factor[i] * scheme_factor[s] * bus_calibration[i]
+    return out
+
+
+@_jit
+def _grade_cost_loop(grade_hours, rates, rate_multiplier, discount_multiplier, grade_costs, study_costs):
+    n, studies, grades = grade_hours.shape
+    for i in range(n):
+        for s in range(studies):
+            subtotal = 0.0
+            for g in range(grades):
+                cost = grade_hours[i, s, g] * rates[i, g] * rate_multiplier[i] * discount_multiplier[i]
+                grade_costs[i, s, g] = cost
+                subtotal += cost
+            study_costs[i, s] = subtotal
+    return grade_costs, study_costs
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ENTRY POINTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def bus_count(total_mw, it_capacity, mechanical_load, house_load, scheme, mech_fraction, ups_lineup,
+              transformer_mva, lv_bus_mw, pdu_mva, mv_base, utility_incomers, power_factor,
+              voltage_levels, backup_gens, expansion_factor, bus_calibration, compiled):
+    """
+    Un-rounded calibrated bus counts; arguments broadcast together, scheme is
+    a resolved row index into compiled (cost_engine.REDUNDANCY).
+    """
+    args = np.broadcast_arrays(
+        total_mw, it_capacity, mechanical_load, house_load, scheme, mech_fraction, ups_lineup,
+        transformer_mva, lv_bus_mw, pdu_mva, mv_base, utility_incomers, power_factor,
+        voltage_levels, backup_gens, expansion_factor, bus_calibration,
+    )
+    shape = args[0].shape
+    flat = [np.ascontiguousarray(a, dtype=float).ravel() for a in args]
+    flat[4] = np.ascontiguousarray(args[4], dtype=np.int64).ravel()
+    out = np.empty(flat[0].size)
+    return _bus_count_loop(
+        *flat,
+        np.ascontiguousarray(compiled["matrix"], dtype=float),
+        np.ascontiguousarray(compiled["floor"]),
+        np.ascontiguousarray(compiled["factor"], dtype=float),
+        out,
+    ).reshape(shape)
+
+
+def grade_costs(grade_hours, rates, rate_multiplier, discount_multiplier):
+    """
+    Per-grade and per-study engineering cost.
+    Returns:
+        tuple: grade_costs (n, 6, 3), study_costs (n, 6)
+    """
+    grade_hours = np.ascontiguousarray(grade_hours, dtype=float)
+    n, studies, grades = grade_hours.shape
+    return _grade_cost_loop(
+        grade_hours,
+        np.ascontiguousarray(np.broadcast_to(np.asarray(rates, dtype=float), (n, grades))),
+        # Multipliers may arrive as scalars, (n,) or (n, 1, 1)
+        np.ascontiguousarray(np.broadcast_to(np.ravel(np.asarray(rate_multiplier, dtype=float)), (n,))),
+        np.ascontiguousarray(np.broadcast_to(np.ravel(np.asarray(discount_multiplier, dtype=float)), (n,))),
+        np.empty((n, studies, grades)),
+        np.empty((n, studies)),
+    )
+
+
+def warm_kernels():
+    """Load (or compile once) both kernels so the first real batch isn't delayed."""
+    if not ENABLED:
+        return False
+    one = np.ones(1)
+    compiled = {"matrix": np.ones((1, 7)), "floor": np.zeros((1, 7), dtype=bool), "factor": one}
+    bus_count(one, one, one, one, np.zeros(1, dtype=np.int64), one, one, one, one, one,
+              one, one, one, one, one, one, one, compiled)
+    grade_costs(np.ones((1, 6, 3)), np.ones(3), 1.0, 1.0)
+    return True
@@ -0,0 +1,314 @@
+"""
+Concurrent-session load test for the estimator, run entirely locally.
+
+Drives N simulated sessions through app.py with Streamlit's AppTest, each
+moving it_capacity, tier_level and the study checkboxes in realistic
+sequences, and reports throughput, rerun latency percentiles, session_state
+size and peak RSS per session. AppTest runs the script against Streamlit's
+process-wide Runtime, so sessions cannot share a process: each one runs in
+its own worker process (this script with --session) and hands its figures
+back in a JSON file. Like a production worker behind the /ready probe
+(warmup.py), a worker finishes warm-up before its session starts, so the
+session's reruns never race the warm-up thread's imports. Each run writes a JSON report keyed by the current git
+commit so runs can be compared commit to commit. The audit log, portfolio
+job and shared cache directories point at a temporary directory for the
+run, so it leaves no entries behind.
+
+Usage:
+    python loadtest.py --sessions 20 --steps 15
+    python loadtest.py --sessions 20 --baseline loadtest-reports/<commit>.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import pickle
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+SCRIPT_PATH = os.path.abspath(__file__)
+REPORT_DIR = "loadtest-reports"
+
+# Directories the app writes to, redirected into a scratch directory per run
+SCRATCH_DIRS = {
+    "DC_AUDIT_DIR": "audit-log",
+    "DC_PORTFOLIO_JOBS_DIR": "portfolio-jobs",
+    "DC_SHARED_CACHE_DIR": "shared-cache",
+}
+
+TIERS = ["Tier I", "Tier II", "Tier III", "Tier IV"]
+STUDY_CHECKBOXES = [
+    "Load Flow Study",
+    "Short Circuit Study",
+    "Protective Device Coordination",
+    "Arc Flash Study",
+    "Harmonics Study",
+    "Transient Analysis",
+]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SESSION BEHAVIOUR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"widget not found: {label}")
+
+
+def session_actions(rng, steps):
+    """
+    A realistic edit sequence: mostly nudging IT capacity up or down the way a
+    user steps a number input, with occasional tier changes and study toggles.
+    """
+    it_capacity = round(rng.uniform(2, 60), 1)
+    actions = []
+    for _ in range(steps):
+        roll = rng.random()
+        if roll < 0.6:
+            it_capacity = round(min(max(it_capacity + rng.choice([-1, 1]) * rng.choice([0.1, 0.5, 1.0, 5.0]), 0.0), 200.0), 1)
+            actions.append(("number_input", "IT Capacity (MW)", it_capacity))
+        elif roll < 0.8:
+            actions.append(("selectbox", "Tier Level", rng.choice(TIERS)))
+        else:
+            actions.append(("checkbox", rng.choice(STUDY_CHECKBOXES), None))
+    return actions
+
+
+def run_session(session_id, steps, seed, timeout):
+    """
+    Run one simulated session in this process. Only reruns that completed
+    without an exception count towards the latencies.
+    Returns:
+        dict: rerun latencies, error count, session_state size, peak RSS and
+        warm-up time
+    """
+    from streamlit.testing.v1 import AppTest
+    import warmup
+
+    rng = random.Random(seed + session_id)
+    latencies = []
+    errors = 0
+
+    started = time.perf_counter()
+    warmup.start_warmup()
+    while not warmup.is_ready() and time.perf_counter() - started < timeout:
+        time.sleep(0.05)
+    warmup_seconds = time.perf_counter() - started
+
+    def rerun():
+        started = time.perf_counter()
+        at.run()
+        if at.exception:
+            return False
+        latencies.append(time.perf_counter() - started)
+        return True
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    try:
+        if not rerun():
+            errors += 1
+    except Exception:
+        errors += 1
+
+    for kind, label, value in session_actions(rng, steps):
+        try:
+            widget = _widget(getattr(at, kind), label)
+            if kind == "checkbox":
+                value = not widget.value
+            widget.set_value(value)
+            if not rerun():
+                errors += 1
+        except Exception:
+            errors += 1
+
+    try:
+        state = {key: at.session_state[key] for key in at.session_state.keys()}
+        state_bytes = len(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        state_bytes = 0
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "session_state_bytes": state_bytes,
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "warmup_seconds": warmup_seconds,
+    }
+
+
+def spawn_session(session_id, steps, seed, timeout, scratch):
+    """
+    Run one simulated session in its own worker process.
+    Returns:
+        dict: as run_session(); a worker that dies or hangs counts every
+        rerun as an error
+    """
+    result_path = os.path.join(scratch, f"session-{session_id}.json")
+    command = [
+        sys.executable, SCRIPT_PATH, "--session", str(session_id), "--result-file", result_path,
+        "--steps", str(steps), "--seed", str(seed), "--timeout", str(timeout),
+    ]
+    try:
+        subprocess.run(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            timeout=timeout * (steps + 1) + 120, check=True,
+        )
+        with open(result_path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return {"latencies": [], "errors": steps + 1, "session_state_bytes": 0, "peak_rss_bytes": 0, "warmup_seconds": 0.0}
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RUN AND REPORT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(APP_PATH), stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def _peak_rss_bytes():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_load_test(sessions=10, steps=10, concurrency=None, seed=0, timeout=60, scratch=None):
+    """
+    Run the simulated sessions, one worker process each (all sessions
+    concurrent by default), and summarise. Elapsed time and throughput
+    include each worker's start-up.
+    Returns:
+        dict: report with throughput, latency percentiles and memory figures
+    """
+    concurrency = concurrency or sessions
+    scratch = scratch or tempfile.gettempdir()
+    started = time.perf_counter()
+    # The threads only wait on their worker processes
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: spawn_session(i, steps, seed, timeout, scratch), range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([lat for r in results for lat in r["latencies"]])
+    if not latencies.size:
+        raise RuntimeError("no rerun completed; run one session with --session 0 to see the error")
+    state_sizes = [r["session_state_bytes"] for r in results]
+    peak_rss = [r["peak_rss_bytes"] for r in results if r["peak_rss_bytes"]]
+    warmups = [r["warmup_seconds"] for r in results if r["warmup_seconds"]]
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "sessions": sessions,
+        "steps_per_session": steps,
+        "concurrency": concurrency,
+        "reruns": int(latencies.size),
+        "errors": int(sum(r["errors"] for r in results)),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_reruns_per_second": round(latencies.size / elapsed, 2) if elapsed else 0.0,
+        "warmup_seconds_mean": round(float(np.mean(warmups)), 3) if warmups else 0.0,
+        "latency_seconds": {
+            "mean": round(float(latencies.mean()), 4),
+            "p50": round(float(np.percentile(latencies, 50)), 4),
+            "p95": round(float(np.percentile(latencies, 95)), 4),
+            "p99": round(float(np.percentile(latencies, 99)), 4),
+            "max": round(float(latencies.max()), 4),
+        },
+        "memory": {
+            "session_state_bytes_mean": int(np.mean(state_sizes)),
+            # Each session has its own process, so this is a per-session figure
+            # (the app, its imports and one session)
+            "session_peak_rss_bytes_mean": int(np.mean(peak_rss)) if peak_rss else 0,
+            "session_peak_rss_bytes_max": max(peak_rss, default=0),
+        },
+    }
+
+
+def compare_reports(current, baseline):
+    """Relative change of the headline figures versus a baseline report."""
+    def change(new, old):
+        return f"{(new - old) / old:+.1%}" if old else "n/a"
+
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "throughput": change(current["throughput_reruns_per_second"], baseline["throughput_reruns_per_second"]),
+        "p95_latency": change(current["latency_seconds"]["p95"], baseline["latency_seconds"]["p95"]),
+        "peak_rss_per_session": change(
+            current["memory"]["session_peak_rss_bytes_mean"], baseline["memory"]["session_peak_rss_bytes_mean"]
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=10, help="widget changes per session")
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions in flight (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="per-rerun timeout (s)")
+    parser.add_argument("--output-dir", default=REPORT_DIR)
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    # Worker mode: run one session in this process and write its figures
+    parser.add_argument("--session", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.session is not None:
+        result = run_session(args.session, args.steps, args.seed, args.timeout)
+        if args.result_file:
+            with open(args.result_file, "w", encoding="utf-8") as fh:
+                json.dump(result, fh)
+        else:
+            print(json.dumps(result))
+        return
+
+    # Keep the simulated sessions from competing for the metrics port
+    os.environ.setdefault("DC_METRICS_PORT", "0")
+    # The sessions run the real app; keep its audit log, portfolio jobs and
+    # shared cache files out of the working directories (the workers inherit
+    # these before the app's modules, which read them at import time, load)
+    scratch = tempfile.mkdtemp(prefix="dc-loadtest-")
+    for variable, name in SCRATCH_DIRS.items():
+        os.environ[variable] = os.path.join(scratch, name)
+
+    try:
+        report = run_load_test(args.sessions, args.steps, args.concurrency, args.seed, args.timeout, scratch)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            report["comparison"] = compare_reports(report, json.load(fh))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{report['commit']}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+    lat = report["latency_seconds"]
+    print(f"{report['sessions']} sessions, {report['reruns']} reruns, {report['errors']} errors "
+          f"in {report['elapsed_seconds']}s ({report['throughput_reruns_per_second']} reruns/s)")
+    print(f"latency p50 {lat['p50']}s  p95 {lat['p95']}s  max {lat['max']}s")
+    print(f"session_state {report['memory']['session_state_bytes_mean']} B/session, "
+          f"peak RSS {report['memory']['session_peak_rss_bytes_mean'] / 1e6:.0f} MB/session "
+          f"(max {report['memory']['session_peak_rss_bytes_max'] / 1e6:.0f} MB)")
+    if "comparison" in report:
+        print("vs baseline:", report["comparison"])
+    print(f"report: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Runtime health metrics for the estimator, served in Prometheus text format.
+
+A small process-wide registry (counters, gauges, histograms) plus a
+lightweight HTTP endpoint on a daemon thread:
+
+    GET http://127.0.0.1:9464/metrics
+
+Configure with DC_METRICS_HOST / DC_METRICS_PORT (port 0 disables).
+Only the standard library is used, so no prometheus_client dependency.
+"""
+
+import bisect
+import logging
+import os
+import pickle
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = os.environ.get("DC_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("DC_METRICS_PORT", "9464"))
+
+# A session counts as active if it reran within this window
+SESSION_IDLE_SECONDS = 300
+
+# session_state is pickled to measure it on a session's first rerun and then
+# every Nth one; the reruns in between reuse the last size
+SESSION_SIZE_SAMPLE_EVERY = 20
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# METRIC TYPES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items()) or [((), 0)]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Gauge:
+    """A gauge that is either set directly or computed by a callback at scrape time."""
+
+    def __init__(self, name, documentation, callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        if self.callback is not None:
+            items = [(tuple(sorted(labels.items())), value) for labels, value in self.callback()]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for key, value in items or [((), 0)]:
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ESTIMATOR METRICS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+RERUN_SECONDS = Histogram(
+    "estimator_rerun_seconds", "Wall time of one Streamlit script rerun"
+)
+BUS_COUNT_EVALUATIONS = Counter(
+    "estimator_bus_count_evaluations_total", "Bus counts computed (scalar calls plus batch rows)"
+)
+COSTING_EVALUATIONS = Counter(
+    "estimator_costing_evaluations_total", "Quotes costed (scalar calls plus batch rows)"
+)
+CACHE_REQUESTS = Counter(
+    "estimator_cache_requests_total", "Cache lookups by cache and result (hit/miss)"
+)
+SESSION_SIZE_FAILURES = Counter(
+    "estimator_session_state_size_failures_total", "Sampled session_state sizes that could not be pickled"
+)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_local = threading.local()
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def note_cache_miss():
+    """Call from inside a st.cache_* function body; the body only runs on a miss."""
+    _local.missed = True
+
+
+def track_cache(cache, func, *args, **kwargs):
+    """Call a cached function and record whether the lookup was a hit."""
+    _local.missed = False
+    result = func(*args, **kwargs)
+    record_cache(cache, hit=not _local.missed)
+    return result
+
+
+def _cache_hit_ratios():
+    caches = {}
+    for key, value in list(CACHE_REQUESTS._values.items()):
+        labels = dict(key)
+        hits, total = caches.get(labels["cache"], (0, 0))
+        caches[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), total + value)
+    return [({"cache": cache}, hits / total if total else 0) for cache, (hits, total) in caches.items()]
+
+
+def _active_sessions():
+    cutoff = time.time() - SESSION_IDLE_SECONDS
+    with _sessions_lock:
+        for session_id in [s for s, (seen, _, _) in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        return {session_id: size for session_id, (_, size, _) in _sessions.items()}
+
+
+def record_session(session_id, session_state):
+    """
+    Mark a session as active and, on sampled reruns, remember the pickled
+    size of its session_state (failures are counted, not recorded as 0).
+    """
+    with _sessions_lock:
+        _, size, reruns = _sessions.get(session_id, (None, None, 0))
+    if reruns % SESSION_SIZE_SAMPLE_EVERY == 0:
+        try:
+            size = len(pickle.dumps({key: session_state[key] for key in session_state.keys()}, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            SESSION_SIZE_FAILURES.inc()
+    with _sessions_lock:
+        _sessions[session_id] = (time.time(), size, reruns + 1)
+
+
+CACHE_HIT_RATIO = Gauge(
+    "estimator_cache_hit_ratio", "Hits / lookups per cache since process start", callback=_cache_hit_ratios
+)
+ACTIVE_SESSIONS = Gauge(
+    "estimator_active_sessions", f"Sessions that reran in the last {SESSION_IDLE_SECONDS}s",
+    callback=lambda: [({}, len(_active_sessions()))]
+)
+SESSION_STATE_BYTES = Gauge(
+    "estimator_session_state_bytes", "Pickled session_state size across active sessions (sampled)",
+    callback=lambda: [
+        ({"stat": "total"}, sum(size for size in _active_sessions().values() if size is not None)),
+        ({"stat": "max"}, max([size for size in _active_sessions().values() if size is not None] or [0])),
+    ]
+)
+
+REGISTRY = [
+    RERUN_SECONDS,
+    BUS_COUNT_EVALUATIONS,
+    COSTING_EVALUATIONS,
+    CACHE_REQUESTS,
+    CACHE_HIT_RATIO,
+    ACTIVE_SESSIONS,
+    SESSION_STATE_BYTES,
+    SESSION_SIZE_FAILURES,
+]
+
+
+def render_metrics():
+    """Whole registry in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HTTP ENDPOINT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Extra GET routes (path -> callable returning (status, content_type, body))
+ROUTES = {}
+
+_server = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            status, content_type, body = 200, "text/plain; version=0.0.4; charset=utf-8", render_metrics()
+        elif path in ROUTES:
+            status, content_type, body = ROUTES[path]()
+        else:
+            status, content_type, body = 404, "text/plain; charset=utf-8", "not found\n"
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the Streamlit log
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Start the endpoint once per process (safe to call on every rerun).
+    Returns:
+        ThreadingHTTPServer or None if disabled or the port is taken
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server or None
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as exc:
+            logger.warning("Metrics endpoint not started on %s:%s (%s)", host, port, exc)
+            _server = False
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("Metrics endpoint on http://%s:%s/metrics", host, port)
+        return _server
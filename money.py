@@ -0,0 +1,36 @@
+"""
+Fixed-point money helpers: amounts held as int64 paise (1 ₹ = 100 paise).
+
+Rounding points are fixed so the on-screen quote and a batch run produce
+identical integers: each grade cost line and each report line is rounded
+to the paisa once (half up), everything after that is exact integer
+addition, and the margin is applied in integer basis points.
+Works on Python scalars and NumPy arrays alike.
+"""
+
+import numpy as np
+
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(rupees):
+    """Round rupee amounts to the nearest paisa (half up). Returns int or int64 array."""
+    paise = np.floor(np.asarray(rupees, dtype=float) * PAISE_PER_RUPEE + 0.5).astype(np.int64)
+    return int(paise) if paise.ndim == 0 else paise
+
+
+def from_paise(paise):
+    """Paise -> rupees as float, for display only."""
+    rupees = np.asarray(paise, dtype=np.int64) / PAISE_PER_RUPEE
+    return float(rupees) if rupees.ndim == 0 else rupees
+
+
+def apply_margin(subtotal_paise, margin_percent):
+    """
+    subtotal * (1 + margin%) in exact integer arithmetic. The margin is taken
+    in basis points (two decimals of a percent) and rounded half up to the paisa.
+    """
+    subtotal = np.asarray(subtotal_paise, dtype=np.int64)
+    basis_points = np.floor(np.asarray(margin_percent, dtype=float) * 100 + 0.5).astype(np.int64)
+    total = (subtotal * (10000 + basis_points) + 5000) // 10000
+    return int(total) if total.ndim == 0 else total
@@ -0,0 +1,370 @@
+"""
+Pre-aggregated OLAP cube of study hours and costs.
+
+Cells are keyed by tier, IT MW band, model type, customer type and study
+(plus a "total" pseudo-study for whole-quote figures). Each cell holds the
+count, sum and sum of squares of hours and cost, and a log-bucket quantile
+sketch (relative error RELATIVE_ACCURACY) of each, so roll-ups and
+drill-downs are array slices and sums rather than re-estimates:
+
+    cube = CostCube.from_store(open_result_store("results/"))
+    cube.query("cost", study="arc_flash", tier="Tier III", it_mw=(10, 20))
+    cube.rollup("cost", by=["tier", "band"], study="total")
+
+add() folds in new priced quotes incrementally; cubes built on different
+workers combine with merge().
+
+Usage:
+    python olap_cube.py build results/ cube.npz
+    python olap_cube.py query cube.npz --measure cost --study arc_flash --tier "Tier III" --it-mw 10 20
+    python olap_cube.py query cube.npz --by study --tier "Tier IV"
+"""
+
+import argparse
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, STUDY_KEYS, STUDY_NAMES, TIER_LEVELS, tier_codes
+
+DEFAULT_BAND_EDGES = (0, 2, 5, 10, 20, 50, 100, 200, math.inf)
+MODEL_TYPES = ["Typical Model", "ETAP Model Available"]
+CUSTOMER_TYPES = ["New Customer", "Repeat Customer"]
+CUBE_STUDIES = STUDY_KEYS + ["total"]
+MEASURES = ["hours", "cost"]
+DIMENSIONS = ["tier", "band", "model", "customer", "study"]
+
+# Quantile sketch: values are bucketed on a log scale so any quantile is
+# returned within this relative error (DDSketch-style, dense and mergeable)
+RELATIVE_ACCURACY = 0.02
+SKETCH_RANGES = {"hours": (0.1, 1e6), "cost": (10.0, 1e10)}
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOG-BUCKET SKETCH HELPERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _n_buckets(measure):
+    low, high = SKETCH_RANGES[measure]
+    return int(math.ceil(math.log(high / low) / _LOG_GAMMA)) + 1
+
+
+def _bucket_index(values, measure):
+    low, _ = SKETCH_RANGES[measure]
+    scaled = np.maximum(np.asarray(values, dtype=float), low) / low
+    index = np.ceil(np.log(scaled) / _LOG_GAMMA).astype(np.int64)
+    return np.minimum(index, _n_buckets(measure) - 1)
+
+
+def _bucket_value(index, measure):
+    # Midpoint (in relative terms) of bucket i: (low*g^(i-1), low*g^i]
+    low, _ = SKETCH_RANGES[measure]
+    return low * 2 * _GAMMA ** np.asarray(index, dtype=float) / (_GAMMA + 1)
+
+
+def sketch_quantiles(counts, quantiles, measure):
+    """Quantiles from a 1-D bucket count array (NaN when empty)."""
+    total = counts.sum()
+    if total == 0:
+        return [math.nan for _ in quantiles]
+    cumulative = np.cumsum(counts)
+    ranks = np.clip(np.asarray(quantiles, dtype=float) * (total - 1), 0, total - 1)
+    return [float(v) for v in _bucket_value(np.searchsorted(cumulative, ranks, side="right"), measure)]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CUBE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CostCube:
+    """Dense cube over (tier, band, model, customer, study)."""
+
+    def __init__(self, band_edges=DEFAULT_BAND_EDGES):
+        self.band_edges = tuple(float(edge) for edge in band_edges)
+        self.labels = {
+            # Tier code -1 (unrecognised labels) is kept as its own member
+            "tier": TIER_LEVELS + ["Other"],
+            "band": [
+                f"{lo:g}-{hi:g} MW" if math.isfinite(hi) else f"{lo:g}+ MW"
+                for lo, hi in zip(self.band_edges[:-1], self.band_edges[1:])
+            ],
+            "model": MODEL_TYPES + ["Other"],
+            "customer": CUSTOMER_TYPES + ["Other"],
+            "study": list(CUBE_STUDIES),
+        }
+        self.shape = tuple(len(self.labels[dim]) for dim in DIMENSIONS)
+        self.count = np.zeros(self.shape, dtype=np.int64)
+        self.sums = {m: np.zeros(self.shape) for m in MEASURES}
+        self.squares = {m: np.zeros(self.shape) for m in MEASURES}
+        self.sketches = {m: np.zeros(self.shape + (_n_buckets(m),), dtype=np.int64) for m in MEASURES}
+        self.quotes = 0
+
+    # ── building ────────────────────────────────────────────────────────────
+
+    def _codes(self, values, members):
+        codes = np.full(len(values), len(members), dtype=np.int64)
+        for code, label in enumerate(members):
+            codes[values == label] = code
+        return codes
+
+    def add(self, quotes, priced):
+        """
+        Fold priced quotes into the cube.
+        quotes: DataFrame (or dict of columns) with tier_level, it_capacity,
+        model_type, customer_type; missing columns take the engine defaults.
+        priced: price_quotes() output for the same rows (float money mode).
+        """
+        n = len(priced["total_cost"])
+
+        def column(name):
+            if name in quotes:
+                return np.asarray(quotes[name])
+            return np.full(n, DEFAULT_QUOTE_INPUTS[name], dtype=object)
+
+        tier = tier_codes(column("tier_level")).astype(np.int64)
+        tier[tier < 0] = len(TIER_LEVELS)
+        band = np.searchsorted(self.band_edges[1:-1], column("it_capacity").astype(float), side="right")
+        model = self._codes(column("model_type"), MODEL_TYPES)
+        customer = self._codes(column("customer_type"), CUSTOMER_TYPES)
+        base = np.ravel_multi_index((tier, band, model, customer, np.zeros(n, dtype=np.int64)), self.shape)
+
+        hours = np.column_stack([priced["hours"], priced["hours"].sum(axis=1)])
+        cost = np.column_stack([
+            priced["study_costs"] + priced["report_costs"],
+            priced["total_cost"],
+        ])
+        # A study cell only counts quotes that include the study; "total" counts every quote
+        included = np.column_stack([priced["hours"] > 0, np.ones(n, dtype=bool)])
+        cells = (base[:, None] + np.arange(len(CUBE_STUDIES)))[included]
+        size = self.count.size
+
+        self.count += np.bincount(cells, minlength=size).reshape(self.shape)
+        for measure, values in (("hours", hours[included]), ("cost", cost[included])):
+            self.sums[measure] += np.bincount(cells, values, minlength=size).reshape(self.shape)
+            self.squares[measure] += np.bincount(cells, values * values, minlength=size).reshape(self.shape)
+            buckets = _n_buckets(measure)
+            flat = cells * buckets + _bucket_index(values, measure)
+            self.sketches[measure] += np.bincount(flat, minlength=size * buckets).reshape(self.sketches[measure].shape)
+        self.quotes += n
+        return self
+
+    def merge(self, other):
+        """Add another cube (same band edges) into this one."""
+        if other.band_edges != self.band_edges:
+            raise ValueError("cubes must share band edges to merge")
+        self.count += other.count
+        for measure in MEASURES:
+            self.sums[measure] += other.sums[measure]
+            self.squares[measure] += other.squares[measure]
+            self.sketches[measure] += other.sketches[measure]
+        self.quotes += other.quotes
+        return self
+
+    @classmethod
+    def from_store(cls, store, band_edges=DEFAULT_BAND_EDGES, chunk_rows=1_000_000):
+        """Build from a result_store.ResultStore, reading it in chunks."""
+        cube = cls(band_edges)
+        dims = [name for name in ("tier_level", "it_capacity", "model_type", "customer_type") if name in store]
+        for start in range(0, len(store), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            quotes = {}
+            for name in dims:
+                labels = store.categories(name)
+                values = store[name][rows]
+                quotes[name] = np.asarray(labels, dtype=object)[values] if labels is not None else values
+            priced = {
+                "hours": np.column_stack([store[f"hours_{key}"][rows] for key in STUDY_KEYS]),
+                "study_costs": np.column_stack([store[f"study_cost_{key}"][rows] for key in STUDY_KEYS]),
+                "report_costs": np.column_stack([store[f"report_cost_{key}"][rows] for key in STUDY_KEYS]),
+                "total_cost": np.asarray(store["total_cost"][rows]),
+            }
+            if store.metadata.get("money_mode") == "paise":
+                for name in ("study_costs", "report_costs", "total_cost"):
+                    priced[name] = priced[name] / 100
+            cube.add(quotes, priced)
+        return cube
+
+    # ── querying ────────────────────────────────────────────────────────────
+
+    def _selector(self, dim, value):
+        members = self.labels[dim]
+        if value is None:
+            return slice(None)
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        return [members.index(v) for v in values]
+
+    def _band_selector(self, it_mw):
+        # Bands lying inside [low, high] (band edges are the cube resolution)
+        low, high = it_mw
+        lows, highs = np.array(self.band_edges[:-1]), np.array(self.band_edges[1:])
+        chosen = np.flatnonzero((lows >= low - 1e-9) & (highs <= high + 1e-9))
+        if chosen.size == 0:
+            raise ValueError(f"no band lies within {low}-{high} MW; band edges are {self.band_edges}")
+        return list(chosen)
+
+    def _slice(self, array, filters):
+        # Apply one axis at a time so list selectors don't broadcast together
+        for axis, dim in enumerate(DIMENSIONS):
+            selector = filters[dim]
+            if isinstance(selector, list):
+                array = np.take(array, selector, axis=axis)
+        return array
+
+    def _filters(self, tier=None, band=None, model=None, customer=None, study=None, it_mw=None):
+        return {
+            "tier": self._selector("tier", tier),
+            "band": self._band_selector(it_mw) if it_mw is not None else self._selector("band", band),
+            "model": self._selector("model", model),
+            "customer": self._selector("customer", customer),
+            "study": self._selector("study", study),
+        }
+
+    def query(self, measure, quantiles=(0.5, 0.9), **filters):
+        """
+        Aggregate over every cell matching the filters (None = all members;
+        a label or list of labels; it_mw=(low, high) picks the bands inside).
+        study defaults to "total": summing it with the per-study cells would
+        count every quote's cost twice.
+        Returns:
+            dict: count, sum, mean, std and the requested quantiles
+        """
+        filters.setdefault("study", "total")
+        selection = self._filters(**filters)
+        count = int(self._slice(self.count, selection).sum())
+        total = float(self._slice(self.sums[measure], selection).sum())
+        squares = float(self._slice(self.squares[measure], selection).sum())
+        sketch = self._slice(self.sketches[measure], selection)
+        sketch = sketch.reshape(-1, sketch.shape[-1]).sum(axis=0)
+        mean = total / count if count else math.nan
+        variance = max(squares / count - mean * mean, 0.0) if count else math.nan
+        result = {"count": count, "sum": total, "mean": mean, "std": math.sqrt(variance)}
+        for q, value in zip(quantiles, sketch_quantiles(sketch, quantiles, measure)):
+            result[f"p{round(q * 100):d}"] = value
+        return result
+
+    def rollup(self, measure, by, quantiles=(0.5, 0.9), **filters):
+        """
+        Group the filtered cube by one or more dimensions. study defaults to
+        every study when grouping by it, and to "total" otherwise.
+        Returns:
+            pd.DataFrame: one row per non-empty group with count, mean, std
+            and quantiles
+        """
+        filters.setdefault("study", None if "study" in by else "total")
+        selection = self._filters(**filters)
+        sub_count = self._slice(self.count, selection)
+        sub_sum = self._slice(self.sums[measure], selection)
+        sub_sq = self._slice(self.squares[measure], selection)
+        sub_sketch = self._slice(self.sketches[measure], selection)
+
+        group_axes = [DIMENSIONS.index(dim) for dim in by]
+        other_axes = tuple(axis for axis in range(len(DIMENSIONS)) if axis not in group_axes)
+        count = sub_count.sum(axis=other_axes)
+        total = sub_sum.sum(axis=other_axes)
+        squares = sub_sq.sum(axis=other_axes)
+        sketch = sub_sketch.sum(axis=other_axes)
+        if group_axes != sorted(group_axes):
+            order = np.argsort(np.argsort(group_axes))
+            count, total, squares = (np.transpose(a, order) for a in (count, total, squares))
+            sketch = np.transpose(sketch, list(order) + [len(group_axes)])
+
+        members = []
+        for dim in by:
+            selector = selection[dim]
+            labels = self.labels[dim]
+            members.append([labels[i] for i in selector] if isinstance(selector, list) else labels)
+
+        rows = []
+        for index in np.ndindex(count.shape):
+            n = int(count[index])
+            if n == 0:
+                continue
+            mean = total[index] / n
+            row = {dim: members[d][index[d]] for d, dim in enumerate(by)}
+            row.update(count=n, mean=mean, std=math.sqrt(max(squares[index] / n - mean * mean, 0.0)))
+            for q, value in zip(quantiles, sketch_quantiles(sketch[index], quantiles, measure)):
+                row[f"p{round(q * 100):d}"] = value
+            rows.append(row)
+        frame = pd.DataFrame(rows)
+        if "study" in by and not frame.empty:
+            frame["study"] = frame["study"].map(lambda key: STUDY_NAMES.get(key, "Total"))
+        return frame
+
+    # ── persistence ─────────────────────────────────────────────────────────
+
+    def save(self, path):
+        arrays = {"count": self.count}
+        for measure in MEASURES:
+            arrays[f"sum_{measure}"] = self.sums[measure]
+            arrays[f"squares_{measure}"] = self.squares[measure]
+            arrays[f"sketch_{measure}"] = self.sketches[measure]
+        meta = {
+            "band_edges": [edge if math.isfinite(edge) else "inf" for edge in self.band_edges],
+            "quotes": self.quotes,
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "sketch_ranges": SKETCH_RANGES,
+        }
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["relative_accuracy"] != RELATIVE_ACCURACY or meta["sketch_ranges"] != {
+                k: list(v) for k, v in SKETCH_RANGES.items()
+            }:
+                raise ValueError(f"{path} was built with a different sketch configuration")
+            cube = cls([float(edge) for edge in meta["band_edges"]])
+            cube.count = data["count"]
+            for measure in MEASURES:
+                cube.sums[measure] = data[f"sum_{measure}"]
+                cube.squares[measure] = data[f"squares_{measure}"]
+                cube.sketches[measure] = data[f"sketch_{measure}"]
+            cube.quotes = meta["quotes"]
+        return cube
+
+
+def main(argv=None):
+    from result_store import open_result_store
+
+    parser = argparse.ArgumentParser(description="Build or query the cost OLAP cube")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build a cube from a result store")
+    build.add_argument("store")
+    build.add_argument("cube")
+    query = sub.add_parser("query", help="aggregate one slice of a cube")
+    query.add_argument("cube")
+    query.add_argument("--measure", choices=MEASURES, default="cost")
+    query.add_argument("--study", choices=CUBE_STUDIES,
+                       help='default "total", or every study with --by study')
+    query.add_argument("--tier")
+    query.add_argument("--model")
+    query.add_argument("--customer")
+    query.add_argument("--it-mw", nargs=2, type=float, metavar=("LOW", "HIGH"))
+    query.add_argument("--by", nargs="*", choices=DIMENSIONS, help="roll up by these dimensions")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        cube = CostCube.from_store(open_result_store(args.store))
+        cube.save(args.cube)
+        print(f"Cube of {cube.quotes:,} quotes written to {args.cube}")
+        return
+
+    cube = CostCube.load(args.cube)
+    filters = dict(tier=args.tier, model=args.model, customer=args.customer,
+                   it_mw=tuple(args.it_mw) if args.it_mw else None)
+    if args.study:
+        filters["study"] = args.study
+    if args.by:
+        print(cube.rollup(args.measure, args.by, **filters).to_string(index=False))
+    else:
+        for key, value in cube.query(args.measure, **filters).items():
+            print(f"{key:>6}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+
+import streamlit as st
+import pandas as pd
+
+from cost_engine import COEFFICIENTS_PATH, GRADES, load_coefficients
+from forecast import PipelineForecaster, saturation_week
+from metrics import record_cache
+
+st.set_page_config(
+    page_title="Team Utilization Forecast",
+    page_icon="📈",
+    layout="wide"
+)
+
+st.title("📈 Team Utilization Forecast")
+st.caption(
+    "Expected senior/mid/junior hours per week across all open and probable quotes, "
+    "weighted by win probability. Columns: quote_id, win_probability, start_date, tier_level, "
+    "it_capacity, mechanical_load, house_load (optional: study selections, factors, allocation, status)."
+)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_forecaster(coefficients_mtime):
+    # One forecaster per server process and coefficient file; it only re-prices
+    # quotes whose rows changed, and the mtime key starts a fresh one (with the
+    # re-fitted coefficients) when the file is replaced
+    return PipelineForecaster(load_coefficients())
+
+
+uploaded = st.file_uploader("Quote pipeline (CSV/XLSX)", type=["csv", "xlsx"])
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    senior_headcount = st.number_input("Senior Engineers", min_value=1, max_value=500, value=6, step=1)
+with col2:
+    mid_headcount = st.number_input("Mid-level Engineers", min_value=1, max_value=500, value=10, step=1)
+with col3:
+    junior_headcount = st.number_input("Junior Engineers", min_value=1, max_value=500, value=14, step=1)
+with col4:
+    horizon_weeks = st.number_input("Horizon (weeks)", min_value=4, max_value=260, value=52, step=1)
+
+if uploaded is None:
+    st.info("Upload a pipeline file to forecast team utilization.")
+    st.stop()
+
+if uploaded.name.lower().endswith(".xlsx"):
+    pipeline = pd.read_excel(uploaded)
+else:
+    pipeline = pd.read_csv(uploaded)
+
+headcount = {'senior': senior_headcount, 'mid': mid_headcount, 'junior': junior_headcount}
+forecaster = get_forecaster(
+    os.path.getmtime(COEFFICIENTS_PATH) if os.path.exists(COEFFICIENTS_PATH) else None
+)
+hits_before = forecaster.hits
+weekly = forecaster.forecast(pipeline, headcount, horizon_weeks=horizon_weeks)
+record_cache("forecast", hit=forecaster.hits > hits_before)
+
+metric_cols = st.columns(3)
+for col, grade in zip(metric_cols, GRADES):
+    week = saturation_week(weekly, grade)
+    col.metric(
+        f"{grade.title()} peak utilization",
+        f"{weekly[f'{grade}_utilization'].max():.0%}",
+        f"saturates {pd.Timestamp(week):%d %b %Y}" if week is not None else "within capacity",
+        delta_color="inverse" if week is not None else "normal"
+    )
+
+st.markdown("#### Expected Hours per Week")
+st.line_chart(weekly.set_index('week_start')[[f"{g}_hours" for g in GRADES]])
+
+st.markdown("#### Utilization vs Capacity")
+st.line_chart(weekly.set_index('week_start')[[f"{g}_utilization" for g in GRADES]])
+
+st.download_button(
+    "Download weekly forecast (CSV)",
+    weekly.to_csv(index=False),
+    file_name="utilization_forecast.csv",
+    mime="text/csv"
+)
@@ -0,0 +1,161 @@
+import numpy as np
+import streamlit as st
+import pandas as pd
+
+from charts import histogram_chart_large, line_chart_large, scatter_chart_large
+from cost_engine import DEFAULT_QUOTE_INPUTS
+from metrics import note_cache_miss, track_cache
+from portfolio_jobs import PortfolioJobManager
+from rate_cards import BASE_CURRENCY
+
+st.set_page_config(
+    page_title="Portfolio Pricing",
+    page_icon="🗂️",
+    layout="wide"
+)
+
+st.title("🗂️ Portfolio Pricing")
+st.caption(
+    "Price many sites at once with the same bus-count and study-costing logic as the estimator. "
+    "One row per site; columns use the estimator's input names (e.g. project_name, tier_level, "
+    "it_capacity, mechanical_load, house_load, model_type, customer_type, study selections). "
+    "Missing columns take the estimator defaults; a region column takes rates from that office's rate card."
+)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    # One registry per server process, so jobs outlive browser sessions
+    return PortfolioJobManager()
+
+
+manager = get_job_manager()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def portfolio_charts(job_id, rows_done, status, symbol):
+    # Keyed by progress as well as the job, so a job restored with more rows
+    # (or re-read after it stopped) draws from the current store
+    note_cache_miss()
+    frame = manager.get(job_id).results_frame(["it_capacity", "estimated_buses", "total_cost"])
+    cost = frame["total_cost"].to_numpy(dtype=float)
+    figures = [
+        histogram_chart_large(cost, title="Cost Distribution", x_title=f"Total Cost ({symbol.strip()})"),
+        line_chart_large(
+            {"Portfolio Total": (np.arange(1, len(cost) + 1), np.cumsum(cost))},
+            title="Cumulative Portfolio Total", x_title="Sites Priced", y_title=f"Total ({symbol.strip()})",
+        ),
+    ]
+    if "it_capacity" in frame.columns:
+        figures.append(scatter_chart_large(
+            frame["it_capacity"].to_numpy(dtype=float), cost, title="IT Capacity vs Cost",
+            x_title="IT Capacity (MW)", y_title=f"Total Cost ({symbol.strip()})",
+            value=frame["estimated_buses"].to_numpy(dtype=float),
+        ))
+    return figures
+
+
+upload_col, option_col = st.columns([3, 1])
+with upload_col:
+    uploaded = st.file_uploader("Portfolio (CSV/XLSX)", type=["csv", "xlsx"])
+with option_col:
+    exact_paise = st.checkbox("Exact Paise Arithmetic", value=False)
+    currencies = sorted(manager.rate_cards.fx)
+    report_currency = st.selectbox("Report Currency", currencies, index=currencies.index(BASE_CURRENCY))
+    start_clicked = st.button("▶️ Start Pricing", key="start_portfolio", disabled=uploaded is None)
+
+if start_clicked and uploaded is not None:
+    if uploaded.name.lower().endswith(".xlsx"):
+        quotes = pd.read_excel(uploaded)
+    else:
+        quotes = pd.read_csv(uploaded)
+    unknown = [c for c in quotes.columns if c not in DEFAULT_QUOTE_INPUTS and c not in ("region", "rate_card_version")]
+    if unknown:
+        st.warning(f"Columns kept as-is but not used for pricing: {', '.join(unknown)}")
+    job = manager.submit(quotes, uploaded.name, money_mode="paise" if exact_paise else "float",
+                         currency=report_currency)
+    # The job id in the URL lets a refresh or another tab reattach to the running job
+    st.query_params["job"] = job.job_id
+
+job = manager.get(st.query_params.get("job"))
+
+if job is None:
+    recent = manager.recent()
+    if recent:
+        st.markdown("#### Recent Jobs")
+        for job_id in recent:
+            previous = manager.get(job_id)
+            st.markdown(
+                f"- [{previous.source_name}](?job={job_id}) — {previous.status}, "
+                f"{previous.rows_done:,}/{previous.total_rows:,} rows ({previous.created})"
+            )
+    else:
+        st.info("Upload a portfolio file and start pricing.")
+    st.stop()
+
+
+def job_panel():
+    st.markdown(f"#### {job.source_name}")
+    failed = f" • {job.rows_failed:,} not priced" if job.rows_failed else ""
+    st.progress(job.progress, text=f"{job.rows_done:,} / {job.total_rows:,} rows priced{failed} • {job.status}")
+
+    symbol = "₹" if job.currency in (None, BASE_CURRENCY) else f"{job.currency} "
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    metric_col1.metric("Sites Priced", f"{job.rows_done:,}")
+    metric_col2.metric("Portfolio Total", f"{symbol}{job.portfolio_total:,.0f}")
+    metric_col3.metric(
+        "Average per Site", f"{symbol}{job.portfolio_total / job.rows_done:,.0f}" if job.rows_done else "—"
+    )
+
+    if job.active:
+        if st.button("⏹️ Cancel", key="cancel_portfolio"):
+            job.cancel()
+    elif st.session_state.get("portfolio_polling"):
+        # Finished while polling: one full rerun stops the timer and shows the download
+        st.session_state.portfolio_polling = False
+        st.rerun()
+
+    if job.status == "failed":
+        st.error(f"Pricing failed: {job.error}")
+    elif job.status == "interrupted" and job.rows_done:
+        st.warning("The server restarted while this job was running; rows priced before that are kept.")
+    elif job.status == "interrupted":
+        st.warning("The server restarted before this job finished its first chunk; there are no recoverable rows.")
+
+    if job.rows_failed:
+        st.warning(f"{job.rows_failed:,} row(s) were not priced because their rate card couldn't be loaded; "
+                   "fix the region (or add its card) and price them again.")
+        with st.expander("Rows Not Priced"):
+            st.dataframe(pd.DataFrame(list(job.failed_rows), columns=["row", "region", "error"]),
+                         hide_index=True, use_container_width=True)
+            if job.rows_failed > len(job.failed_rows):
+                st.caption(f"First {len(job.failed_rows):,} of {job.rows_failed:,} shown.")
+
+    preview = job.partial_results()
+    if not preview.empty:
+        st.markdown("#### Latest Priced Sites" if job.active else "#### Last Priced Sites")
+        st.dataframe(preview, hide_index=True, use_container_width=True)
+
+
+fragment = getattr(st, "fragment", None)
+if job.active and fragment is not None:
+    st.session_state.portfolio_polling = True
+    fragment(run_every=1.0)(job_panel)()
+else:
+    job_panel()
+    if job.active:
+        st.button("Refresh Progress", key="refresh_portfolio")
+
+if not job.active and job.rows_done:
+    st.markdown("#### Portfolio Charts")
+    symbol = "₹" if job.currency in (None, BASE_CURRENCY) else f"{job.currency} "
+    figures = track_cache("portfolio_charts", portfolio_charts, job.job_id, job.rows_done, job.status, symbol)
+    for column, figure in zip(st.columns(len(figures)), figures):
+        column.plotly_chart(figure, use_container_width=True)
+
+    st.download_button(
+        "⬇️ Download Priced Portfolio (CSV)",
+        data=job.results_csv(),
+        file_name=f"{job.source_name.rsplit('.', 1)[0]}_priced.csv",
+        mime="text/csv"
+    )
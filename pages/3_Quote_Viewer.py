@@ -0,0 +1,42 @@
+import os
+
+import streamlit as st
+
+from cost_engine import COEFFICIENTS_PATH, load_coefficients
+from metrics import note_cache_miss, track_cache
+from quote_view import render_quote
+import share_state
+
+st.set_page_config(
+    page_title="Quote Viewer",
+    page_icon="📄",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+
+@st.cache_data(show_spinner=False, max_entries=2048)
+def rendered_quote(token, coefficients_mtime):
+    # One static payload per shared quote; the coefficient file's mtime is part
+    # of the key so a re-fitted file re-prices on the next view
+    note_cache_miss()
+    return render_quote(token, load_coefficients())
+
+
+token = st.query_params.get(share_state.QUERY_PARAM)
+if not token:
+    st.info("Open a shared quote link (the estimator's 🔗 Share This Quote panel) to view it here.")
+    st.stop()
+
+try:
+    html = track_cache(
+        "quote_view",
+        rendered_quote,
+        token,
+        os.path.getmtime(COEFFICIENTS_PATH) if os.path.exists(COEFFICIENTS_PATH) else None
+    )
+except ValueError as exc:
+    st.error(f"⚠️ {exc}")
+    st.stop()
+
+st.markdown(html, unsafe_allow_html=True)
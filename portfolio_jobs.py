@@ -0,0 +1,307 @@
+"""
+Background portfolio pricing jobs for the Portfolio Pricing page.
+
+An uploaded portfolio is priced on a background thread in chunks through
+cost_engine.price_quotes() and written to a result store (result_store.py)
+under DC_PORTFOLIO_JOBS_DIR. The job lives in the server process, not in a
+browser session: the page keeps the job id in the URL, so a refresh (or a
+second tab) reattaches to the running job. Job state is also mirrored to
+job.json, so finished jobs stay downloadable after a server restart.
+
+Portfolios with a 'region' column take their rates from that region's rate
+card (rate_cards.py); with a report currency set, money columns are
+converted into it as each chunk is written.
+"""
+
+import datetime
+import json
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+from cost_engine import load_coefficients, price_quotes
+from money import from_paise
+from rate_cards import BASE_CURRENCY, RateCardCache, apply_rate_cards, convert_priced
+from result_store import ResultStoreWriter, flatten_priced, open_result_store
+
+JOBS_DIR = os.environ.get("DC_PORTFOLIO_JOBS_DIR", "portfolio-jobs")
+
+# Rows per price_quotes() call; small enough that progress and cancellation
+# react within a fraction of a second
+DEFAULT_CHUNK_ROWS = 5000
+
+# Rows kept in memory for the live partial-results table
+PREVIEW_ROWS = 500
+
+SUMMARY_COLUMNS = ["project_name", "tier_level", "it_capacity", "estimated_buses",
+                   "subtotal", "total_cost"]
+
+ACTIVE_STATES = ("queued", "running")
+
+# Unpriceable rows listed individually in job.json; beyond this only counted
+MAX_FAILED_ROWS_KEPT = 1000
+
+
+class PortfolioJob:
+    def __init__(self, job_id, quotes, source_name, coefficients, money_mode, chunk_rows, jobs_dir,
+                 rate_cards=None, currency=None):
+        self.job_id = job_id
+        self.quotes = quotes
+        self.source_name = source_name
+        self.coefficients = coefficients
+        self.money_mode = money_mode
+        self.chunk_rows = chunk_rows
+        self.rate_cards = rate_cards
+        self.currency = currency
+        self.path = os.path.join(jobs_dir, job_id)
+        self.status = "queued"
+        self.error = None
+        self.total_rows = len(quotes) if quotes is not None else 0
+        self.rows_done = 0
+        self.rows_failed = 0
+        self.failed_rows = []
+        self.portfolio_total = 0.0
+        self.created = datetime.datetime.now().isoformat(timespec="seconds")
+        self.finished = None
+        self._preview = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._csv_lock = threading.Lock()
+        self._thread = None
+
+    # ── lifecycle ───────────────────────────────────────────────────────────
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._write_state()
+        self._thread = threading.Thread(target=self._run, name=f"portfolio-{self.job_id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        self.status = "running"
+        self._write_state()
+        metadata = {
+            "source": self.source_name,
+            "money_mode": self.money_mode,
+            "coefficients_version": self.coefficients.get("version"),
+            "currency": self.currency,
+        }
+        try:
+            with ResultStoreWriter(os.path.join(self.path, "results"), metadata) as writer:
+                for start in range(0, self.total_rows, self.chunk_rows):
+                    if self._cancel.is_set():
+                        break
+                    chunk = self.quotes.iloc[start:start + self.chunk_rows]
+                    if self.rate_cards is not None and "region" in chunk.columns:
+                        chunk = self._drop_failed(apply_rate_cards(chunk, self.rate_cards))
+                        if chunk.empty:
+                            continue
+                    priced = price_quotes(chunk, self.coefficients, self.money_mode)
+                    if self.currency:
+                        currencies = chunk["currency"] if "currency" in chunk.columns else [BASE_CURRENCY] * len(chunk)
+                        priced = convert_priced(priced, currencies, self.currency, self.rate_cards.fx, self.money_mode)
+                        # Rate columns stay in the card's currency; money outputs are now in the report's
+                        chunk = chunk.assign(rate_currency=currencies, currency=self.currency)
+                    writer.append(flatten_priced(priced, chunk))
+                    self._record_chunk(chunk, priced)
+            try:
+                # Before the status changes, so the page's download is ready when it shows
+                self.results_csv_path()
+            except OSError:
+                pass  # written on the first download instead
+            self.status = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as exc:
+            self.status = "failed"
+            self.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            # The uploaded frame is no longer needed once it is in the store
+            self.quotes = None
+            self.finished = datetime.datetime.now().isoformat(timespec="seconds")
+            self._write_state()
+
+    def _drop_failed(self, chunk):
+        # Rows whose rate card can't be resolved are reported, not priced
+        failed = chunk["rate_card_error"].to_numpy() != ""
+        if failed.any():
+            with self._lock:
+                self.rows_failed += int(failed.sum())
+                room = MAX_FAILED_ROWS_KEPT - len(self.failed_rows)
+                self.failed_rows.extend(
+                    {"row": int(row) + 1, "region": str(region), "error": error}
+                    for row, region, error in zip(chunk.index[failed][:room], chunk["region"].to_numpy()[failed][:room],
+                                                  chunk["rate_card_error"].to_numpy()[failed][:room])
+                )
+            self._write_state()
+        return chunk.loc[~failed].drop(columns="rate_card_error")
+
+    def _record_chunk(self, chunk, priced):
+        summary = pd.DataFrame({
+            name: chunk[name].to_numpy() for name in SUMMARY_COLUMNS if name in chunk.columns
+        })
+        for name in ("estimated_buses", "subtotal", "total_cost"):
+            values = priced[name]
+            summary[name] = from_paise(values) if self.money_mode == "paise" and name != "estimated_buses" else values
+        with self._lock:
+            self.rows_done += len(chunk)
+            self.portfolio_total += float(summary["total_cost"].sum())
+            self._preview.append(summary)
+            # Keep only the most recent rows for the live table
+            while sum(len(frame) for frame in self._preview) - len(self._preview[0]) >= PREVIEW_ROWS:
+                self._preview.pop(0)
+        self._write_state()
+
+    def _write_state(self):
+        state = {
+            "job_id": self.job_id,
+            "source_name": self.source_name,
+            "money_mode": self.money_mode,
+            "currency": self.currency,
+            "status": self.status,
+            "error": self.error,
+            "total_rows": self.total_rows,
+            "rows_done": self.rows_done,
+            "rows_failed": self.rows_failed,
+            "failed_rows": self.failed_rows,
+            "portfolio_total": self.portfolio_total,
+            "created": self.created,
+            "finished": self.finished,
+        }
+        tmp_path = os.path.join(self.path, "job.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, os.path.join(self.path, "job.json"))
+
+    # ── reading ─────────────────────────────────────────────────────────────
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+    @property
+    def progress(self):
+        return (self.rows_done + self.rows_failed) / self.total_rows if self.total_rows else 1.0
+
+    def partial_results(self):
+        """Most recently priced rows (up to PREVIEW_ROWS), for the live table."""
+        with self._lock:
+            frames = list(self._preview)
+        if frames:
+            return pd.concat(frames, ignore_index=True).tail(PREVIEW_ROWS)
+        if not self.active and self.rows_done:
+            # Restored from disk: read the tail back from the result store
+            return self.results_frame(SUMMARY_COLUMNS).tail(PREVIEW_ROWS)
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    def results_frame(self, columns=None):
+        """
+        Priced rows from the result store (available once the job has stopped).
+        An interrupted job yields the chunks it finished; one that died
+        before its first chunk yields an empty frame.
+        """
+        if not os.path.exists(os.path.join(self.path, "results", "schema.json")):
+            return pd.DataFrame(columns=columns or SUMMARY_COLUMNS)
+        store = open_result_store(os.path.join(self.path, "results"))
+        frame = store.to_frame([c for c in columns if c in store.columns] if columns else None)
+        if store.metadata.get("money_mode") == "paise":
+            money = [c for c in frame.columns
+                     if c in ("total_study_cost", "total_report_cost", "subtotal", "total_cost")
+                     or c.startswith(("study_cost_", "report_cost_"))]
+            frame[money] = from_paise(frame[money].to_numpy()).reshape(len(frame), len(money))
+        return frame
+
+    def results_csv_path(self):
+        """
+        <job>/results.csv, written from the store on first use (the job
+        thread writes it as the job stops), so page reruns only read a file.
+        """
+        path = os.path.join(self.path, "results.csv")
+        with self._csv_lock:
+            if not os.path.exists(path):
+                tmp_path = path + ".tmp"
+                self.results_frame().to_csv(tmp_path, index=False)
+                os.replace(tmp_path, path)
+        return path
+
+    def results_csv(self):
+        with open(self.results_csv_path(), "rb") as fh:
+            return fh.read()
+
+    @classmethod
+    def from_disk(cls, path):
+        """A stopped job restored from its job.json (e.g. after a server restart)."""
+        with open(os.path.join(path, "job.json"), "r", encoding="utf-8") as fh:
+            state = json.load(fh)
+        job = cls(state["job_id"], None, state["source_name"], {}, state["money_mode"], 0, os.path.dirname(path))
+        for key in ("status", "error", "total_rows", "rows_done", "portfolio_total", "created", "finished"):
+            setattr(job, key, state[key])
+        job.currency = state.get("currency")
+        job.rows_failed = state.get("rows_failed", 0)
+        job.failed_rows = state.get("failed_rows", [])
+        if job.status in ACTIVE_STATES:
+            # The process that was pricing it is gone. The store's schema is
+            # written before job.json, so count what it actually holds.
+            job.status = "interrupted"
+            frame = job.results_frame(["total_cost"])
+            job.rows_done = len(frame)
+            job.portfolio_total = float(frame["total_cost"].sum()) if len(frame) else 0.0
+        return job
+
+
+class PortfolioJobManager:
+    """Process-wide registry of portfolio jobs."""
+
+    def __init__(self, jobs_dir=JOBS_DIR, rate_cards=None):
+        self.jobs_dir = jobs_dir
+        self.rate_cards = rate_cards if rate_cards is not None else RateCardCache()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, quotes, source_name, coefficients=None, money_mode="float", chunk_rows=DEFAULT_CHUNK_ROWS,
+               currency=None):
+        """currency: report every money column in this currency (default: each row's own)."""
+        job_id = uuid.uuid4().hex[:12]
+        job = PortfolioJob(
+            job_id, quotes.reset_index(drop=True), source_name,
+            coefficients or load_coefficients(), money_mode, chunk_rows, self.jobs_dir,
+            rate_cards=self.rate_cards, currency=currency,
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+        return job.start()
+
+    def get(self, job_id):
+        """Live job, or a stopped one restored from disk; None if unknown."""
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        path = os.path.join(self.jobs_dir, job_id)
+        if not os.path.exists(os.path.join(path, "job.json")):
+            return None
+        job = PortfolioJob.from_disk(path)
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+
+    def recent(self, limit=10):
+        """Job ids on disk, newest first."""
+        if not os.path.isdir(self.jobs_dir):
+            return []
+        entries = [
+            entry for entry in os.listdir(self.jobs_dir)
+            if os.path.exists(os.path.join(self.jobs_dir, entry, "job.json"))
+        ]
+        entries.sort(key=lambda e: os.path.getmtime(os.path.join(self.jobs_dir, e, "job.json")), reverse=True)
+        return entries[:limit]
+
+    def active_count(self):
+        with self._lock:
+            return sum(job.active for job in self._jobs.values())
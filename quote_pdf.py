@@ -0,0 +1,436 @@
+"""
+PDF quote documents, rendered off the UI thread.
+
+A small self-contained PDF writer (standard Helvetica fonts, no external
+dependency) lays out the full quote: project header, scope description,
+study-wise cost analysis, additional services status and the final total.
+
+    render_quote_pdf(record) -> bytes                 one quote
+    get_pdf_pool() / submit_quote_pdf(record)          background worker pool for the UI
+    render_quote_pdfs_bulk(records, output_dir)        portfolio, parallel across cores
+
+Bulk CLI (prices the file with cost_engine.price_quotes first):
+    python quote_pdf.py quotes.csv --output-dir quote-pdfs --workers 8
+
+A quote record is a plain dict:
+    project_name, tier_level, customer_type, model_type, delivery_type,
+    report_complexity, it_capacity, mechanical_load, house_load,
+    estimated_buses, scope_description, study_results (as in app.py),
+    services: [(label, included, detail)], totals: {total_study_cost,
+    total_report_cost, total_meeting_cost, total_additional_costs, subtotal,
+    margin_percent, discount_percent, total_cost}, generated_at
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, GRADES, STUDY_KEYS, STUDY_NAMES, price_quotes
+from money import from_paise
+
+# Quotes per bulk task (amortises inter-process overhead)
+BULK_CHUNK_SIZE = 64
+
+PAGE_WIDTH = 595.0   # A4 in points
+PAGE_HEIGHT = 842.0
+MARGIN = 48.0
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MINIMAL PDF WRITER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _pdf_text(text):
+    """Escape for a PDF string literal in WinAnsi (cp1252) encoding."""
+    text = str(text).replace("₹", "Rs.").replace("×", "x").replace("✅", "").replace("❌", "")
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class PdfCanvas:
+    """Page-at-a-time drawing surface with a top-down text cursor."""
+
+    def __init__(self):
+        self.pages = []
+        self._ops = None
+        self.y = 0.0
+        self.new_page()
+
+    def new_page(self):
+        self._ops = []
+        self.pages.append(self._ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure_space(self, height):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def text(self, x, y, text, size=10, bold=False, color=(0.1, 0.1, 0.1)):
+        font = b"/F2" if bold else b"/F1"
+        self._ops.append(
+            b"BT %.3f %.3f %.3f rg %s %.1f Tf %.2f %.2f Td (%s) Tj ET"
+            % (color[0], color[1], color[2], font, size, x, y, _pdf_text(text))
+        )
+
+    def text_right(self, x_right, y, text, size=10, bold=False, color=(0.1, 0.1, 0.1)):
+        self.text(x_right - text_width(text, size, bold), y, text, size, bold, color)
+
+    def rect(self, x, y, width, height, fill=(0.9, 0.93, 0.98)):
+        self._ops.append(b"%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f" % (fill + (x, y, width, height)))
+
+    def line(self, x1, y1, x2, y2, width=0.5, color=(0.7, 0.7, 0.7)):
+        self._ops.append(b"%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S" % (color + (width, x1, y1, x2, y2)))
+
+    def to_bytes(self):
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # page tree, filled in below
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        kids = []
+        for ops in self.pages:
+            stream = b"\n".join(ops)
+            objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+            content_id = len(objects)
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+            )
+            kids.append(b"%d 0 R" % len(objects))
+        objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            out += b"%010d 00000 n \n" % offset
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+        return bytes(out)
+
+
+def text_width(text, size, bold=False):
+    # Average Helvetica advance is ~0.5 em (bold ~0.55); close enough for layout
+    return len(str(text)) * size * (0.55 if bold else 0.5)
+
+
+def wrap_text(text, size, width):
+    max_chars = max(int(width / (size * 0.5)), 10)
+    lines = []
+    for paragraph in str(text).splitlines() or [""]:
+        words = paragraph.split()
+        current = ""
+        for word in words:
+            candidate = f"{current} {word}".strip()
+            if len(candidate) > max_chars and current:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return lines
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# QUOTE LAYOUT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+ACCENT = (0.23, 0.51, 0.96)
+MUTED = (0.39, 0.45, 0.55)
+
+
+def _rs(amount):
+    return f"Rs. {amount:,.0f}"
+
+
+def _section(canvas, title):
+    canvas.ensure_space(40)
+    canvas.y -= 22
+    canvas.text(MARGIN, canvas.y, title, size=13, bold=True, color=ACCENT)
+    canvas.y -= 6
+    canvas.line(MARGIN, canvas.y, PAGE_WIDTH - MARGIN, canvas.y, width=1, color=ACCENT)
+    canvas.y -= 14
+
+
+def render_quote_pdf(record):
+    """Render one quote record (see module docstring) to PDF bytes."""
+    canvas = PdfCanvas()
+    content_width = PAGE_WIDTH - 2 * MARGIN
+
+    # Header band
+    canvas.rect(0, PAGE_HEIGHT - 110, PAGE_WIDTH, 110, fill=(0.06, 0.09, 0.16))
+    canvas.text(MARGIN, PAGE_HEIGHT - 50, "Data Center Power System Studies - Cost Quotation",
+                size=16, bold=True, color=(1, 1, 1))
+    canvas.text(MARGIN, PAGE_HEIGHT - 72, record.get("project_name", ""), size=12, color=(0.58, 0.64, 0.72))
+    generated = record.get("generated_at") or datetime.datetime.now().strftime("%d %b %Y %H:%M")
+    canvas.text(MARGIN, PAGE_HEIGHT - 92, f"Generated: {generated}", size=9, color=(0.58, 0.64, 0.72))
+    canvas.y = PAGE_HEIGHT - 130
+
+    # Project header details
+    _section(canvas, "Project Information")
+    details = [
+        ("Tier Level", record.get("tier_level", "")),
+        ("IT / Mechanical / House Load",
+         f"{record.get('it_capacity', 0):.1f} / {record.get('mechanical_load', 0):.1f} / {record.get('house_load', 0):.1f} MW"),
+        ("Estimated Bus Count", f"{record.get('estimated_buses', 0)} buses"),
+        ("Customer Type", record.get("customer_type", "")),
+        ("Model Type", record.get("model_type", "")),
+        ("Delivery / Report", f"{record.get('delivery_type', '')} / {record.get('report_complexity', '')}"),
+    ]
+    for idx, (label, value) in enumerate(details):
+        column = idx % 2
+        x = MARGIN + column * content_width / 2
+        if column == 0:
+            canvas.ensure_space(16)
+            canvas.y -= 14
+        canvas.text(x, canvas.y, f"{label}:", size=9, bold=True, color=MUTED)
+        canvas.text(x + 140, canvas.y, value, size=9)
+
+    # Scope
+    _section(canvas, "Scope of Work")
+    for line in wrap_text(record.get("scope_description", ""), 9.5, content_width):
+        canvas.ensure_space(14)
+        canvas.text(MARGIN, canvas.y, line, size=9.5)
+        canvas.y -= 13
+
+    # Study-wise cost analysis
+    _section(canvas, "Study-wise Cost Analysis")
+    columns = [("Study", MARGIN), ("Hours", 250), ("Senior", 310), ("Mid", 370),
+               ("Junior", 430), ("Report", 490), ("Total", PAGE_WIDTH - MARGIN)]
+    canvas.rect(MARGIN - 4, canvas.y - 5, content_width + 8, 18, fill=(0.9, 0.93, 0.98))
+    for idx, (title, x) in enumerate(columns):
+        if idx == 0:
+            canvas.text(x, canvas.y, title, size=9, bold=True)
+        else:
+            canvas.text_right(x + (0 if idx == len(columns) - 1 else 45), canvas.y, title, size=9, bold=True)
+    canvas.y -= 18
+    for study in record.get("study_results", {}).values():
+        canvas.ensure_space(16)
+        row = [
+            study["name"],
+            f"{study['hours']:.1f}",
+            f"{study.get('senior_cost', 0):,.0f}",
+            f"{study.get('mid_cost', 0):,.0f}",
+            f"{study.get('junior_cost', 0):,.0f}",
+            f"{study['report_cost']:,.0f}",
+            _rs(study["total_cost"] + study["report_cost"]),
+        ]
+        for idx, ((_, x), value) in enumerate(zip(columns, row)):
+            if idx == 0:
+                canvas.text(x, canvas.y, value, size=9)
+            else:
+                canvas.text_right(x + (0 if idx == len(columns) - 1 else 45), canvas.y, value,
+                                  size=9, bold=idx == len(columns) - 1)
+        canvas.y -= 4
+        canvas.line(MARGIN, canvas.y, PAGE_WIDTH - MARGIN, canvas.y, width=0.3)
+        canvas.y -= 12
+
+    # Additional services
+    _section(canvas, "Additional Services Status")
+    for label, included, detail in record.get("services", []):
+        canvas.ensure_space(14)
+        mark, color = ("Included", (0.06, 0.6, 0.4)) if included else ("Not included", (0.8, 0.2, 0.2))
+        canvas.text(MARGIN, canvas.y, label, size=9.5, bold=True)
+        canvas.text(MARGIN + 150, canvas.y, mark, size=9.5, bold=True, color=color)
+        canvas.text(MARGIN + 230, canvas.y, detail, size=9.5)
+        canvas.y -= 14
+
+    # Summary and final total
+    totals = record.get("totals", {})
+    _section(canvas, "Cost Summary")
+    summary = [
+        ("Studies (Engineering Services)", totals.get("total_study_cost", 0)),
+        ("Reports", totals.get("total_report_cost", 0)),
+        ("Client Meetings", totals.get("total_meeting_cost", 0)),
+        ("Additional Services", totals.get("total_additional_costs", 0)),
+        ("Subtotal", totals.get("subtotal", 0)),
+        (f"Margin ({totals.get('margin_percent', 0)}%)",
+         totals.get("total_cost", 0) - totals.get("subtotal", 0)),
+    ]
+    for label, amount in summary:
+        canvas.ensure_space(14)
+        canvas.text(MARGIN, canvas.y, label, size=10)
+        canvas.text_right(PAGE_WIDTH - MARGIN, canvas.y, _rs(amount), size=10)
+        canvas.y -= 14
+    if totals.get("discount_percent"):
+        canvas.text(MARGIN, canvas.y, f"Repeat customer discount applied: {totals['discount_percent']}%",
+                    size=9, color=MUTED)
+        canvas.y -= 14
+
+    canvas.ensure_space(60)
+    canvas.y -= 40
+    canvas.rect(MARGIN - 4, canvas.y - 10, content_width + 8, 40, fill=ACCENT)
+    canvas.text(MARGIN + 8, canvas.y + 4, "TOTAL PROJECT COST", size=14, bold=True, color=(1, 1, 1))
+    canvas.text_right(PAGE_WIDTH - MARGIN - 8, canvas.y + 4, _rs(totals.get("total_cost", 0)),
+                      size=16, bold=True, color=(1, 1, 1))
+    canvas.y -= 30
+    canvas.text(MARGIN, canvas.y,
+                "Estimates are based on industry standards; validate with qualified electrical engineers.",
+                size=8, color=MUTED)
+    return canvas.to_bytes()
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BACKGROUND AND BULK RENDERING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_pool = None
+
+
+def _new_pool(workers=None):
+    # spawn, not fork: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_pdf_pool(workers=None):
+    """Process pool shared by the whole server process (created lazily)."""
+    global _pool
+    if _pool is None:
+        _pool = _new_pool(workers or max((os.cpu_count() or 2) - 1, 1))
+    return _pool
+
+
+def submit_quote_pdf(record):
+    """Queue one quote on the background pool; returns a Future of PDF bytes."""
+    return get_pdf_pool().submit(render_quote_pdf, record)
+
+
+def safe_filename(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)).strip("_") or "quote"
+
+
+def _render_chunk(tasks):
+    for record, path in tasks:
+        with open(path, "wb") as fh:
+            fh.write(render_quote_pdf(record))
+    return len(tasks)
+
+
+def render_quote_pdfs_bulk(records, output_dir, workers=None, progress=None):
+    """
+    Render many quotes to output_dir in parallel across cores.
+    progress: optional callback(done, total)
+    Returns:
+        list: written file paths, in record order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [
+        (record, os.path.join(output_dir, f"{idx:06d}_{safe_filename(record.get('project_name'))}.pdf"))
+        for idx, record in enumerate(records)
+    ]
+    chunks = [tasks[i:i + BULK_CHUNK_SIZE] for i in range(0, len(tasks), BULK_CHUNK_SIZE)]
+    done = 0
+    with _new_pool(workers) as pool:
+        for future in as_completed([pool.submit(_render_chunk, chunk) for chunk in chunks]):
+            done += future.result()
+            if progress:
+                progress(done, len(tasks))
+    return [path for _, path in tasks]
+
+
+def _filled_inputs(quotes):
+    # Every DEFAULT_QUOTE_INPUTS column, blanks (NaN/None) taking the default as
+    # in price_quotes(), so the document shows the values that were priced
+    frame = pd.DataFrame(index=range(len(quotes)))
+    for name, default in dict(DEFAULT_QUOTE_INPUTS, scope_description="").items():
+        if name not in quotes.columns:
+            frame[name] = [default] * len(quotes)
+            continue
+        column = quotes[name].reset_index(drop=True)
+        column = column.where(column.notna(), default)
+        if isinstance(default, int) and not isinstance(default, bool):
+            numeric = pd.to_numeric(column, errors="coerce")
+            if numeric.notna().all() and (numeric % 1 == 0).all():
+                # A blank turned the column to float; counts read "2 visits", not "2.0"
+                column = numeric.astype(np.int64)
+        frame[name] = column
+    return frame
+
+
+def records_from_quotes(quotes, coefficients=None, money_mode="float"):
+    """Price a DataFrame of flat quote inputs and build a quote record per row."""
+    priced = price_quotes(quotes, coefficients, money_mode)
+    if money_mode == "paise":
+        for field in ("grade_costs", "study_costs", "report_costs", "total_study_cost",
+                      "total_report_cost", "subtotal", "total_cost"):
+            priced[field] = from_paise(priced[field])
+
+    frame = _filled_inputs(quotes)
+    generated = datetime.datetime.now().strftime("%d %b %Y %H:%M")
+    records = []
+    for row, inputs in enumerate(frame.to_dict("records")):
+        study_results = {}
+        for s, key in enumerate(STUDY_KEYS):
+            if not inputs.get(key):
+                continue
+            study_results[key] = {
+                "name": STUDY_NAMES[key],
+                "hours": float(priced["hours"][row, s]),
+                **{f"{g}_cost": float(priced["grade_costs"][row, s, i]) for i, g in enumerate(GRADES)},
+                "total_cost": float(priced["study_costs"][row, s]),
+                "report_cost": float(priced["report_costs"][row, s]),
+            }
+        meetings = inputs["client_meetings"] * inputs["meeting_cost"]
+        subtotal = float(priced["subtotal"][row])
+        site_visit_total = inputs["site_visits"] * inputs["site_visit_cost"]
+        label_total = inputs["num_labels"] * inputs["cost_per_label"]
+        custom_total = inputs["custom_charges_cost"] + inputs["custom_cost_1_amount"] + inputs["custom_cost_2_amount"]
+        records.append({
+            **{k: inputs[k] for k in ("project_name", "tier_level", "customer_type", "model_type",
+                                      "delivery_type", "report_complexity", "it_capacity",
+                                      "mechanical_load", "house_load")},
+            "estimated_buses": int(priced["estimated_buses"][row]),
+            "scope_description": inputs["scope_description"],
+            "study_results": study_results,
+            "services": [
+                ("Site Visits", site_visit_total > 0, f"{inputs['site_visits']} visits = {_rs(site_visit_total)}"),
+                ("Arc Flash Labels", label_total > 0, f"{inputs['num_labels']} labels = {_rs(label_total)}"),
+                ("Equipment Stickering", inputs["stickering_cost"] > 0, _rs(inputs["stickering_cost"])),
+                ("Custom Charges", custom_total > 0, _rs(custom_total)),
+            ],
+            "totals": {
+                "total_study_cost": float(priced["total_study_cost"][row]),
+                "total_report_cost": float(priced["total_report_cost"][row]),
+                "total_meeting_cost": meetings,
+                "total_additional_costs": site_visit_total + label_total + inputs["stickering_cost"] + custom_total,
+                "subtotal": subtotal,
+                "margin_percent": inputs["custom_margin"],
+                "discount_percent": inputs["repeat_discount"] if inputs["customer_type"] == "Repeat Customer" else 0,
+                "total_cost": float(priced["total_cost"][row]),
+            },
+            "generated_at": generated,
+        })
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PDF quotes for a portfolio of sites")
+    parser.add_argument("quotes", help="CSV/XLSX of flat quote inputs (cost_engine.DEFAULT_QUOTE_INPUTS columns)")
+    parser.add_argument("--output-dir", default="quote-pdfs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--money-mode", choices=["float", "paise"], default="float")
+    args = parser.parse_args(argv)
+
+    if args.quotes.lower().endswith((".xlsx", ".xls")):
+        quotes = pd.read_excel(args.quotes)
+    else:
+        quotes = pd.read_csv(args.quotes)
+    records = records_from_quotes(quotes, money_mode=args.money_mode)
+
+    def report(done, total):
+        print(f"{done}/{total} PDFs rendered", end="\r" if done < total else "\n", flush=True)
+
+    paths = render_quote_pdfs_bulk(records, args.output_dir, args.workers, progress=report)
+    print(f"Wrote {len(paths)} PDFs to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Read-only quote viewer: a shared quote (share_state token) rendered as one
+static HTML payload.
+
+Reviewers and clients who only look at a finished estimate don't need the
+estimator's input widgets, expanders and per-interaction reruns. The viewer
+page decodes the token, prices it once through cost_engine.price_quotes()
+(the path batch runs and the audit replay use, so it reconciles with the
+estimator) and renders the headline metrics, study cards, additional
+services status, cost summary and final total with the result_cards
+templates into a single string. The page caches that string per token and
+coefficient file, so repeat views are one cache lookup and one st.markdown.
+
+Usage:
+    html = render_quote(token, coefficients)    # -> '<style>...</style><div ...'
+    url = viewer_url(page_url, token)           # link for the share panel
+"""
+
+from html import escape
+from string import Template
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, GRADES, STUDY_KEYS, STUDY_NAMES, price_quotes
+from money import from_paise
+from rate_cards import PRICED_MONEY_KEYS
+import result_cards
+import share_state
+
+# URL path of pages/3_Quote_Viewer.py
+VIEWER_PAGE = "Quote_Viewer"
+
+# Estimator widget defaults for shared fields price_quotes() doesn't use
+VIEW_DEFAULTS = {
+    "site_visit_enabled": True,
+    "af_labels_enabled": False,
+    "stickering_enabled": False,
+    "exact_money": False,
+    "scope_description": "",
+}
+
+# Page chrome for the viewer (the estimator has its own stylesheet)
+PAGE_STYLE = """
+.stApp {
+    background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #334155 100%);
+    font-family: 'Inter', sans-serif;
+    color: #e2e8f0;
+}
+
+#MainMenu, footer, header {visibility: hidden;}
+
+.block-container {
+    padding-top: 1rem;
+    max-width: 1200px;
+}
+
+.quote-header {
+    text-align: center;
+    color: #f1f5f9;
+    margin-bottom: 1.5rem;
+}
+
+.quote-header h1 {
+    color: #3b82f6;
+    font-weight: 800;
+    margin: 0;
+}
+
+.quote-header p, .quote-scope {
+    color: #94a3b8;
+    margin: 0.5rem 0 0 0;
+}
+
+.quote-view h4 {
+    color: #e2e8f0;
+    margin: 1.5rem 0 0.5rem 0;
+}
+"""
+
+HEADER = Template('<div class="quote-header"><h1>$project</h1><p>$subtitle</p></div>')
+SCOPE = Template('<p class="quote-scope">$scope</p>')
+HEADING = Template('<h4>$title</h4>')
+PAGE = Template('<style>$style</style><div class="quote-view">$body</div>')
+
+
+def view_inputs(shared):
+    """
+    Decoded share state filled out to a full quote: fields the token
+    doesn't carry take the estimator defaults.
+    Returns:
+        dict: DEFAULT_QUOTE_INPUTS and VIEW_DEFAULTS keys
+    """
+    inputs = dict(DEFAULT_QUOTE_INPUTS, **VIEW_DEFAULTS)
+    inputs.update(shared)
+    return inputs
+
+
+def services_status(inputs):
+    """
+    Additional services lines as shown by the estimator.
+    Returns:
+        list: (state, text) pairs for result_cards.services_status()
+    """
+    custom_total = inputs["custom_charges_cost"] + inputs["custom_cost_1_amount"] + inputs["custom_cost_2_amount"]
+    return [
+        ("included", f"Site Visits: {inputs['site_visits']} visits × ₹{inputs['site_visit_cost']:,} "
+                     f"= ₹{inputs['site_visits'] * inputs['site_visit_cost']:,}")
+        if inputs["site_visit_enabled"] else ("excluded", "Site Visits: Not included in scope"),
+        ("included", f"Arc Flash Labels: {inputs['num_labels']} labels × ₹{inputs['cost_per_label']:,} "
+                     f"= ₹{inputs['num_labels'] * inputs['cost_per_label']:,}")
+        if inputs["af_labels_enabled"] else ("excluded", "Arc Flash Labels: Hardcopy labels not in our scope"),
+        ("included", f"Equipment Stickering: ₹{inputs['stickering_cost']:,}")
+        if inputs["stickering_enabled"] else ("excluded", "Equipment Stickering: Not included in our scope"),
+        ("included", f"Custom Charges: ₹{custom_total:,}")
+        if custom_total > 0 else ("info", "No custom charges added"),
+    ]
+
+
+def price_view(inputs, coefficients):
+    """
+    Price one quote for display (rupees, paise mode converted back).
+    Returns:
+        dict: estimated_buses, studies (result card dicts for selected
+        studies), total_hours, hours_saved and the money totals
+    """
+    money_mode = "paise" if inputs["exact_money"] else "float"
+    priced = price_quotes(pd.DataFrame([inputs]), coefficients, money_mode)
+    to_rupees = from_paise if money_mode == "paise" else np.asarray
+    money = {name: np.asarray(to_rupees(priced[name]), dtype=float) for name in PRICED_MONEY_KEYS}
+
+    studies = []
+    for idx, key in enumerate(STUDY_KEYS):
+        if not inputs[key]:
+            continue
+        study = {
+            "name": STUDY_NAMES[key],
+            "hours": float(priced["hours"][0, idx]),
+            "hours_saved": float(priced["base_hours"][0, idx] - priced["hours"][0, idx]),
+            "total_cost": float(money["study_costs"][0, idx]),
+            "report_cost": float(money["report_costs"][0, idx]),
+        }
+        for g, grade in enumerate(GRADES):
+            study[f"{grade}_hours"] = float(priced["grade_hours"][0, idx, g])
+            study[f"{grade}_cost"] = float(money["grade_costs"][0, idx, g])
+        studies.append(study)
+
+    return {
+        "estimated_buses": int(priced["estimated_buses"][0]),
+        "studies": studies,
+        "total_hours": sum(study["hours"] for study in studies),
+        "hours_saved": sum(study["hours_saved"] for study in studies),
+        "total_study_cost": float(money["total_study_cost"][0]),
+        "total_report_cost": float(money["total_report_cost"][0]),
+        "total_meeting_cost": inputs["client_meetings"] * inputs["meeting_cost"],
+        "total_additional_costs": (
+            inputs["site_visits"] * inputs["site_visit_cost"]
+            + inputs["num_labels"] * inputs["cost_per_label"]
+            + inputs["stickering_cost"]
+            + inputs["custom_charges_cost"]
+            + inputs["custom_cost_1_amount"]
+            + inputs["custom_cost_2_amount"]
+        ),
+        "subtotal": float(money["subtotal"][0]),
+        "total_cost": float(money["total_cost"][0]),
+    }
+
+
+def render_quote(token, coefficients):
+    """
+    The whole read-only view of a shared quote as one HTML string
+    (stylesheet included). Raises ValueError for a damaged or unknown token.
+    Returns:
+        str: HTML for a single st.markdown(..., unsafe_allow_html=True) call
+    """
+    inputs = view_inputs(share_state.decode_state(token))
+    view = price_view(inputs, coefficients)
+    total_load = inputs["it_capacity"] + inputs["mechanical_load"] + inputs["house_load"]
+
+    body = [HEADER.substitute(
+        project=escape(str(inputs["project_name"])),
+        subtitle=escape(f"{inputs['tier_level']} Data Center • {inputs['it_capacity']:g} MW IT • "
+                        f"{inputs['delivery_type']} delivery • read-only quote"),
+    )]
+    if inputs["scope_description"]:
+        body.append(SCOPE.substitute(scope=escape(inputs["scope_description"])))
+    body.append(result_cards.metric_row([
+        ("Total Load", f"{total_load:.1f} MW", ""),
+        ("Bus Count", view["estimated_buses"], "buses"),
+        ("Total Hours", f"{view['total_hours']:.0f}", "engineering hours"),
+        ("Hours Saved", f"{view['hours_saved']:.0f}", inputs["model_type"]),
+        ("Customer Type", inputs["customer_type"].split()[0], f"{inputs['repeat_discount']}% discount"),
+    ]))
+    if view["studies"]:
+        body.append(HEADING.substitute(title="Study-wise Cost Analysis"))
+        body.append(result_cards.study_cards(
+            view["studies"],
+            (inputs["senior_rate"], inputs["mid_rate"], inputs["junior_rate"]),
+            inputs["report_complexity"],
+            inputs["hour_reduction"],
+        ))
+    body.append(HEADING.substitute(title="Additional Services Status"))
+    body.append(result_cards.services_status(services_status(inputs)))
+    body.append(HEADING.substitute(title="Final Cost Summary"))
+    body.append(result_cards.cost_summary([
+        ("Studies", "#3b82f6", view["total_study_cost"], "Engineering Services"),
+        ("Reports", "#06b6d4", view["total_report_cost"], f"{inputs['report_complexity']} Format"),
+        ("Meetings", "#8b5cf6", view["total_meeting_cost"], f"{inputs['client_meetings']} Sessions"),
+        ("Additional", "#ec4899", view["total_additional_costs"], "Extra Services"),
+    ]))
+    body.append(result_cards.final_total(
+        view["total_cost"],
+        f"{inputs['project_name']} | {inputs['tier_level']} Data Center | "
+        f"{inputs['customer_type']} | {inputs['model_type']}",
+    ))
+    return PAGE.substitute(style=result_cards.STYLESHEET + PAGE_STYLE, body="".join(body))
+
+
+def viewer_url(page_url, token):
+    """Viewer link for a token, next to the estimator at page_url."""
+    base = page_url.split("?")[0].rstrip("/")
+    return f"{base}/{VIEWER_PAGE}?{share_state.QUERY_PARAM}={token}"
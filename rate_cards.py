@@ -0,0 +1,292 @@
+"""
+Regional rate cards: engineer rates, report, meeting and site-visit costs per
+office, each in the office's own currency.
+
+A rate card is a JSON file in DC_RATE_CARDS_DIR named '<region>.v<version>.json':
+
+    {"region": "UAE", "version": 3, "currency": "AED",
+     "rates": {"senior_rate": 95, "mid_rate": 55, "meeting_cost": 400, ...}}
+
+Rates a card leaves out take the built-in ₹ defaults converted into its
+currency. FX rates live in fx.json in the same directory
+({"base": "INR", "rates": {"USD": 0.012, "AED": 0.044}}, units per 1 base).
+
+Parsed cards are kept in an in-memory LRU keyed by (region, version, file
+mtime), so a UI region switch or a portfolio chunk resolves rates without
+re-reading files, and an edited card is picked up on its next lookup. Batch
+pricing fills rate columns per unique card (one row table indexed by region
+code, no per-quote parsing); currency conversion is one multiply per money
+array at output time.
+
+Usage:
+    python rate_cards.py                       # list available cards
+    python rate_cards.py --region UAE --to INR # show one card, converted
+"""
+
+import argparse
+import collections
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, STUDY_KEYS
+from metrics import record_cache
+
+RATE_CARDS_DIR = os.environ.get(
+    "DC_RATE_CARDS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_cards"),
+)
+FX_FILE = "fx.json"
+
+BASE_CURRENCY = "INR"
+BUILTIN_REGION = "India"
+
+# Money inputs a card can set, in the order of RateCard.vector
+RATE_FIELDS = [
+    "senior_rate",
+    "mid_rate",
+    "junior_rate",
+    "meeting_cost",
+    "site_visit_cost",
+    "cost_per_label",
+] + [f"{key}_report_cost" for key in STUDY_KEYS]
+
+# Built-in ₹ card (the app's widget defaults)
+BUILTIN_RATES = dict(
+    {name: DEFAULT_QUOTE_INPUTS[name] for name in RATE_FIELDS},
+    cost_per_label=150,
+)
+
+# Money outputs of cost_engine.price_quotes(), converted by convert_priced()
+PRICED_MONEY_KEYS = (
+    "grade_costs", "study_costs", "report_costs",
+    "total_study_cost", "total_report_cost", "subtotal", "total_cost",
+)
+
+DEFAULT_CACHE_SIZE = 32
+
+
+class RateCard:
+    """One parsed rate card (read-only)."""
+
+    def __init__(self, region, version, currency, values, source):
+        self.region = region
+        self.version = version
+        self.currency = currency
+        self.values = values
+        self.vector = np.array([values[name] for name in RATE_FIELDS], dtype=float)
+        self.source = source
+
+    @property
+    def label(self):
+        return f"{self.region} v{self.version} ({self.currency})"
+
+
+BUILTIN_CARD = RateCard(BUILTIN_REGION, 0, BASE_CURRENCY, dict(BUILTIN_RATES), "built-in")
+
+
+def _card_path(directory, region, version):
+    return os.path.join(directory, f"{region}.v{version}.json")
+
+
+def load_fx(directory=RATE_CARDS_DIR):
+    """
+    Units of each currency per 1 BASE_CURRENCY.
+    Returns:
+        dict: currency -> rate (BASE_CURRENCY is always 1.0)
+    """
+    fx = {BASE_CURRENCY: 1.0}
+    path = os.path.join(directory or "", FX_FILE)
+    if directory and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as fh:
+            table = json.load(fh)
+        if table.get("base", BASE_CURRENCY) != BASE_CURRENCY:
+            raise ValueError(f"{path}: FX base must be {BASE_CURRENCY}")
+        fx.update({currency: float(rate) for currency, rate in table.get("rates", {}).items()})
+    return fx
+
+
+def fx_factor(from_currency, to_currency, fx):
+    """Multiplier converting an amount in from_currency to to_currency."""
+    for currency in (from_currency, to_currency):
+        if currency not in fx:
+            raise ValueError(f"No FX rate for {currency}; add it to {FX_FILE}")
+    return fx[to_currency] / fx[from_currency]
+
+
+def available_cards(directory=RATE_CARDS_DIR):
+    """
+    Regions with a card on disk, plus the built-in one.
+    Returns:
+        dict: region -> sorted list of versions (latest last)
+    """
+    cards = {BUILTIN_REGION: [0]}
+    if directory and os.path.isdir(directory):
+        for entry in os.listdir(directory):
+            stem, dot, ext = entry.rpartition(".")
+            region, _, version = stem.rpartition(".v")
+            if ext == "json" and dot and region and version.isdigit():
+                cards.setdefault(region, []).append(int(version))
+    return {region: sorted(set(versions)) for region, versions in sorted(cards.items())}
+
+
+def parse_rate_card(path, fx):
+    """Read and validate one card file; missing rates take converted ₹ defaults."""
+    with open(path, "r", encoding="utf-8") as fh:
+        raw = json.load(fh)
+    currency = raw.get("currency", BASE_CURRENCY)
+    factor = fx_factor(BASE_CURRENCY, currency, fx)
+    rates = raw.get("rates", {})
+    unknown = sorted(set(rates) - set(RATE_FIELDS))
+    if unknown:
+        raise ValueError(f"{path}: unknown rate fields: {', '.join(unknown)}")
+    values = {}
+    for name in RATE_FIELDS:
+        value = float(rates[name]) if name in rates else BUILTIN_RATES[name] * factor
+        if not np.isfinite(value) or value < 0:
+            raise ValueError(f"{path}: {name} must be a non-negative number")
+        values[name] = value
+    return RateCard(raw["region"], int(raw["version"]), currency, values, os.path.basename(path))
+
+
+class RateCardCache:
+    """
+    LRU of parsed rate cards keyed by (region, version, mtime). Thread-safe;
+    one instance per process (the app keeps it in st.cache_resource).
+    """
+
+    def __init__(self, directory=RATE_CARDS_DIR, maxsize=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.maxsize = maxsize
+        self._cards = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._fx = None
+
+    @property
+    def fx(self):
+        path = os.path.join(self.directory or "", FX_FILE)
+        mtime = os.path.getmtime(path) if self.directory and os.path.exists(path) else None
+        if self._fx is None or self._fx[0] != mtime:
+            self._fx = (mtime, load_fx(self.directory))
+        return self._fx[1]
+
+    def get(self, region=BUILTIN_REGION, version=None):
+        """The card for region (latest version unless one is given)."""
+        if region == BUILTIN_REGION and not version:
+            return BUILTIN_CARD
+        if version is None:
+            versions = available_cards(self.directory).get(region)
+            if not versions:
+                raise KeyError(f"No rate card for region {region!r}")
+            version = versions[-1]
+        path = _card_path(self.directory, region, version)
+        if not os.path.exists(path):
+            raise KeyError(f"No rate card {region!r} v{version}")
+        key = (region, int(version), os.path.getmtime(path))
+        with self._lock:
+            card = self._cards.get(key)
+            if card is not None:
+                self._cards.move_to_end(key)
+        record_cache("rate_cards", hit=card is not None)
+        if card is None:
+            card = parse_rate_card(path, self.fx)
+            with self._lock:
+                self._cards[key] = card
+                while len(self._cards) > self.maxsize:
+                    self._cards.popitem(last=False)
+        return card
+
+    def __len__(self):
+        return len(self._cards)
+
+
+def apply_rate_cards(quotes, cache, region_column="region", version_column="rate_card_version"):
+    """
+    Fill each quote's rate columns from its region's card. Explicit values in
+    the quotes win; blanks and missing columns take the card's. Each distinct
+    (region, version) is looked up once. A card that can't be loaded (unknown
+    region or version, bad file, missing FX rate) doesn't fail the batch: its
+    rows get NaN card rates, no currency and the reason in 'rate_card_error'.
+    Returns:
+        pd.DataFrame: quotes with every RATE_FIELDS column, 'currency' and
+        'rate_card_error' ("" for rows whose card resolved)
+    """
+    quotes = quotes.copy()
+    n = len(quotes)
+    regions = (quotes[region_column].fillna(BUILTIN_REGION).astype(str).to_numpy()
+               if region_column in quotes.columns else np.full(n, BUILTIN_REGION, dtype=object))
+    versions = (quotes[version_column].fillna(0).astype(int).to_numpy()
+                if version_column in quotes.columns else np.zeros(n, dtype=int))
+    region_codes, region_names = pd.factorize(regions)
+    version_codes, version_numbers = pd.factorize(versions)
+    codes, pairs = pd.factorize(region_codes * len(version_numbers) + version_codes)
+
+    cards, errors = [], []
+    for pair in pairs:
+        region = region_names[pair // len(version_numbers)]
+        version = int(version_numbers[pair % len(version_numbers)]) or None
+        try:
+            cards.append(cache.get(region, version))
+            errors.append("")
+        except (KeyError, ValueError) as exc:
+            cards.append(None)
+            errors.append(str(exc.args[0]) if exc.args else f"No rate card for region {region!r}")
+    table = (np.vstack([card.vector if card is not None else np.full(len(RATE_FIELDS), np.nan) for card in cards])
+             if cards else np.zeros((0, len(RATE_FIELDS))))
+    card_rates = table[codes]
+    for j, name in enumerate(RATE_FIELDS):
+        if name in quotes.columns:
+            given = pd.to_numeric(quotes[name], errors="coerce").to_numpy(dtype=float)
+            quotes[name] = np.where(np.isnan(given), card_rates[:, j], given)
+        else:
+            quotes[name] = card_rates[:, j]
+    quotes["currency"] = np.array([card and card.currency for card in cards], dtype=object)[codes] if cards else []
+    quotes["rate_card_error"] = np.array(errors, dtype=object)[codes] if cards else []
+    return quotes
+
+
+def convert_priced(priced, currencies, to_currency, fx, money_mode="float"):
+    """
+    Convert price_quotes() money outputs from each row's currency into
+    to_currency (one multiply per array). Paise mode stays integer paise.
+    Returns:
+        dict: priced with converted money arrays (other keys untouched)
+    """
+    codes, unique = pd.factorize(np.asarray(currencies, dtype=object))
+    factors = np.array([fx_factor(currency, to_currency, fx) for currency in unique])[codes]
+    converted = dict(priced)
+    for key in PRICED_MONEY_KEYS:
+        values = np.asarray(priced[key])
+        scaled = values * factors.reshape((-1,) + (1,) * (values.ndim - 1))
+        converted[key] = np.rint(scaled).astype(np.int64) if money_mode == "paise" else scaled
+    return converted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or inspect regional rate cards")
+    parser.add_argument("--dir", default=RATE_CARDS_DIR, help="rate card directory")
+    parser.add_argument("--region", help="show this region's card")
+    parser.add_argument("--version", type=int, help="card version (default: latest)")
+    parser.add_argument("--to", help="also show the rates converted into this currency")
+    args = parser.parse_args(argv)
+
+    cache = RateCardCache(args.dir)
+    if not args.region:
+        for region, versions in available_cards(args.dir).items():
+            card = cache.get(region)
+            print(f"{region:<24} {card.currency:<5} versions: {', '.join(f'v{v}' for v in versions)}")
+        return
+
+    card = cache.get(args.region, args.version)
+    table = pd.DataFrame({"field": RATE_FIELDS, card.currency: card.vector})
+    if args.to:
+        table[args.to] = card.vector * fx_factor(card.currency, args.to, cache.fx)
+    print(card.label)
+    print(table.to_string(index=False, float_format="{:,.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+What-if response surface: total cost and bus count at every step of the
+estimator's IT MW and calibration sliders, for one set of other inputs.
+
+The tables are built with cost_engine.sweep_quote() and kept in the
+cross-process shared cache (shared_cache.py), so one worker builds a
+surface and every other worker maps the same copy. warmup.py prebuilds
+the surface for the estimator's default inputs, so a new worker answers
+the default "Enable instant scrubbing" view from its first rerun.
+
+Usage:
+    cost, buses = surface_tables(fixed_inputs, coefficients, "float")
+    cost[cal_idx, it_idx]                       # -> ₹ at that grid point
+"""
+
+import numpy as np
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, sweep_quote
+from money import from_paise
+import shared_cache
+
+# Every step of the IT MW and calibration sliders
+IT_CAPACITY_STEPS = np.round(np.arange(0, 2001) * 0.1, 1)
+CALIBRATION_STEPS = np.round(np.arange(10, 51) * 0.05, 2)
+
+# Inputs the surface spans; everything else is fixed per surface
+SCRUBBED_INPUTS = ("it_capacity", "bus_calibration")
+
+# Bump when the surface layout or grids change (invalidates the shared cache)
+SURFACE_VERSION = 1
+
+
+def default_fixed_inputs():
+    """The estimator's default inputs, less the two scrubbed ones."""
+    return {name: value for name, value in DEFAULT_QUOTE_INPUTS.items() if name not in SCRUBBED_INPUTS}
+
+
+def _key_inputs(fixed_inputs):
+    # Widgets hand back 50.0 where the defaults say 50; both price the same,
+    # so they share one cache entry
+    return {
+        name: float(value) if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else value
+        for name, value in fixed_inputs.items()
+    }
+
+
+def surface_tables(fixed_inputs, coefficients, money_mode="float"):
+    """
+    Response surface for fixed_inputs, from the shared cache (built on a miss).
+    Returns:
+        tuple: (cost, buses) arrays of shape (len(CALIBRATION_STEPS),
+        len(IT_CAPACITY_STEPS)); cost in ₹ as float32
+    """
+    def build():
+        surface = sweep_quote(
+            fixed_inputs,
+            {"bus_calibration": CALIBRATION_STEPS, "it_capacity": IT_CAPACITY_STEPS},
+            coefficients,
+            money_mode
+        )
+        total = surface["total_cost"]
+        if money_mode == "paise":
+            total = from_paise(total)
+        shape = surface["grid_shape"]
+        return {
+            "cost": np.asarray(total, dtype=np.float32).reshape(shape),
+            "buses": surface["estimated_buses"].astype(np.int32).reshape(shape),
+        }
+
+    tables = shared_cache.get_or_build(
+        "response_surface", SURFACE_VERSION, [_key_inputs(fixed_inputs), coefficients, money_mode], build
+    )
+    return tables["cost"], tables["buses"]
@@ -0,0 +1,463 @@
+"""
+Precompiled HTML templates for the results section.
+
+Each section (metric row, study cards, resource summary, studies breakdown,
+services status, cost summary grid, final total) is rendered into one
+compact HTML string and sent with a single st.markdown call instead of one
+call per card. Styling lives in classes in STYLESHEET (injected by the app
+and by the quote viewer page) rather than inline styles, and rendered
+sections are memoised on their data so an unchanged section reuses its
+previous HTML.
+"""
+
+import functools
+from collections import OrderedDict
+from html import escape
+from string import Template
+
+from metrics import record_cache
+
+# Rendered sections kept per process
+SECTION_CACHE_SIZE = 512
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STYLES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+STYLESHEET = """
+.metric-card {
+    background: rgba(30, 41, 59, 0.6);
+    backdrop-filter: blur(10px);
+    border: 1px solid rgba(59, 130, 246, 0.2);
+    border-radius: 12px;
+    padding: 1.5rem;
+    margin: 1rem 0;
+    transition: all 0.3s ease;
+    box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
+}
+
+.metric-card:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 4px 15px rgba(59, 130, 246, 0.2);
+    border-color: rgba(59, 130, 246, 0.4);
+}
+
+.metric-card h3 {
+    color: #64748b;
+    font-size: 0.8rem;
+    font-weight: 600;
+    margin: 0 0 0.5rem 0;
+    text-transform: uppercase;
+    letter-spacing: 0.5px;
+}
+
+.metric-card .value {
+    color: #3b82f6;
+    font-size: 2rem;
+    font-weight: 800;
+    margin: 0;
+    line-height: 1;
+}
+
+.metric-card .subtitle {
+    color: #64748b;
+    font-size: 0.8rem;
+    margin: 0.5rem 0 0 0;
+}
+
+.study-card {
+    background: rgba(30, 41, 59, 0.7);
+    border: 1px solid rgba(71, 85, 105, 0.3);
+    border-radius: 12px;
+    padding: 2rem;
+    margin: 1.5rem 0;
+    transition: all 0.3s ease;
+    backdrop-filter: blur(10px);
+    box-shadow: 0 2px 10px rgba(0, 0, 0, 0.2);
+}
+
+.study-card:hover {
+    border-color: rgba(59, 130, 246, 0.4);
+    box-shadow: 0 4px 15px rgba(59, 130, 246, 0.15);
+}
+
+.study-card h4 {
+    color: #f1f5f9;
+    font-size: 1.2rem;
+    font-weight: 700;
+    margin: 0 0 1rem 0;
+}
+
+.study-details {
+    display: grid;
+    grid-template-columns: 2fr 1fr;
+    gap: 2rem;
+    margin-top: 1rem;
+    align-items: center;
+}
+
+.study-detail-item {
+    color: #cbd5e1;
+    font-size: 0.9rem;
+    line-height: 1.7;
+    font-weight: 500;
+}
+
+.study-detail-item strong {
+    color: #f1f5f9;
+    font-weight: 600;
+}
+
+.cost-highlight {
+    background: linear-gradient(135deg, #3b82f6 0%, #06b6d4 100%);
+    border-radius: 10px;
+    padding: 1.2rem;
+    text-align: center;
+    color: white;
+    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3);
+}
+
+.cost-highlight .amount {
+    font-size: 1.4rem;
+    font-weight: 800;
+    margin: 0;
+}
+
+.results-container {
+    background: rgba(15, 23, 42, 0.8);
+    border: 1px solid rgba(59, 130, 246, 0.3);
+    border-radius: 16px;
+    padding: 2.5rem;
+    margin: 2rem 0;
+    backdrop-filter: blur(15px);
+    box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
+}
+
+.summary-section {
+    background: rgba(15, 23, 42, 0.9);
+    border: 2px solid rgba(59, 130, 246, 0.4);
+    border-radius: 16px;
+    padding: 3rem;
+    margin: 3rem 0;
+    backdrop-filter: blur(20px);
+    box-shadow: 0 8px 30px rgba(0, 0, 0, 0.4);
+}
+
+.final-total-section {
+    background: linear-gradient(135deg, #3b82f6 0%, #06b6d4 100%);
+    border-radius: 16px;
+    padding: 2.5rem;
+    text-align: center;
+    color: white;
+    box-shadow: 0 8px 25px rgba(59, 130, 246, 0.4);
+    margin: 2rem 0;
+}
+
+.cost-category-card {
+    background: rgba(30, 41, 59, 0.6);
+    border: 1px solid rgba(59, 130, 246, 0.2);
+    border-radius: 10px;
+    padding: 1.5rem;
+    text-align: center;
+    backdrop-filter: blur(10px);
+    transition: all 0.3s ease;
+}
+
+.cost-category-card:hover {
+    border-color: rgba(59, 130, 246, 0.4);
+    transform: translateY(-2px);
+}
+
+.card-grid {
+    display: grid;
+    grid-template-columns: repeat(var(--cols), minmax(0, 1fr));
+    gap: 1rem;
+    margin: 1rem 0;
+}
+
+.card-grid .metric-card {
+    margin: 0;
+}
+
+.cost-category-card h4, .cost-category-card h5 {
+    color: var(--accent, #f1f5f9);
+    margin: 0 0 0.8rem 0;
+    font-weight: 700;
+}
+
+.cost-category-card .line {
+    color: #cbd5e1;
+    margin: 0.2rem 0;
+    font-size: 0.85rem;
+}
+
+.cost-category-card .figure {
+    color: #f1f5f9;
+    font-size: 1.4rem;
+    font-weight: 700;
+    margin: 0.5rem 0;
+}
+
+.cost-category-card .accent {
+    color: #3b82f6;
+    margin: 0.5rem 0 0 0;
+    font-weight: 700;
+}
+
+.cost-category-card .note {
+    color: #64748b;
+    margin: 0;
+    font-size: 0.8rem;
+}
+
+.results-container h3 {
+    color: #3b82f6;
+    text-align: center;
+    margin-bottom: 2rem;
+    font-weight: 700;
+}
+
+.resource-hours {
+    color: #3b82f6;
+    font-size: 1.6rem;
+    font-weight: 800;
+    margin: 0.5rem 0;
+}
+
+.study-card .hours {
+    color: #94a3b8;
+    margin: 0 0 1rem 0;
+    font-weight: 500;
+}
+
+.study-card .saved {
+    color: #10b981;
+    font-weight: 600;
+}
+
+.summary-section h2 {
+    color: #f1f5f9;
+    text-align: center;
+    margin-bottom: 2rem;
+    font-weight: 800;
+}
+
+.final-total-section h1 {
+    color: white;
+    margin: 0;
+    font-weight: 800;
+    font-size: 2rem;
+}
+
+.final-total-section .amount {
+    color: white;
+    font-size: 3.5rem;
+    font-weight: 900;
+    margin: 1rem 0;
+}
+
+.final-total-section .caption {
+    color: rgba(255, 255, 255, 0.9);
+    font-size: 1.1rem;
+    margin: 0;
+    font-weight: 500;
+}
+
+#MainMenu {visibility: hidden;}
+footer {visibility: hidden;}
+header {visibility: hidden;}
+
+.service-status {
+    border-radius: 10px;
+    padding: 1rem;
+    font-size: 0.9rem;
+    font-weight: 500;
+}
+
+.service-status.included {
+    background: rgba(16, 185, 129, 0.12);
+    border: 1px solid rgba(16, 185, 129, 0.4);
+    color: #6ee7b7;
+}
+
+.service-status.excluded {
+    background: rgba(239, 68, 68, 0.1);
+    border: 1px solid rgba(239, 68, 68, 0.3);
+    color: #fca5a5;
+}
+
+.service-status.info {
+    background: rgba(59, 130, 246, 0.1);
+    border: 1px solid rgba(59, 130, 246, 0.3);
+    color: #93c5fd;
+}
+"""
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TEMPLATES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Kept on one line each: blank lines or indentation inside st.markdown HTML
+# would be parsed as Markdown
+GRID = Template('<div class="card-grid" style="--cols:$cols">$cards</div>')
+
+METRIC_CARD = Template(
+    '<div class="metric-card"><h3>$title</h3><p class="value">$value</p>'
+    '<p class="subtitle">$subtitle</p></div>'
+)
+
+STUDY_CARD = Template(
+    '<div class="study-card"><h4>$name</h4>'
+    '<p class="hours">$hours total engineering hours$saved</p>'
+    '<div class="study-details"><div class="study-detail-item">'
+    '<strong>Senior Engineer:</strong> ${senior_hours}h × ₹$senior_rate/hr = ₹$senior_cost<br>'
+    '<strong>Mid-level Engineer:</strong> ${mid_hours}h × ₹$mid_rate/hr = ₹$mid_cost<br>'
+    '<strong>Junior Engineer:</strong> ${junior_hours}h × ₹$junior_rate/hr = ₹$junior_cost<br>'
+    '<strong>Report Cost ($report_complexity):</strong> ₹$report_cost</div>'
+    '<div class="cost-highlight"><p class="amount">₹$total</p><small>Total Study Cost</small></div>'
+    '</div></div>'
+)
+
+HOURS_SAVED = Template('<br><span class="saved">Hours Saved: ${hours}h ($reduction% reduction)</span>')
+
+RESOURCE_CARD = Template(
+    '<div class="cost-category-card" style="--accent:#06b6d4"><h4>$grade</h4>'
+    '<p class="resource-hours">$hours hrs</p>'
+    '<p class="note">Rate: ₹$rate/hr • $share%</p>'
+    '<p class="line">Total: ₹$cost</p></div>'
+)
+
+RESOURCE_SUMMARY = Template(
+    '<div class="results-container"><h3>Resource Allocation Summary</h3>$grid</div>'
+)
+
+BREAKDOWN_CARD = Template(
+    '<div class="cost-category-card"><h5>$name</h5>'
+    '<p class="line">Engineering: ₹$engineering</p>'
+    '<p class="line">Report: ₹$report</p>'
+    '<p class="accent">Total: ₹$total</p></div>'
+)
+
+SERVICE_STATUS = Template('<div class="service-status $state">$icon $text</div>')
+SERVICE_ICONS = {"included": "✅", "excluded": "❌", "info": "ℹ️"}
+
+SUMMARY_HEADER = '<div class="summary-section"><h2>Complete Project Cost Summary</h2></div>'
+
+SUMMARY_CARD = Template(
+    '<div class="cost-category-card" style="--accent:$accent"><h4>$title</h4>'
+    '<p class="figure">₹$amount</p><p class="note">$note</p></div>'
+)
+
+FINAL_TOTAL = Template(
+    '<div class="final-total-section"><h1>TOTAL PROJECT COST</h1>'
+    '<p class="amount">₹$total</p><p class="caption">$caption</p></div>'
+)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION RENDERERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_sections = OrderedDict()
+
+
+def _memoised(render):
+    """Cache a section's HTML on the repr of its arguments (bounded LRU)."""
+    @functools.wraps(render)
+    def wrapper(*args):
+        key = (render.__name__, repr(args))
+        html = _sections.get(key)
+        record_cache("result_cards", hit=html is not None)
+        if html is None:
+            html = render(*args)
+            _sections[key] = html
+            if len(_sections) > SECTION_CACHE_SIZE:
+                _sections.popitem(last=False)
+        else:
+            _sections.move_to_end(key)
+        return html
+    return wrapper
+
+
+def _grid(cards):
+    return GRID.substitute(cols=len(cards), cards="".join(cards))
+
+
+@_memoised
+def metric_row(cards):
+    """cards: [(title, value, subtitle)] rendered side by side."""
+    return _grid([
+        METRIC_CARD.substitute(title=escape(title), value=escape(str(value)), subtitle=escape(str(subtitle)))
+        .replace('<p class="subtitle"></p>', '')
+        for title, value, subtitle in cards
+    ])
+
+
+@_memoised
+def study_cards(studies, rates, report_complexity, hour_reduction):
+    """All study cards in one block; rates = (senior, mid, junior) ₹/hr."""
+    senior_rate, mid_rate, junior_rate = rates
+    cards = []
+    for study in studies:
+        saved = ""
+        if study['hours_saved'] > 0:
+            saved = HOURS_SAVED.substitute(hours=f"{study['hours_saved']:.1f}", reduction=hour_reduction)
+        cards.append(STUDY_CARD.substitute(
+            name=escape(study['name']),
+            hours=f"{study['hours']:.1f}",
+            saved=saved,
+            senior_hours=f"{study['senior_hours']:.1f}", senior_rate=f"{senior_rate:,}", senior_cost=f"{study['senior_cost']:,.0f}",
+            mid_hours=f"{study['mid_hours']:.1f}", mid_rate=f"{mid_rate:,}", mid_cost=f"{study['mid_cost']:,.0f}",
+            junior_hours=f"{study['junior_hours']:.1f}", junior_rate=f"{junior_rate:,}", junior_cost=f"{study['junior_cost']:,.0f}",
+            report_complexity=escape(report_complexity),
+            report_cost=f"{study['report_cost']:,.0f}",
+            total=f"{study['total_cost'] + study['report_cost']:,.0f}",
+        ))
+    return "".join(cards)
+
+
+@_memoised
+def resource_summary(grades):
+    """grades: [(label, hours, rate, share_percent, cost)]."""
+    return RESOURCE_SUMMARY.substitute(grid=_grid([
+        RESOURCE_CARD.substitute(
+            grade=label, hours=f"{hours:.0f}", rate=f"{rate:,}", share=f"{share:.1f}", cost=f"{cost:,.0f}"
+        )
+        for label, hours, rate, share, cost in grades
+    ]))
+
+
+@_memoised
+def studies_breakdown(studies):
+    """Summary header plus one compact card per study."""
+    return SUMMARY_HEADER + _grid([
+        BREAKDOWN_CARD.substitute(
+            name=escape(study['name']),
+            engineering=f"{study['total_cost']:,.0f}",
+            report=f"{study['report_cost']:,.0f}",
+            total=f"{study['total_cost'] + study['report_cost']:,.0f}",
+        )
+        for study in studies
+    ])
+
+
+@_memoised
+def cost_summary(cards):
+    """cards: [(title, accent colour, amount, note)]."""
+    return _grid([
+        SUMMARY_CARD.substitute(title=title, accent=accent, amount=f"{amount:,.0f}", note=escape(str(note)))
+        for title, accent, amount, note in cards
+    ])
+
+
+@_memoised
+def final_total(total, caption):
+    return FINAL_TOTAL.substitute(total=f"{total:,.0f}", caption=escape(caption))
+
+
+@_memoised
+def services_status(services):
+    """services: [(state, text)], state one of SERVICE_ICONS (included, excluded, info)."""
+    return _grid([
+        SERVICE_STATUS.substitute(state=state, icon=SERVICE_ICONS[state], text=escape(text))
+        for state, text in services
+    ])
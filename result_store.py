@@ -0,0 +1,373 @@
+"""
+Columnar, memory-mapped store for batch and sweep outputs of the costing engine.
+
+A store is a directory with one raw little-endian binary file per column and
+a JSON schema sidecar:
+
+    results/
+        schema.json          rows, column names/files/dtypes, metadata
+        col_0000.bin         (files are numbered by column position; the
+        col_0001.bin          names, which may come from uploaded headers,
+        ...                   live only in schema.json)
+        col_0003.labels      labels of a dictionary-encoded column, one JSON
+                             string per line in code order
+
+Columns open as read-only np.memmap views, so a 10M-row result opens
+instantly and only the pages a query touches are read. Writing is chunked,
+so results far larger than RAM can be produced with price_to_store(). The
+schema is rewritten after every chunk with the rows written so far, so a
+writer that dies mid-run leaves a readable store of the chunks it finished.
+
+Usage:
+    python result_store.py quotes.csv results/ --chunk-rows 500000
+    python result_store.py --info results/
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import GRADES, STUDY_KEYS, load_coefficients, price_quotes
+
+STORE_FORMAT = "dc-result-store"
+STORE_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+# Rows priced per price_quotes() call when streaming into a store
+DEFAULT_CHUNK_ROWS = 500_000
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FLATTENING ENGINE OUTPUT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def flatten_priced(priced, quotes=None):
+    """
+    Turn price_quotes() output (plus the input columns, if given) into flat
+    1-D columns.
+    Returns:
+        dict: column name -> 1-D array; per-study outputs are named
+        hours_<study>, hours_<study>_<grade>, study_cost_<study> and
+        report_cost_<study>
+    """
+    columns = {}
+    if quotes is not None:
+        for name in quotes.columns:
+            columns[name] = quotes[name].to_numpy()
+    columns["estimated_buses"] = np.asarray(priced["estimated_buses"], dtype=np.int32)
+    for name in ("total_study_cost", "total_report_cost", "subtotal", "total_cost"):
+        columns[name] = np.asarray(priced[name])
+    for s, key in enumerate(STUDY_KEYS):
+        columns[f"hours_{key}"] = priced["hours"][:, s]
+        for g, grade in enumerate(GRADES):
+            columns[f"hours_{key}_{grade}"] = priced["grade_hours"][:, s, g]
+        columns[f"study_cost_{key}"] = priced["study_costs"][:, s]
+        columns[f"report_cost_{key}"] = priced["report_costs"][:, s]
+    return columns
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WRITER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _column_file(index):
+    return f"col_{index:04d}.bin"
+
+
+def _labels_file(column_file):
+    return column_file[:-len(".bin")] + ".labels"
+
+
+def _little_endian(dtype):
+    return dtype.newbyteorder("<") if dtype.byteorder == ">" else dtype
+
+
+class ResultStoreWriter:
+    """
+    Append column chunks to a store directory. The first chunk fixes the
+    column set; every later chunk must carry exactly the same columns.
+    String/object columns are dictionary-encoded to int32 codes. A numeric
+    column widens when a later chunk needs it (int -> float, via
+    np.result_type) and becomes dictionary-encoded if strings appear; the
+    rows already written are rewritten in the new type.
+
+    After every chunk the column files are flushed and the schema sidecar is
+    replaced atomically with the rows written so far ("complete": false
+    until close()), so readers only ever see whole chunks. Category labels
+    go to append-only .labels files, keeping each schema write small.
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.rows = 0
+        self._schema = None
+        self._categories = {}
+        self._files = {}
+        self._label_files = {}
+        os.makedirs(path, exist_ok=True)
+        # Clear a previous store in this directory, so a narrower one doesn't
+        # leave stale column files behind (other files are left alone)
+        for entry in os.listdir(path):
+            if entry == SCHEMA_FILE or (entry.startswith("col_") and entry.endswith((".bin", ".labels", ".tmp"))):
+                os.remove(os.path.join(path, entry))
+
+    def _init_schema(self, columns):
+        self._schema = {}
+        self._paths = {}
+        for index, (name, values) in enumerate(columns.items()):
+            values = np.asarray(values)
+            self._paths[name] = _column_file(index)
+            if values.dtype.kind in "OUS":
+                self._start_categories(name)
+                dtype = np.dtype("<i4")
+            else:
+                dtype = _little_endian(values.dtype)
+            self._schema[name] = dtype
+            self._files[name] = open(self._column_path(name), "wb")
+
+    def _column_path(self, name):
+        return os.path.join(self.path, self._paths[name])
+
+    def _labels_file(self, name):
+        return _labels_file(self._paths[name])
+
+    def _start_categories(self, name):
+        self._categories[name] = {}
+        self._label_files[name] = open(os.path.join(self.path, self._labels_file(name)), "w", encoding="utf-8")
+
+    def _rewrite(self, name, values):
+        """Replace a column's rows written so far (after a type change)."""
+        self._files[name].close()
+        tmp_path = self._column_path(name) + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            values.tofile(fh)
+        os.replace(tmp_path, self._column_path(name))
+        self._files[name] = open(self._column_path(name), "ab")
+        self._write_schema(complete=False)
+
+    def _written(self, name):
+        self._files[name].flush()
+        return np.fromfile(self._column_path(name), dtype=self._schema[name], count=self.rows)
+
+    def _encode(self, name, values):
+        lookup = self._categories[name]
+        uniques, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+        new_labels = [label for label in uniques.tolist() if label not in lookup]
+        for label in new_labels:
+            lookup[label] = len(lookup)
+        self._label_files[name].writelines(json.dumps(label) + "\n" for label in new_labels)
+        codes = np.array([lookup[label] for label in uniques.tolist()], dtype=np.int32)
+        return codes[inverse]
+
+    def _column_values(self, name, values):
+        """One chunk of a column in the column's stored type, widening it if needed."""
+        values = np.asarray(values)
+        if name not in self._categories and values.dtype.kind in "OUS":
+            # Strings in a numeric column: dictionary-encode it from here on
+            written = self._written(name)
+            self._start_categories(name)
+            self._schema[name] = np.dtype("<i4")
+            self._rewrite(name, self._encode(name, written))
+        if name in self._categories:
+            return self._encode(name, values)
+        dtype = _little_endian(np.result_type(self._schema[name], values.dtype))
+        if dtype != self._schema[name]:
+            written = self._written(name).astype(dtype)
+            self._schema[name] = dtype
+            self._rewrite(name, written)
+        return np.ascontiguousarray(values, dtype=dtype)
+
+    def append(self, columns):
+        """Append one chunk: {name: 1-D array}, all the same length, same columns as the first chunk."""
+        if self._schema is None:
+            self._init_schema(columns)
+        missing = [name for name in self._schema if name not in columns]
+        unexpected = [name for name in columns if name not in self._schema]
+        if missing or unexpected:
+            raise ValueError(
+                "chunk columns differ from the store's"
+                + (f"; missing: {', '.join(missing)}" if missing else "")
+                + (f"; unexpected: {', '.join(unexpected)}" if unexpected else "")
+            )
+        lengths = {len(columns[name]) for name in self._schema}
+        if len(lengths) != 1:
+            raise ValueError("all columns in a chunk must have the same length")
+        for name in self._schema:
+            self._column_values(name, columns[name]).tofile(self._files[name])
+        self.rows += lengths.pop()
+        self._write_schema(complete=False)
+
+    def close(self):
+        self._write_schema(complete=True)
+        for fh in list(self._files.values()) + list(self._label_files.values()):
+            fh.close()
+
+    def _write_schema(self, complete):
+        for fh in list(self._files.values()) + list(self._label_files.values()):
+            fh.flush()
+        schema = {
+            "format": STORE_FORMAT,
+            "version": STORE_VERSION,
+            "rows": self.rows,
+            "complete": complete,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "columns": [
+                {
+                    "name": name,
+                    "file": self._paths[name],
+                    "dtype": dtype.str,
+                    **({"labels": self._labels_file(name), "label_count": len(self._categories[name])}
+                       if name in self._categories else {}),
+                }
+                for name, dtype in (self._schema or {}).items()
+            ],
+            "metadata": self.metadata,
+        }
+        tmp_path = os.path.join(self.path, SCHEMA_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(schema, fh, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(self.path, SCHEMA_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def price_to_store(quotes, path, coefficients=None, money_mode="float", chunk_rows=DEFAULT_CHUNK_ROWS, progress=None,
+                   stats=None):
+    """
+    Price quotes chunk by chunk straight into a store, keeping memory flat.
+    quotes: a DataFrame or an iterable of DataFrame chunks (e.g.
+    pd.read_csv(..., chunksize=...)). progress: optional callback(rows_done).
+    stats: optional streaming_stats.StreamingStats to fold every chunk into.
+    Returns:
+        int: rows written
+    """
+    coefficients = coefficients or load_coefficients()
+    if isinstance(quotes, pd.DataFrame):
+        frame = quotes
+        quotes = (frame.iloc[i:i + chunk_rows] for i in range(0, len(frame), chunk_rows))
+    metadata = {
+        "source": "price_quotes",
+        "money_mode": money_mode,
+        "coefficients_version": coefficients.get("version"),
+    }
+    with ResultStoreWriter(path, metadata) as writer:
+        for chunk in quotes:
+            priced = price_quotes(chunk, coefficients, money_mode)
+            writer.append(flatten_priced(priced, chunk))
+            if stats is not None:
+                stats.update(chunk, priced, money_mode)
+            if progress:
+                progress(writer.rows)
+    return writer.rows
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# READER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ResultStore:
+    """Read-only, zero-copy view of a store directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as fh:
+            schema = json.load(fh)
+        if schema.get("format") != STORE_FORMAT or schema.get("version", 0) > STORE_VERSION:
+            raise ValueError(f"{path} is not a version {STORE_VERSION} result store")
+        self.rows = int(schema["rows"])
+        # False while a writer is still appending (or if it died part way)
+        self.complete = schema.get("complete", True)
+        self.metadata = schema.get("metadata", {})
+        self._columns = {column["name"]: column for column in schema["columns"]}
+        self._maps = {}
+        self._labels = {}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        """Memory-mapped column (int32 codes for categorical columns)."""
+        if name not in self._maps:
+            spec = self._columns[name]
+            if self.rows == 0:
+                self._maps[name] = np.empty(0, dtype=spec["dtype"])
+            else:
+                self._maps[name] = np.memmap(
+                    os.path.join(self.path, spec["file"]),
+                    dtype=spec["dtype"], mode="r", shape=(self.rows,)
+                )
+        return self._maps[name]
+
+    def categories(self, name):
+        """Labels of a dictionary-encoded column (None for numeric columns)."""
+        spec = self._columns[name]
+        if "labels" not in spec:
+            return None
+        if name not in self._labels:
+            with open(os.path.join(self.path, spec["labels"]), "r", encoding="utf-8") as fh:
+                self._labels[name] = [json.loads(next(fh)) for _ in range(spec["label_count"])]
+        return self._labels[name]
+
+    def decode(self, name):
+        labels = self.categories(name)
+        if labels is None:
+            return self[name]
+        return np.asarray(labels, dtype=object)[self[name]]
+
+    def to_frame(self, columns=None, decode=True):
+        """Materialise some or all columns as a DataFrame (categoricals as pd.Categorical)."""
+        data = {}
+        for name in columns or self.columns:
+            labels = self.categories(name)
+            if labels is not None and decode:
+                data[name] = pd.Categorical.from_codes(np.asarray(self[name]), categories=labels)
+            else:
+                data[name] = self[name]
+        return pd.DataFrame(data, copy=False)
+
+
+def open_result_store(path):
+    return ResultStore(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price quotes into a columnar memory-mapped result store")
+    parser.add_argument("quotes", nargs="?", help="CSV of flat quote inputs (cost_engine.DEFAULT_QUOTE_INPUTS columns)")
+    parser.add_argument("store", help="store directory")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--money-mode", choices=["float", "paise"], default="float")
+    parser.add_argument("--info", action="store_true", help="describe an existing store instead of writing one")
+    args = parser.parse_args(argv)
+
+    if not args.info:
+        if not args.quotes:
+            parser.error("quotes is required unless --info is given")
+        chunks = pd.read_csv(args.quotes, chunksize=args.chunk_rows)
+        rows = price_to_store(
+            chunks, args.store, money_mode=args.money_mode,
+            progress=lambda done: print(f"{done:,} rows priced", end="\r", flush=True),
+        )
+        print(f"\nWrote {rows:,} rows to {args.store}")
+
+    store = open_result_store(args.store)
+    print(f"{store.rows:,} rows, {len(store.columns)} columns, metadata {store.metadata}")
+    total = store["total_cost"] if "total_cost" in store else None
+    if total is not None and store.rows:
+        print(f"total_cost: mean {total.mean():,.0f}, min {total.min():,.0f}, max {total.max():,.0f}")
+
+
+if __name__ == "__main__":
+    main()
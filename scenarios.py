@@ -0,0 +1,127 @@
+"""
+Scenario workspace: named input sets with cached results.
+
+Each scenario keeps its flat quote inputs and the results of its last
+pricing, tagged with a key over (inputs, coefficient version, money mode).
+Only scenarios whose key no longer matches are dirty, and all dirty
+scenarios are priced together in one price_quotes() call.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import GRADES, STUDY_KEYS, STUDY_NAMES, price_quotes
+from money import from_paise
+
+# Outputs shown in the comparison table, in display order
+OUTPUT_ROWS = [
+    ("estimated_buses", "Bus Count"),
+    ("total_hours", "Total Hours"),
+    ("total_study_cost", "Studies (₹)"),
+    ("total_report_cost", "Reports (₹)"),
+    ("subtotal", "Subtotal (₹)"),
+    ("total_cost", "Total Cost (₹)"),
+]
+
+
+def scenario_key(inputs, coefficients, money_mode):
+    payload = json.dumps(
+        [inputs, coefficients.get("version"), coefficients.get("source"), money_mode],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def save_scenario(scenarios, name, inputs):
+    """Add or overwrite a scenario; overwritten scenarios become dirty."""
+    previous = scenarios.get(name)
+    if previous is not None and previous["inputs"] == inputs:
+        return
+    scenarios[name] = {"inputs": dict(inputs), "key": None, "results": None}
+
+
+def refresh_scenarios(scenarios, coefficients, money_mode="float"):
+    """
+    Recompute every dirty scenario in a single batched evaluation.
+    Returns:
+        int: number of scenarios recomputed
+    """
+    dirty = []
+    for name, scenario in scenarios.items():
+        key = scenario_key(scenario["inputs"], coefficients, money_mode)
+        if scenario["key"] != key:
+            dirty.append((name, key))
+    if not dirty:
+        return 0
+
+    frame = pd.DataFrame([scenarios[name]["inputs"] for name, _ in dirty])
+    priced = price_quotes(frame, coefficients, money_mode)
+    if money_mode == "paise":
+        for field in ("grade_costs", "study_costs", "report_costs", "total_study_cost",
+                      "total_report_cost", "subtotal", "total_cost"):
+            priced[field] = from_paise(priced[field])
+
+    for row, (name, key) in enumerate(dirty):
+        selected = [bool(scenarios[name]["inputs"].get(k, False)) for k in STUDY_KEYS]
+        study_results = {
+            study_key: {
+                "name": STUDY_NAMES[study_key],
+                "hours": float(priced["hours"][row, idx]),
+                **{f"{grade}_hours": float(priced["grade_hours"][row, idx, g]) for g, grade in enumerate(GRADES)},
+                "total_cost": float(priced["study_costs"][row, idx]),
+                "report_cost": float(priced["report_costs"][row, idx]),
+            }
+            for idx, study_key in enumerate(STUDY_KEYS)
+            if selected[idx]
+        }
+        scenarios[name]["results"] = {
+            "estimated_buses": int(priced["estimated_buses"][row]),
+            "total_hours": float(priced["hours"][row].sum()),
+            "total_study_cost": float(priced["total_study_cost"][row]),
+            "total_report_cost": float(priced["total_report_cost"][row]),
+            "subtotal": float(priced["subtotal"][row]),
+            "total_cost": float(priced["total_cost"][row]),
+            "study_results": study_results,
+        }
+        scenarios[name]["key"] = key
+    return len(dirty)
+
+
+def comparison_table(scenarios):
+    """
+    Side-by-side comparison, one column per scenario.
+    Returns:
+        tuple: (inputs that differ between scenarios, headline outputs and
+        per-study costs with deltas against the first scenario)
+    """
+    names = list(scenarios)
+    if not names:
+        return pd.DataFrame(), pd.DataFrame()
+
+    inputs = pd.DataFrame({name: pd.Series(scenarios[name]["inputs"]) for name in names})
+    differing = inputs[inputs.astype(str).nunique(axis=1) > 1]
+    differing = differing.drop(index=[i for i in ("project_name",) if i in differing.index])
+
+    rows = {}
+    for field, label in OUTPUT_ROWS:
+        rows[label] = [scenarios[name]["results"][field] for name in names]
+    for study_key in STUDY_KEYS:
+        values = [
+            scenarios[name]["results"]["study_results"].get(study_key)
+            for name in names
+        ]
+        if any(values):
+            rows[f"{STUDY_NAMES[study_key]} (₹)"] = [
+                (v["total_cost"] + v["report_cost"]) if v else np.nan for v in values
+            ]
+    outputs = pd.DataFrame(rows, index=names).T
+
+    if len(names) > 1:
+        base = outputs[names[0]]
+        for name in names[1:]:
+            outputs[f"Δ {name} vs {names[0]}"] = outputs[name] - base
+    return differing.astype(str), outputs
@@ -0,0 +1,190 @@
+"""
+Resource-constrained delivery scheduler.
+
+Turns the per-study senior/mid/junior hours from study_results into calendar
+dates, given team headcount and the study precedence chain (load flow before
+short circuit before PDC before arc flash; harmonics and transient need the
+load flow model). Scheduling is event driven: a heap of ready studies ordered
+by release time and priority, and one heap per grade of engineers ordered by
+the time they become free, so a portfolio of hundreds of projects schedules
+in milliseconds.
+"""
+
+import datetime
+import heapq
+import math
+
+import numpy as np
+
+GRADES = ["senior", "mid", "junior"]
+
+# Direct predecessors of each study
+STUDY_PRECEDENCE = {
+    "load_flow": [],
+    "short_circuit": ["load_flow"],
+    "pdc": ["short_circuit"],
+    "arc_flash": ["pdc"],
+    "harmonics": ["load_flow"],
+    "transient": ["load_flow"],
+}
+
+DEFAULT_HEADCOUNT = {"senior": 2, "mid": 3, "junior": 4}
+
+
+def _effective_predecessors(study_key, selected):
+    """Nearest selected ancestors, so deselected studies drop out of the chain."""
+    found = []
+    pending = list(STUDY_PRECEDENCE.get(study_key, []))
+    while pending:
+        parent = pending.pop()
+        if parent in selected:
+            if parent not in found:
+                found.append(parent)
+        else:
+            pending.extend(STUDY_PRECEDENCE.get(parent, []))
+    return found
+
+
+def _to_date(epoch, offset_days, holidays, finish=False):
+    """Working-day offset from epoch -> calendar date (finish rounds up into the last day worked)."""
+    if finish:
+        whole = max(math.ceil(offset_days - 1e-9) - 1, 0)
+    else:
+        whole = math.floor(offset_days + 1e-9)
+    return np.busday_offset(epoch, whole, roll="forward", holidays=holidays).astype(datetime.date)
+
+
+def schedule_portfolio(
+    projects,
+    headcount=None,
+    hours_per_day=8.0,
+    crew_per_grade=None,
+    holidays=()
+):
+    """
+    Schedule a portfolio of projects against a shared team.
+
+    projects: list of dicts with
+        'project'      - name
+        'study_results'- the app's study_results dict (needs <grade>_hours per study)
+        'start_date'   - datetime.date the project is released (default: today)
+        'urgent'       - optional bool; urgent projects win ties for engineers
+    headcount: engineers per grade, e.g. {'senior': 2, 'mid': 3, 'junior': 4}
+    crew_per_grade: max engineers of a grade working one study in parallel
+        (default 1, i.e. each study's grade hours sit with one engineer)
+    holidays: dates skipped in addition to weekends
+
+    Returns:
+        list: one dict per project with 'completion_date', 'lead_time_days'
+        (working days from release) and per-study 'start'/'finish' dates
+    """
+    headcount = dict(DEFAULT_HEADCOUNT, **(headcount or {}))
+    crew_per_grade = dict({g: 1 for g in GRADES}, **(crew_per_grade or {}))
+    holidays = np.array(list(holidays), dtype="datetime64[D]")
+    if not projects:
+        return []
+
+    today = datetime.date.today()
+    release_dates = [p.get("start_date") or today for p in projects]
+    epoch = np.datetime64(min(release_dates), "D")
+    epoch = np.busday_offset(epoch, 0, roll="forward", holidays=holidays)
+    releases = np.busday_count(epoch, np.array(release_dates, dtype="datetime64[D]"), holidays=holidays)
+
+    # Engineers: heap of (free_at, engineer_id) per grade
+    engineers = {g: [(0.0, i) for i in range(int(headcount[g]))] for g in GRADES}
+
+    # Build the task graph
+    task_hours, task_meta, successors, waiting, ready_at = [], [], [], [], []
+    ready = []
+    for p_idx, project in enumerate(projects):
+        results = project.get("study_results", {})
+        selected = set(results)
+        index = {}
+        for study_key in results:
+            index[study_key] = len(task_meta)
+            task_meta.append((p_idx, study_key))
+            task_hours.append([float(results[study_key].get(f"{g}_hours", 0.0)) for g in GRADES])
+            successors.append([])
+            waiting.append(0)
+            ready_at.append(float(releases[p_idx]))
+        for study_key in results:
+            t = index[study_key]
+            for parent in _effective_predecessors(study_key, selected):
+                successors[index[parent]].append(t)
+                waiting[t] += 1
+        priority = 0 if project.get("urgent") else 1
+        for study_key in results:
+            t = index[study_key]
+            if waiting[t] == 0:
+                heapq.heappush(ready, (ready_at[t], priority, t))
+
+    for g_idx, g in enumerate(GRADES):
+        if not engineers[g] and any(h[g_idx] > 0 for h in task_hours):
+            raise ValueError(f"No {g} engineers available for {g} hours")
+
+    task_start = [0.0] * len(task_meta)
+    task_finish = [0.0] * len(task_meta)
+
+    # Event loop: always place the earliest-ready study next
+    while ready:
+        t_ready, priority, t = heapq.heappop(ready)
+        start = finish = t_ready
+        first = True
+        for g_idx, g in enumerate(GRADES):
+            hours = task_hours[t][g_idx]
+            if hours <= 0:
+                continue
+            pool = engineers[g]
+            crew = max(1, min(int(crew_per_grade[g]), len(pool)))
+            share = hours / crew / hours_per_day
+            taken = [heapq.heappop(pool) for _ in range(crew)]
+            for free_at, eng_id in taken:
+                seg_start = max(t_ready, free_at)
+                seg_end = seg_start + share
+                heapq.heappush(pool, (seg_end, eng_id))
+                start = seg_start if first else min(start, seg_start)
+                finish = max(finish, seg_end)
+                first = False
+        task_start[t] = start
+        task_finish[t] = finish
+        for child in successors[t]:
+            ready_at[child] = max(ready_at[child], finish)
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                heapq.heappush(ready, (ready_at[child], priority, child))
+
+    # Collate per project
+    schedules = [
+        {
+            "project": project.get("project", f"Project {p_idx + 1}"),
+            "start_date": release_dates[p_idx],
+            "studies": {},
+            "_finish": float(releases[p_idx]),
+        }
+        for p_idx, project in enumerate(projects)
+    ]
+    for t, (p_idx, study_key) in enumerate(task_meta):
+        entry = schedules[p_idx]
+        entry["studies"][study_key] = {
+            "start": _to_date(epoch, task_start[t], holidays),
+            "finish": _to_date(epoch, task_finish[t], holidays, finish=True),
+            "working_days": task_finish[t] - task_start[t],
+        }
+        entry["_finish"] = max(entry["_finish"], task_finish[t])
+
+    for p_idx, entry in enumerate(schedules):
+        end = entry.pop("_finish")
+        entry["lead_time_days"] = math.ceil(end - releases[p_idx] - 1e-9)
+        entry["completion_date"] = (
+            _to_date(epoch, end, holidays, finish=True) if entry["studies"] else entry["start_date"]
+        )
+    return schedules
+
+
+def schedule_project(study_results, headcount=None, start_date=None, **kwargs):
+    """Single-project convenience wrapper around schedule_portfolio()."""
+    return schedule_portfolio(
+        [{"project": "Project", "study_results": study_results, "start_date": start_date}],
+        headcount=headcount,
+        **kwargs
+    )[0]
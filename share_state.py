@@ -0,0 +1,188 @@
+"""
+Shareable quote links: the full estimator input state packed into one
+compact query-string token.
+
+The token is '<version>.<payload>', where the payload is the field values in
+a fixed per-version order (no key names), JSON-encoded, raw-deflated and
+URL-safe base64 without padding. Nothing is stored on the server; a link
+carries the whole quote. Decoding checks every value against the widget's
+type and bounds, so a hand-edited token can't put a widget out of range.
+
+New fields go into a new schema version; old versions stay decodable so
+links already sent keep working.
+
+Usage:
+    token = encode_state(share_inputs)          # -> "2.jVTLbts..."
+    restored = decode_state(token)              # -> {"tier_level": "Tier IV", ...}
+"""
+
+import base64
+import json
+import zlib
+
+from cost_engine import REDUNDANCY_NAMES, TIER_LEVELS
+
+SHARE_VERSION = 2
+QUERY_PARAM = "q"
+
+# Conservative limit: fits the 2,048-character URLs some browsers, proxies
+# and chat clients still truncate at, with room for the host and path
+MAX_TOKEN_LENGTH = 1800
+
+# Decompression cap, so a crafted token can't inflate into a huge string
+MAX_DECODED_BYTES = 64 * 1024
+
+TIERS = tuple(TIER_LEVELS)
+TOPOLOGIES = tuple(name for name in REDUNDANCY_NAMES if name not in TIER_LEVELS)
+
+# (field, type, (min, max) for numbers or allowed values for choices)
+_FIELDS_V1 = (
+    ("project_name", str, None),
+    ("tier_level", str, TIERS),
+    ("it_capacity", float, (0.0, 200.0)),
+    ("mechanical_load", float, (0.0, 100.0)),
+    ("house_load", float, (0.0, 50.0)),
+    ("delivery_type", str, ("Standard", "Urgent")),
+    ("report_complexity", str, ("Basic", "Standard", "Premium")),
+    ("client_meetings", int, (0, 20)),
+    ("customer_type", str, ("New Customer", "Repeat Customer")),
+    ("repeat_discount", int, (0, 25)),
+    ("custom_margin", int, (0, 50)),
+    ("pue", float, (1.1, 2.0)),
+    ("use_custom_blocks", bool, None),
+    ("bus_calibration", float, (0.5, 2.5)),
+    ("ups_lineup", float, (0.5, 3.0)),
+    ("transformer_mva", float, (1.0, 5.0)),
+    ("lv_bus_mw", float, (2.0, 5.0)),
+    ("pdu_mva", float, (0.2, 0.8)),
+    ("power_factor", float, (0.90, 1.0)),
+    ("model_type", str, ("Typical Model", "ETAP Model Available")),
+    ("hour_reduction", int, (10, 90)),
+    ("load_flow", bool, None),
+    ("short_circuit", bool, None),
+    ("pdc", bool, None),
+    ("arc_flash", bool, None),
+    ("harmonics", bool, None),
+    ("transient", bool, None),
+    ("senior", float, (5, 50)),
+    ("mid", float, (10, 60)),
+    ("junior", float, (10, 70)),
+    ("senior_rate", int, (1000, 8000)),
+    ("mid_rate", int, (500, 5000)),
+    ("junior_rate", int, (300, 2000)),
+    ("exact_money", bool, None),
+    ("load_flow_factor", float, (0.3, 3.0)),
+    ("short_circuit_factor", float, (0.3, 3.0)),
+    ("pdc_factor", float, (0.3, 3.0)),
+    ("arc_flash_factor", float, (0.3, 3.0)),
+    ("harmonics_factor", float, (0.3, 3.0)),
+    ("transient_factor", float, (0.3, 3.0)),
+    ("urgency_multiplier", float, (1.0, 3.0)),
+    ("meeting_cost", int, (2000, 25000)),
+    ("load_flow_report_cost", int, (0, 150000)),
+    ("short_circuit_report_cost", int, (0, 150000)),
+    ("pdc_report_cost", int, (0, 150000)),
+    ("arc_flash_report_cost", int, (0, 150000)),
+    ("harmonics_report_cost", int, (0, 150000)),
+    ("transient_report_cost", int, (0, 150000)),
+    ("site_visit_enabled", bool, None),
+    ("site_visits", int, (0, 20)),
+    ("site_visit_cost", int, (0, 50000)),
+    ("af_labels_enabled", bool, None),
+    ("num_labels", int, (0, 500)),
+    ("cost_per_label", int, (0, 500)),
+    ("stickering_enabled", bool, None),
+    ("stickering_cost", int, (0, 100000)),
+    ("custom_charges_desc", str, None),
+    ("custom_charges_cost", int, (0, 500000)),
+    ("custom_cost_1_desc", str, None),
+    ("custom_cost_1_amount", int, (0, 1000000)),
+    ("custom_cost_2_desc", str, None),
+    ("custom_cost_2_amount", int, (0, 1000000)),
+    ("scope_description", str, None),
+)
+
+# v2: redundancy topology ("" = per tier level)
+_FIELDS_V2 = _FIELDS_V1 + (
+    ("redundancy_scheme", str, ("",) + TOPOLOGIES),
+)
+
+SCHEMAS = {1: _FIELDS_V1, 2: _FIELDS_V2}
+SHARED_FIELDS = [name for name, _, _ in SCHEMAS[SHARE_VERSION]]
+_FIELD_SPECS = {field[0]: field for field in SCHEMAS[SHARE_VERSION]}
+
+
+def encode_state(state):
+    """
+    Pack the shareable inputs into a URL token.
+    Returns:
+        str: '<version>.<base64url payload>'
+    Raises ValueError if the token would exceed MAX_TOKEN_LENGTH (long free text).
+    """
+    values = [state[name] for name in SHARED_FIELDS]
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -15)
+    payload = deflate.compress(raw) + deflate.flush()
+    token = f"{SHARE_VERSION}." + base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    if len(token) > MAX_TOKEN_LENGTH:
+        raise ValueError(
+            f"Share link would be {len(token):,} characters (limit {MAX_TOKEN_LENGTH:,}); "
+            "shorten the scope or custom descriptions"
+        )
+    return token
+
+
+def _coerce(value, kind, spec):
+    # None means "drop this field and keep the widget default"
+    if kind is bool:
+        return value if isinstance(value, bool) else None
+    if kind is str:
+        if not isinstance(value, str):
+            return None
+        return value if spec is None or value in spec else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    low, high = spec
+    value = min(max(value, low), high)
+    return int(round(value)) if kind is int else float(value)
+
+
+def clamp_field(name, value):
+    """
+    value fitted to the widget behind a shared field (type and bounds), for
+    defaults that come from outside the app such as regional rate cards.
+    Returns None if the value can't be used.
+    """
+    _, kind, spec = _FIELD_SPECS[name]
+    return _coerce(value, kind, spec)
+
+
+def decode_state(token):
+    """
+    Unpack a token from encode_state().
+    Returns:
+        dict: field -> value for every field that passed validation
+    Raises ValueError for malformed tokens or unknown versions.
+    """
+    version, _, payload = (token or "").partition(".")
+    if not version.isdigit() or int(version) not in SCHEMAS:
+        raise ValueError(f"Unsupported share link version: {version or '?'}")
+    fields = SCHEMAS[int(version)]
+    try:
+        compressed = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        inflate = zlib.decompressobj(-15)
+        raw = inflate.decompress(compressed, MAX_DECODED_BYTES)
+        if inflate.unconsumed_tail:
+            raise ValueError("payload too large")
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, zlib.error) as exc:
+        raise ValueError(f"Share link is damaged or incomplete ({exc})") from None
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError("Share link does not match its version's field list")
+
+    state = {}
+    for (name, kind, spec), value in zip(fields, values):
+        value = _coerce(value, kind, spec)
+        if value is not None:
+            state[name] = value
+    return state
@@ -0,0 +1,199 @@
+"""
+Cross-process cache of precomputed NumPy tables.
+
+When the app runs as several Streamlit processes, each would otherwise build
+its own copy of expensive tables (response surfaces and the like). Here the
+first process to need a table builds it under a file lock and writes it as
+.npy files to a memory-backed directory (/dev/shm when available); every
+process then attaches with np.load(mmap_mode="r"), so they all share one copy
+in the page cache and a new worker starts warm.
+
+Keys are versioned: name + explicit version + a hash of the build
+parameters. Bumping the version (or changing a parameter such as the
+coefficient set) builds a new entry, and prune() drops superseded ones.
+
+Configure the location with DC_SHARED_CACHE_DIR. Builds are serialised with
+fcntl.flock, or msvcrt.locking on Windows; where neither exists each process
+builds its own private copy and nothing is shared.
+"""
+
+import contextlib
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+ENABLED = fcntl is not None or msvcrt is not None
+
+
+def _default_dir():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "dc-cost-cache")
+
+
+SHARED_CACHE_DIR = os.environ.get("DC_SHARED_CACHE_DIR") or _default_dir()
+MANIFEST_FILE = "manifest.json"
+
+# Entries kept per table name; the least recently built beyond this are evicted
+DEFAULT_MAX_ENTRIES = 256
+
+# Entries attached in this process (key -> dict of read-only memmaps), least
+# recently used first. Matches app.py's _cached_response_surface(max_entries=64),
+# which holds its own references; an entry dropped here is re-attached from
+# disk on its next use.
+MAX_ATTACHED = 64
+_attached = OrderedDict()
+_attached_lock = threading.Lock()
+
+
+def cache_key(name, version, params):
+    """Versioned key: '<name>-v<version>-<hash of params>'."""
+    digest = hashlib.blake2b(
+        json.dumps(params, sort_keys=True, default=str).encode("utf-8"), digest_size=10
+    ).hexdigest()
+    return f"{name}-v{version}-{digest}"
+
+
+def _attach(path):
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    return {
+        array_name: np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode="r")
+        for array_name in manifest["arrays"]
+    }
+
+
+@contextlib.contextmanager
+def _build_lock(lock_path):
+    with open(lock_path, "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            return
+        while True:
+            try:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                # LK_LOCK gives up after ~10 s; a long build just means waiting again
+                continue
+        try:
+            yield
+        finally:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write(path, arrays, manifest):
+    # Write into a scratch directory and rename it into place, so readers
+    # only ever see complete entries
+    scratch = tempfile.mkdtemp(prefix=".building-", dir=os.path.dirname(path))
+    try:
+        for array_name, values in arrays.items():
+            np.save(os.path.join(scratch, f"{array_name}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(scratch, MANIFEST_FILE), "w", encoding="utf-8") as fh:
+            json.dump(dict(manifest, arrays=list(arrays)), fh)
+        os.replace(scratch, path)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+
+def get_or_build(name, version, params, build, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Return the shared tables for (name, version, params), building them with
+    build() -> {array_name: np.ndarray} if no process has yet. Without a file
+    lock (ENABLED is False) the tables are built in-process and not shared.
+    Returns:
+        dict: array_name -> read-only np.memmap shared across processes
+    """
+    if not ENABLED:
+        record_cache("shared_tables", hit=False)
+        return build()
+    cache_dir = cache_dir or SHARED_CACHE_DIR
+    key = cache_key(name, version, params)
+    with _attached_lock:
+        if key in _attached:
+            _attached.move_to_end(key)
+            record_cache("shared_tables", hit=True)
+            return _attached[key]
+
+    path = os.path.join(cache_dir, key)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    hit = True
+    for attempt in range(2):
+        if not os.path.exists(manifest_path):
+            os.makedirs(cache_dir, exist_ok=True)
+            with _build_lock(os.path.join(cache_dir, f"{key}.lock")):
+                # Another process may have finished building while we waited
+                if not os.path.exists(manifest_path):
+                    hit = False
+                    _write(path, build(), {"name": name, "version": version})
+                    _evict(name, max_entries, cache_dir)
+        try:
+            tables = _attach(path)
+            break
+        except FileNotFoundError:
+            # prune() in another process removed the entry after the check
+            # above; go round once more and rebuild it
+            if attempt:
+                raise
+    with _attached_lock:
+        _attached[key] = tables
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)
+    record_cache("shared_tables", hit=hit)
+    return tables
+
+
+def _entries(name, cache_dir):
+    return [
+        entry for entry in os.listdir(cache_dir)
+        if entry.startswith(f"{name}-v") and not entry.endswith(".lock")
+    ]
+
+
+def _evict(name, max_entries, cache_dir):
+    # Processes that already mapped an evicted entry keep their (unlinked) copy
+    entries = sorted(_entries(name, cache_dir), key=lambda e: os.path.getmtime(os.path.join(cache_dir, e)))
+    if len(entries) > max_entries:
+        prune(name, keep_keys=entries[len(entries) - max_entries:], cache_dir=cache_dir)
+
+
+def prune(name, keep_keys=(), cache_dir=None):
+    """
+    Remove entries of `name` other than keep_keys (e.g. older versions).
+    Their .lock files stay: another process may hold or be waiting on one,
+    and unlinking it would let a second builder lock a fresh file.
+    """
+    cache_dir = cache_dir or SHARED_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for entry in _entries(name, cache_dir):
+        if entry not in keep_keys:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+            with _attached_lock:
+                _attached.pop(entry, None)
+            removed += 1
+    return removed
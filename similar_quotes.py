@@ -0,0 +1,196 @@
+"""
+Nearest-neighbour lookup of similar past projects, to suggest the bus
+calibration factor from history instead of by feel.
+
+Each historical project becomes a point in a normalised feature space:
+log IT / mechanical / house MW, tier, equipment block sizes and model type,
+each scaled by its spread in the history (tier weighted up, so projects of
+another tier only match when nothing closer exists). The k nearest past
+projects to the current inputs come back with their actual bus counts and
+final prices, and the calibration each one implies (actual buses over the
+un-calibrated formula count). The suggestion is the distance-weighted median
+of those, snapped to the slider's 0.05 step.
+
+Uses scipy's cKDTree when scipy is installed; otherwise an exact NumPy scan
+(one float32 matrix-vector product, ~20 ms for 1M projects).
+
+Usage:
+    python similar_quotes.py history.csv --it 12 --mech 6 --house 3 --tier "Tier III" -k 5
+
+History columns: tier_level, it_capacity, mechanical_load, house_load,
+actual_buses; optional: project_name, final_price (or total_cost),
+model_type and the block-size columns.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from calibration import BLOCK_COLUMNS, load_history
+from cost_engine import DEFAULT_QUOTE_INPUTS, TIER_LEVELS, calculate_bus_count_batch, tier_codes
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+LOAD_COLUMNS = ["it_capacity", "mechanical_load", "house_load"]
+FEATURE_NAMES = LOAD_COLUMNS + ["tier_level"] + BLOCK_COLUMNS + ["model_type"]
+
+# Relative importance in normalised units; a one-tier step outweighs a
+# ~2.5x difference in load
+FEATURE_WEIGHTS = {"tier_level": 3.0}
+
+PRICE_COLUMNS = ("final_price", "total_cost")
+DEFAULT_K = 5
+
+# Same range and step as the app's Calibration Multiplier slider
+CALIBRATION_RANGE = (0.5, 2.5)
+CALIBRATION_STEP = 0.05
+
+
+def _raw_features(frame):
+    n = len(frame)
+
+    def column(name):
+        if name in frame.columns:
+            return frame[name].to_numpy()
+        return np.full(n, DEFAULT_QUOTE_INPUTS[name])
+
+    features = [np.log1p(np.maximum(column(name).astype(float), 0)) for name in LOAD_COLUMNS]
+    features.append(tier_codes(column("tier_level")).astype(float))
+    features.extend(column(name).astype(float) for name in BLOCK_COLUMNS)
+    features.append((column("model_type") == "ETAP Model Available").astype(float))
+    return np.column_stack(features)
+
+
+class SimilarQuoteIndex:
+    """Spatial index over historical projects (built once, queried every rerun)."""
+
+    def __init__(self, history):
+        history = history.reset_index(drop=True)
+        tiers = tier_codes(history["tier_level"].to_numpy())
+        if (tiers < 0).any():
+            raise ValueError("tier_level must be one of: " + ", ".join(TIER_LEVELS))
+
+        raw = _raw_features(history)
+        self.center = raw.mean(axis=0)
+        spread = raw.std(axis=0)
+        spread[spread == 0] = 1.0
+        weights = np.array([FEATURE_WEIGHTS.get(name, 1.0) for name in FEATURE_NAMES])
+        self.scale = spread / weights
+        self.points = ((raw - self.center) / self.scale).astype(np.float32)
+
+        if cKDTree is not None:
+            self.tree = cKDTree(self.points)
+        else:
+            self.tree = None
+            self._sq_norms = np.einsum("ij,ij->i", self.points, self.points)
+
+        it_mw = history["it_capacity"].to_numpy(dtype=float)
+        mech_mw = history["mechanical_load"].to_numpy(dtype=float)
+        house_mw = history["house_load"].to_numpy(dtype=float)
+        formula_buses = calculate_bus_count_batch(
+            total_mw=it_mw + mech_mw + house_mw,
+            it_capacity=it_mw,
+            mechanical_load=mech_mw,
+            house_load=house_mw,
+            tier_level=tiers,
+            rounded=False,
+            redundancy=history["redundancy_scheme"].fillna("").to_numpy() if "redundancy_scheme" in history.columns else None,
+            **{col: history[col].to_numpy(dtype=float) for col in BLOCK_COLUMNS if col in history.columns}
+        )
+        self.actual_buses = history["actual_buses"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.implied_calibration = np.where(formula_buses > 0, self.actual_buses / formula_buses, np.nan)
+
+        price_column = next((c for c in PRICE_COLUMNS if c in history.columns), None)
+        self.prices = history[price_column].to_numpy(dtype=float) if price_column else None
+        self.names = (history["project_name"].astype(str).to_numpy() if "project_name" in history.columns
+                      else np.array([f"#{i + 1}" for i in range(len(history))]))
+        self.tiers = tiers
+        self.loads = history[LOAD_COLUMNS].to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _nearest(self, point, k):
+        if self.tree is not None:
+            distances, idx = self.tree.query(point, k=k)
+            return np.atleast_1d(idx), np.atleast_1d(distances)
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2; only the first two vary by row
+        scores = self._sq_norms - 2 * (self.points @ point)
+        idx = np.argpartition(scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        idx = idx[np.argsort(scores[idx], kind="stable")]
+        distances = np.sqrt(np.maximum(scores[idx] + float(point @ point), 0))
+        return idx, distances
+
+    def query(self, quote, k=DEFAULT_K):
+        """
+        The k past projects most similar to a flat quote dict (app.py's quote_inputs).
+        Returns:
+            pd.DataFrame: one row per neighbour, nearest first
+        """
+        k = min(k, len(self))
+        point = ((_raw_features(pd.DataFrame([quote]))[0] - self.center) / self.scale).astype(np.float32)
+        idx, distances = self._nearest(point, k)
+        return pd.DataFrame({
+            "project": self.names[idx],
+            "tier_level": np.asarray(TIER_LEVELS)[self.tiers[idx]],
+            "it_capacity": self.loads[idx, 0],
+            "mechanical_load": self.loads[idx, 1],
+            "house_load": self.loads[idx, 2],
+            "actual_buses": self.actual_buses[idx],
+            "final_price": self.prices[idx] if self.prices is not None else np.nan,
+            "implied_calibration": self.implied_calibration[idx],
+            "distance": distances,
+        })
+
+    @staticmethod
+    def suggest_calibration(neighbours):
+        """
+        Distance-weighted median of the neighbours' implied calibration,
+        snapped to the slider step. Returns None if none is usable.
+        """
+        usable = neighbours[np.isfinite(neighbours["implied_calibration"])]
+        if usable.empty:
+            return None
+        values = usable["implied_calibration"].to_numpy()
+        weights = 1.0 / (usable["distance"].to_numpy() + 1e-3)
+        order = np.argsort(values)
+        cumulative = np.cumsum(weights[order])
+        median = values[order][np.searchsorted(cumulative, cumulative[-1] / 2)]
+        snapped = round(median / CALIBRATION_STEP) * CALIBRATION_STEP
+        return round(min(max(snapped, CALIBRATION_RANGE[0]), CALIBRATION_RANGE[1]), 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find past projects similar to a quote and suggest bus calibration")
+    parser.add_argument("history", help="CSV/XLSX of historical projects")
+    parser.add_argument("--it", type=float, default=DEFAULT_QUOTE_INPUTS["it_capacity"], help="IT capacity (MW)")
+    parser.add_argument("--mech", type=float, default=DEFAULT_QUOTE_INPUTS["mechanical_load"], help="mechanical load (MW)")
+    parser.add_argument("--house", type=float, default=DEFAULT_QUOTE_INPUTS["house_load"], help="house load (MW)")
+    parser.add_argument("--tier", default=DEFAULT_QUOTE_INPUTS["tier_level"], choices=TIER_LEVELS)
+    parser.add_argument("--etap", action="store_true", help="ETAP model available")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="number of neighbours")
+    args = parser.parse_args(argv)
+
+    index = SimilarQuoteIndex(load_history(args.history))
+    quote = dict(
+        DEFAULT_QUOTE_INPUTS,
+        it_capacity=args.it,
+        mechanical_load=args.mech,
+        house_load=args.house,
+        tier_level=args.tier,
+        model_type="ETAP Model Available" if args.etap else "Typical Model",
+    )
+    neighbours = index.query(quote, k=args.k)
+    print(neighbours.to_string(index=False))
+    suggestion = index.suggest_calibration(neighbours)
+    print(f"Suggested bus calibration: {suggestion if suggestion is not None else 'n/a'}"
+          f" ({'KD-tree' if index.tree is not None else 'NumPy scan'} over {len(index):,} projects)")
+
+
+if __name__ == "__main__":
+    main()
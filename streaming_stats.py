@@ -0,0 +1,353 @@
+"""
+Constant-memory statistics over bulk pricing and sweep runs.
+
+When tens of millions of rows or sweep points go through price_quotes() the
+rows themselves are rarely wanted, only their distribution. StreamingStats
+folds each priced chunk into fixed-size state and drops the rows:
+
+- total_cost quantiles per tier, in the same log-bucket sketch as the OLAP
+  cube (olap_cube.RELATIVE_ACCURACY relative error, dense bucket counts)
+- an exact histogram of estimated_buses (one integer bin per bus count up to
+  MAX_HISTOGRAM_BUSES, plus an overflow bin)
+- count / sum / sum of squares per tier
+- min and max of total_cost and estimated_buses, each with the input record
+  (and global row number) that produced it
+
+Memory is the same after ten rows or ten billion. All of it adds up
+elementwise, so stats built on different worker processes (or machines)
+combine with merge(); stream_sweep() and stream_file() use a process pool
+that way.
+
+Usage:
+    python streaming_stats.py quotes.csv --workers 8 --save stats.npz
+    python streaming_stats.py --sweep it_capacity 0 200 2001 --sweep bus_calibration 0.5 2.5 41
+    python streaming_stats.py --load stats.npz
+"""
+
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DEFAULT_QUOTE_INPUTS, TIER_LEVELS, load_coefficients, price_quotes, tier_codes
+from olap_cube import RELATIVE_ACCURACY, SKETCH_RANGES, _bucket_index, _n_buckets, sketch_quantiles
+
+TIER_GROUPS = TIER_LEVELS + ["Other"]
+
+# Exact bins 0..MAX_HISTOGRAM_BUSES - 1; larger counts share the last bin
+MAX_HISTOGRAM_BUSES = 8192
+
+EXTREME_MEASURES = ("total_cost", "estimated_buses")
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Rows per price_quotes() call (and per pool task)
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+class StreamingStats:
+    """Mergeable fixed-size summary of priced rows."""
+
+    def __init__(self):
+        groups = len(TIER_GROUPS)
+        self.rows = 0
+        self.count = np.zeros(groups, dtype=np.int64)
+        self.cost_sum = np.zeros(groups)
+        self.cost_squares = np.zeros(groups)
+        self.cost_sketch = np.zeros((groups, _n_buckets("cost")), dtype=np.int64)
+        self.bus_histogram = np.zeros(MAX_HISTOGRAM_BUSES + 1, dtype=np.int64)
+        # measure -> {"min"/"max": (value, row, record)}
+        self.extremes = {measure: {} for measure in EXTREME_MEASURES}
+
+    # ── folding in ──────────────────────────────────────────────────────────
+
+    def update(self, quotes, priced, money_mode="float", offset=None):
+        """
+        Fold one priced chunk in. quotes: the DataFrame that was priced (its
+        rows become the min/max records); offset: global row number of its
+        first row (default: rows seen so far).
+        """
+        offset = self.rows if offset is None else offset
+        n = len(priced["total_cost"])
+        total_cost = np.asarray(priced["total_cost"], dtype=float)
+        if money_mode == "paise":
+            total_cost = total_cost / 100
+        buses = np.asarray(priced["estimated_buses"], dtype=np.int64)
+
+        tiers = tier_codes(
+            quotes["tier_level"].to_numpy() if "tier_level" in quotes.columns
+            else np.full(n, DEFAULT_QUOTE_INPUTS["tier_level"], dtype=object)
+        ).astype(np.int64)
+        tiers[tiers < 0] = len(TIER_LEVELS)
+        groups = len(TIER_GROUPS)
+
+        self.count += np.bincount(tiers, minlength=groups)
+        self.cost_sum += np.bincount(tiers, total_cost, minlength=groups)
+        self.cost_squares += np.bincount(tiers, total_cost * total_cost, minlength=groups)
+        buckets = self.cost_sketch.shape[1]
+        flat = tiers * buckets + _bucket_index(total_cost, "cost")
+        self.cost_sketch += np.bincount(flat, minlength=groups * buckets).reshape(self.cost_sketch.shape)
+        self.bus_histogram += np.bincount(
+            np.clip(buses, 0, MAX_HISTOGRAM_BUSES), minlength=MAX_HISTOGRAM_BUSES + 1
+        )
+
+        if n:
+            for measure, values in (("total_cost", total_cost), ("estimated_buses", buses)):
+                for kind, pick in (("min", np.argmin), ("max", np.argmax)):
+                    i = int(pick(values))
+                    self._offer(measure, kind, values[i].item(), offset + i, lambda i=i: _record(quotes, i))
+        self.rows += n
+        return self
+
+    def _offer(self, measure, kind, value, row, record):
+        current = self.extremes[measure].get(kind)
+        # Ties keep the earliest row, so results don't depend on chunking or merge order
+        better = (
+            current is None
+            or (value < current[0] if kind == "min" else value > current[0])
+            or (value == current[0] and row < current[1])
+        )
+        if better:
+            self.extremes[measure][kind] = (value, row, record() if callable(record) else record)
+
+    def merge(self, other):
+        """Add stats built elsewhere (another chunk range, process or machine)."""
+        self.rows += other.rows
+        self.count += other.count
+        self.cost_sum += other.cost_sum
+        self.cost_squares += other.cost_squares
+        self.cost_sketch += other.cost_sketch
+        self.bus_histogram += other.bus_histogram
+        for measure, extremes in other.extremes.items():
+            for kind, (value, row, record) in extremes.items():
+                self._offer(measure, kind, value, row, record)
+        return self
+
+    # ── reading ─────────────────────────────────────────────────────────────
+
+    def tier_summary(self, quantiles=DEFAULT_QUANTILES):
+        """
+        total_cost distribution per tier (plus an 'All' row).
+        Returns:
+            pd.DataFrame: tier, count, mean, std and one pNN column per quantile
+        """
+        rows = []
+        groups = [(label, [g]) for g, label in enumerate(TIER_GROUPS)] + [("All", list(range(len(TIER_GROUPS))))]
+        for label, members in groups:
+            n = int(self.count[members].sum())
+            if n == 0:
+                continue
+            mean = float(self.cost_sum[members].sum()) / n
+            variance = max(float(self.cost_squares[members].sum()) / n - mean * mean, 0.0)
+            row = {"tier": label, "count": n, "mean": mean, "std": math.sqrt(variance)}
+            sketch = self.cost_sketch[members].sum(axis=0)
+            for q, value in zip(quantiles, sketch_quantiles(sketch, quantiles, "cost")):
+                row[f"p{q * 100:g}"] = value
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def bus_distribution(self):
+        """
+        Non-empty estimated_buses bins.
+        Returns:
+            pd.DataFrame: buses (the last bin is 'MAX_HISTOGRAM_BUSES or more'), count
+        """
+        bins = np.flatnonzero(self.bus_histogram)
+        return pd.DataFrame({"buses": bins, "count": self.bus_histogram[bins]})
+
+    def extreme_records(self):
+        """
+        Returns:
+            pd.DataFrame: measure, kind, value, row and the producing inputs
+        """
+        rows = []
+        for measure, extremes in self.extremes.items():
+            for kind in ("min", "max"):
+                if kind in extremes:
+                    value, row, record = extremes[kind]
+                    rows.append(dict(record, measure=measure, kind=kind, value=value, row=row))
+        frame = pd.DataFrame(rows)
+        leading = ["measure", "kind", "value", "row"]
+        return frame[leading + [c for c in frame.columns if c not in leading]] if rows else frame
+
+    # ── persistence ─────────────────────────────────────────────────────────
+
+    def save(self, path):
+        meta = {
+            "rows": self.rows,
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "cost_range": list(SKETCH_RANGES["cost"]),
+            "extremes": self.extremes,
+        }
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta, default=_json_default)),
+            count=self.count,
+            cost_sum=self.cost_sum,
+            cost_squares=self.cost_squares,
+            cost_sketch=self.cost_sketch,
+            bus_histogram=self.bus_histogram,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["relative_accuracy"] != RELATIVE_ACCURACY or meta["cost_range"] != list(SKETCH_RANGES["cost"]):
+                raise ValueError(f"{path} was built with a different sketch configuration")
+            stats = cls()
+            for name in ("count", "cost_sum", "cost_squares", "cost_sketch", "bus_histogram"):
+                setattr(stats, name, data[name])
+            stats.rows = meta["rows"]
+            stats.extremes = {
+                measure: {kind: tuple(entry) for kind, entry in extremes.items()}
+                for measure, extremes in meta["extremes"].items()
+            }
+        return stats
+
+
+def _record(quotes, i):
+    return {name: _plain(value) for name, value in quotes.iloc[i].items()}
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _json_default(value):
+    return _plain(value) if isinstance(value, np.generic) else str(value)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RUNNERS (BULK AND SWEEP)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def stream_quotes(chunks, coefficients=None, money_mode="float", stats=None):
+    """
+    Price an iterable of DataFrame chunks in this process, keeping only stats.
+    Returns:
+        StreamingStats
+    """
+    coefficients = coefficients or load_coefficients()
+    stats = stats or StreamingStats()
+    for chunk in chunks:
+        stats.update(chunk, price_quotes(chunk, coefficients, money_mode), money_mode)
+    return stats
+
+
+def sweep_chunk(quote, grid, start, stop):
+    """
+    Rows start..stop-1 of the crossed grid (C order over the grid fields, as
+    cost_engine.sweep_quote) as a quote DataFrame, without building the mesh.
+    """
+    axes = [np.asarray(values) for values in grid.values()]
+    points = np.unravel_index(np.arange(start, stop), [len(axis) for axis in axes])
+    columns = {
+        key: np.full(stop - start, value, dtype=object if isinstance(value, str) else None)
+        for key, value in quote.items()
+        if key not in grid and key in DEFAULT_QUOTE_INPUTS
+    }
+    for field, axis, index in zip(grid, axes, points):
+        columns[field] = axis[index]
+    return pd.DataFrame(columns)
+
+
+def _price_task(args):
+    kind, payload, offset, coefficients, money_mode = args
+    chunk = sweep_chunk(*payload) if kind == "sweep" else payload
+    stats = StreamingStats()
+    return stats.update(chunk, price_quotes(chunk, coefficients, money_mode), money_mode, offset=offset)
+
+
+def _run_pool(tasks, workers):
+    # Bounded in-flight tasks, so memory stays flat however many chunks there are
+    stats = StreamingStats()
+    if workers <= 1:
+        for task in tasks:
+            stats.merge(_price_task(task))
+        return stats
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(_price_task, task))
+            if len(pending) >= 2 * workers:
+                stats.merge(pending.pop(0).result())
+        for future in pending:
+            stats.merge(future.result())
+    return stats
+
+
+def stream_sweep(quote, grid, coefficients=None, money_mode="float", workers=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stats over every point of a crossed sweep grid (any size), chunked over
+    a process pool. Min/max records carry the grid values that produced them.
+    """
+    coefficients = coefficients or load_coefficients()
+    workers = workers or os.cpu_count() or 1
+    total = int(np.prod([len(values) for values in grid.values()]))
+    tasks = (
+        ("sweep", (quote, grid, start, min(start + chunk_rows, total)), start, coefficients, money_mode)
+        for start in range(0, total, chunk_rows)
+    )
+    return _run_pool(tasks, workers)
+
+
+def stream_file(path, coefficients=None, money_mode="float", workers=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stats over a quotes CSV of any length, read in chunks and priced over a process pool."""
+    coefficients = coefficients or load_coefficients()
+    workers = workers or os.cpu_count() or 1
+
+    def tasks():
+        offset = 0
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield "quotes", chunk, offset, coefficients, money_mode
+            offset += len(chunk)
+
+    return _run_pool(tasks(), workers)
+
+
+def print_stats(stats):
+    print(f"{stats.rows:,} rows")
+    print(stats.tier_summary().to_string(index=False, float_format="{:,.0f}".format))
+    buses = stats.bus_distribution()
+    if not buses.empty:
+        print(f"estimated_buses: {len(buses)} distinct counts, {buses['buses'].min()}-{buses['buses'].max()}")
+    extremes = stats.extreme_records()
+    if not extremes.empty:
+        print(extremes.to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Constant-memory cost and bus-count statistics over bulk or sweep runs")
+    parser.add_argument("quotes", nargs="?", help="CSV of flat quote inputs")
+    parser.add_argument("--sweep", nargs=4, action="append", metavar=("FIELD", "START", "STOP", "POINTS"),
+                        help="sweep a numeric input over a linspace (repeat to cross several)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--money-mode", choices=["float", "paise"], default="float")
+    parser.add_argument("--save", help="write the stats to this .npz (merge later with --load)")
+    parser.add_argument("--load", nargs="+", help="load and merge saved stats instead of pricing")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        stats = StreamingStats()
+        for path in args.load:
+            stats.merge(StreamingStats.load(path))
+    elif args.sweep:
+        grid = {field: np.linspace(float(start), float(stop), int(points)) for field, start, stop, points in args.sweep}
+        stats = stream_sweep(dict(DEFAULT_QUOTE_INPUTS), grid, money_mode=args.money_mode,
+                             workers=args.workers, chunk_rows=args.chunk_rows)
+    elif args.quotes:
+        stats = stream_file(args.quotes, money_mode=args.money_mode, workers=args.workers, chunk_rows=args.chunk_rows)
+    else:
+        parser.error("give a quotes CSV, --sweep or --load")
+
+    if args.save:
+        stats.save(args.save)
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
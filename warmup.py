@@ -0,0 +1,210 @@
+"""
+Worker warm-up and readiness probe.
+
+A new worker's first rerun otherwise pays for importing the app's modules,
+loading the coefficient file, compiling (or loading) the Numba kernels and
+NumPy/pandas first-call setup on the engine paths, and for building the
+what-if response surface. start_warmup() does all of that once per process
+on a background thread: preload modules, compile kernels, run the bus count
+and costing for the four tiers at typical IT sizes through the same entry
+points the app uses, then build (or attach) the default-input response
+surface in the shared table cache.
+
+GET /ready on the metrics endpoint (metrics.py) answers 503 while warm-up
+runs and 200 once it has finished, with per-step timings as JSON, so a load
+balancer only routes sessions to hot workers.
+
+Streamlit only runs app.py when a session connects, so start workers through
+this module to warm up before the first user:
+
+Usage:
+    python warmup.py -- --server.port 8501 --server.headless true
+    curl -s http://127.0.0.1:9464/ready
+"""
+
+import datetime
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Everything app.py imports (heaviest first)
+PRELOAD_MODULES = (
+    "plotly.graph_objects",
+    "pandas",
+    "numpy",
+    "cost_engine",
+    "kernels",
+    "result_cards",
+    "share_state",
+    "shared_cache",
+    "scenarios",
+    "scheduler",
+    "cashflow",
+    "rate_cards",
+    "calibration",
+    "similar_quotes",
+    "quote_pdf",
+    "quote_view",
+    "response_surface",
+    "audit_log",
+    "money",
+)
+
+# Common configurations primed on the engine paths
+WARM_IT_MW = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+
+_state = {"status": "idle", "started": None, "finished": None, "steps": {}}
+_state_lock = threading.Lock()
+
+
+def _step(name, func):
+    started = time.perf_counter()
+    try:
+        detail = func()
+        result = {"seconds": round(time.perf_counter() - started, 3)}
+        if detail is not None:
+            result["detail"] = detail
+    except Exception as exc:
+        # A failed step leaves that path cold; it must not keep the worker unready
+        logger.warning("Warm-up step %s failed: %s", name, exc)
+        result = {"seconds": round(time.perf_counter() - started, 3), "error": f"{type(exc).__name__}: {exc}"}
+    with _state_lock:
+        _state["steps"][name] = result
+
+
+def _preload_modules():
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    return len(PRELOAD_MODULES)
+
+
+def _compile_kernels():
+    import kernels
+    return "numba" if kernels.warm_kernels() else "numpy (numba not enabled)"
+
+
+def _warm_configurations():
+    import pandas as pd
+    from cost_engine import DEFAULT_QUOTE_INPUTS, TIER_LEVELS
+    # Default ratio of mechanical and house load to IT load
+    mech_ratio = DEFAULT_QUOTE_INPUTS["mechanical_load"] / DEFAULT_QUOTE_INPUTS["it_capacity"]
+    house_ratio = DEFAULT_QUOTE_INPUTS["house_load"] / DEFAULT_QUOTE_INPUTS["it_capacity"]
+    return pd.DataFrame([
+        dict(DEFAULT_QUOTE_INPUTS, tier_level=tier, it_capacity=it_mw,
+             mechanical_load=it_mw * mech_ratio, house_load=it_mw * house_ratio)
+        for tier in TIER_LEVELS
+        for it_mw in WARM_IT_MW
+    ])
+
+
+def _warm_bus_count():
+    from cost_engine import calculate_bus_count_accurate
+    configurations = _warm_configurations()
+    for quote in configurations.to_dict("records"):
+        calculate_bus_count_accurate(
+            total_mw=quote["it_capacity"] + quote["mechanical_load"] + quote["house_load"],
+            it_capacity=quote["it_capacity"],
+            mechanical_load=quote["mechanical_load"],
+            house_load=quote["house_load"],
+            tier_level=quote["tier_level"],
+        )
+    return len(configurations)
+
+
+def _warm_costing():
+    from cost_engine import load_coefficients, price_quotes
+    coefficients = load_coefficients()
+    configurations = _warm_configurations()
+    for money_mode in ("float", "paise"):
+        price_quotes(configurations, coefficients, money_mode)
+        # The app prices one quote at a time; batch callers use large frames
+        price_quotes(configurations.iloc[:1], coefficients, money_mode)
+    return len(configurations)
+
+
+def _warm_response_surface():
+    from cost_engine import load_coefficients
+    from response_surface import default_fixed_inputs, surface_tables
+    # Same key as the app's default view, so its first scrub attaches to this copy
+    cost, _ = surface_tables(default_fixed_inputs(), load_coefficients(), "float")
+    return cost.size
+
+
+WARMUP_STEPS = (
+    ("modules", _preload_modules),
+    ("kernels", _compile_kernels),
+    ("bus_count", _warm_bus_count),
+    ("costing", _warm_costing),
+    ("response_surface", _warm_response_surface),
+)
+
+
+def _run():
+    for name, func in WARMUP_STEPS:
+        _step(name, func)
+    with _state_lock:
+        _state["status"] = "ready"
+        _state["finished"] = datetime.datetime.now().isoformat(timespec="seconds")
+    logger.info("Warm-up finished: %s", _state["steps"])
+
+
+def start_warmup():
+    """
+    Start warm-up once per process (safe to call on every rerun) and register
+    the /ready route.
+    Returns:
+        bool: True if this call started it
+    """
+    with _state_lock:
+        if _state["status"] != "idle":
+            return False
+        _state["status"] = "warming"
+        _state["started"] = datetime.datetime.now().isoformat(timespec="seconds")
+    metrics.ROUTES["/ready"] = readiness
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
+    return True
+
+
+def is_ready():
+    return _state["status"] == "ready"
+
+
+def readiness():
+    """/ready handler: (status, content type, body)."""
+    with _state_lock:
+        body = json.dumps(dict(_state, steps=dict(_state["steps"]), ready=_state["status"] == "ready"))
+    return (200 if is_ready() else 503), "application/json", body + "\n"
+
+
+def main(argv=None):
+    # Everything after "--" goes to `streamlit run`
+    argv = sys.argv[1:] if argv is None else argv
+    streamlit_args = argv[argv.index("--") + 1:] if "--" in argv else argv
+    logging.basicConfig(level=logging.INFO)
+    # Import Streamlit (and its plotly theme setup) before the warm-up thread
+    # starts importing, so the two never initialise plotly concurrently
+    from streamlit.web import cli
+
+    # Same process as the app, so the warmed modules, kernels and the /ready
+    # route are the ones its sessions use. Run as a script this file is
+    # __main__, while app.py does `from warmup import start_warmup`; go through
+    # the imported module so both share one warm-up state and one thread.
+    import warmup
+    metrics.start_metrics_server()
+    warmup.start_warmup()
+    sys.argv = ["streamlit", "run", APP_SCRIPT] + streamlit_args
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()